@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Build-Schritt: packt die Cover aus assets/ mit vorgerenderten Thumbnails in cover_archiv.bin.
+
+Vor PyInstaller ausführen und statt des assets-Ordners nur die Archivdatei mitgeben.
+Die Anwendung liest die Thumbnails dann per mmap aus dem Archiv; Cover, die nicht darin
+stehen (z.B. später heruntergeladene), kommen weiter als einzelne Dateien aus dem Benutzerverzeichnis.
+
+Aufruf: python .helper/baue_cover_archiv.py [--ausgabe cover_archiv.bin] [--mit-originalen]
+"""
+import argparse
+import os
+import sys
+import time
+
+_SCRIPT_LOCATION_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPT_LOCATION_DIR, os.pardir))
+sys.path.insert(0, _PROJECT_ROOT_DIR)
+
+from buchladen_cover_archiv import COVER_ARCHIV_DATEINAME, CoverArchiv, schreibe_cover_archiv  # noqa: E402
+
+BILD_ENDUNGEN = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+
+def finde_cover(wurzel: str, ordner: str) -> list:
+    """Relative Pfade (wie image_path in der buecher.json, z.B. "assets/1984.jpg"), sortiert."""
+    return sorted(f"{ordner}/{name}" for name in os.listdir(os.path.join(wurzel, ordner))
+                  if name.lower().endswith(BILD_ENDUNGEN))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packt die mitgelieferten Cover in ein Archiv mit Thumbnails.")
+    parser.add_argument("--wurzel", default=_PROJECT_ROOT_DIR, help="Projektverzeichnis (enthält den Cover-Ordner)")
+    parser.add_argument("--ordner", default="assets", help="Cover-Ordner relativ zur Wurzel")
+    parser.add_argument("--ausgabe", default=os.path.join(_PROJECT_ROOT_DIR, COVER_ARCHIV_DATEINAME))
+    parser.add_argument("--mit-originalen", action="store_true",
+                        help="Auch die Originaldateien packen (größer; die Anwendung braucht nur die Thumbnails)")
+    args = parser.parse_args()
+
+    relative_pfade = finde_cover(args.wurzel, args.ordner)
+    start = time.perf_counter()
+    anzahl = schreibe_cover_archiv(args.ausgabe, args.wurzel, relative_pfade, mit_originalen=args.mit_originalen)
+    dauer = time.perf_counter() - start
+    archiv = CoverArchiv(args.ausgabe) # Gegenprobe: lässt sich das Ergebnis öffnen?
+    archiv.schliessen()
+    quell_bytes = sum(os.path.getsize(os.path.join(args.wurzel, pfad)) for pfad in relative_pfade)
+    print(f"{anzahl} von {len(relative_pfade)} Covern in {dauer:.2f}s nach '{args.ausgabe}' gepackt "
+          f"({os.path.getsize(args.ausgabe) / 1024:.0f} KiB, Quelldateien {quell_bytes / 1024:.0f} KiB).")
+
+
+if __name__ == "__main__":
+    main()
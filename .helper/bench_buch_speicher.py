@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Misst den Speicherbedarf pro Buch im Inventar (Bytes/Buch).
+
+Aufruf: python .helper/bench_buch_speicher.py [anzahl_buecher]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+
+_SCRIPT_LOCATION_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPT_LOCATION_DIR, os.pardir))
+sys.path.insert(0, _PROJECT_ROOT_DIR)
+
+from buchladen_logik import Buchladen  # noqa: E402
+
+BOOKS_JSON_PATH = os.path.join(_PROJECT_ROOT_DIR, 'buecher.json')
+
+
+def erzeuge_katalog(anzahl: int) -> list:
+    """Vervielfältigt buecher.json auf die gewünschte Anzahl, mit eindeutigen Titeln."""
+    with open(BOOKS_JSON_PATH, 'r', encoding='utf-8') as f:
+        vorlage = json.load(f)
+    katalog = []
+    for i in range(anzahl):
+        eintrag = dict(vorlage[i % len(vorlage)])
+        eintrag['titel'] = f"{eintrag['titel']} #{i}"
+        katalog.append(eintrag)
+    return katalog
+
+
+def messe_bytes_pro_buch(anzahl: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        pfad = os.path.join(tmp, 'katalog.json')
+        with open(pfad, 'w', encoding='utf-8') as f:
+            json.dump(erzeuge_katalog(anzahl), f, ensure_ascii=False)
+
+        gc.collect()
+        tracemalloc.start()
+        vorher, _ = tracemalloc.get_traced_memory()
+        laden = Buchladen("Benchmark")
+        laden.lade_buecher_aus_json(pfad)
+        gc.collect()
+        nachher, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return (nachher - vorher) / anzahl
+
+
+def main():
+    anzahl = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    bytes_pro_buch = messe_bytes_pro_buch(anzahl)
+    print(f"[+] {anzahl} Bücher: {bytes_pro_buch:.1f} Bytes/Buch (inkl. Strings und Indizes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Headless Benchmark-Suite für die Buchladen-Logik.
+
+Erzeugt synthetische Kataloge (Verteilungen aus der mitgelieferten buecher.json, fester Seed)
+und misst Laden, alle Filterarten, Kategorien, Gesamtpreis und Speichern. Das Ergebnis ist JSON
+mit Laufzeiten und Spitzen-Speicher (tracemalloc) je Operation.
+
+Aufruf:
+    python .helper/benchmark.py                              # 1k, 100k, 1M Bücher, JSON auf stdout
+    python .helper/benchmark.py --groessen 1000 100000 --ausgabe bench.json
+    python .helper/benchmark.py --vergleiche alt.json        # Regressionen gegenüber einem alten Lauf
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+_SCRIPT_LOCATION_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPT_LOCATION_DIR, os.pardir))
+sys.path.insert(0, _PROJECT_ROOT_DIR)
+
+from buchladen_logik import Buchladen  # noqa: E402
+from buchladen_snapshot import snapshot_pfad  # noqa: E402
+
+BOOKS_JSON_PATH = os.path.join(_PROJECT_ROOT_DIR, 'buecher.json')
+STANDARD_GROESSEN = (1_000, 100_000, 1_000_000)
+STANDARD_SEED = 20250610
+FORMAT_VERSION = 1
+
+
+def lade_verteilungen(pfad: str = BOOKS_JSON_PATH) -> dict:
+    """Liest Kategorie-Häufigkeiten, Preise, Status-Quoten je Kategorie und Wortschatz aus der echten Datei."""
+    with open(pfad, 'r', encoding='utf-8') as f:
+        buecher = json.load(f)
+    kategorien = Counter(b.get('kategorie', 'Unbekannte Kategorie') for b in buecher)
+    verboten, indiziert = defaultdict(int), defaultdict(int)
+    for b in buecher:
+        verboten[b.get('kategorie')] += bool(b.get('verboten', False))
+        indiziert[b.get('kategorie')] += bool(b.get('indiziert', False))
+    return {
+        "kategorien": list(kategorien),
+        "kategorie_gewichte": list(kategorien.values()),
+        "preise": [float(b.get('preis', 0.0)) for b in buecher],
+        "verboten_quote": {k: verboten[k] / n for k, n in kategorien.items()},
+        "indiziert_quote": {k: indiziert[k] / n for k, n in kategorien.items()},
+        "bild_quote": sum(1 for b in buecher if b.get('image_path')) / len(buecher),
+        "titel_woerter": [w for b in buecher for w in b.get('titel', '').split()],
+        "titel_laengen": [len(b.get('titel', '').split()) for b in buecher],
+        "namen": [w for b in buecher for w in b.get('autor', '').split()],
+    }
+
+
+def erzeuge_katalog(anzahl: int, verteilungen: dict, seed: int = STANDARD_SEED) -> list:
+    """Synthetischer Katalog im Format der buecher.json; gleiche Parameter ergeben dieselbe Datei."""
+    rnd = random.Random(seed)
+    namen = verteilungen["namen"]
+    # Etwa 20 Bücher pro Autor, wie in einem echten Sortiment wiederholen sich Autoren
+    autoren = [f"{rnd.choice(namen)} {rnd.choice(namen)}" for _ in range(max(1, anzahl // 20))]
+    kategorien = rnd.choices(verteilungen["kategorien"], weights=verteilungen["kategorie_gewichte"], k=anzahl)
+    katalog = []
+    for i, kategorie in enumerate(kategorien):
+        woerter = rnd.choices(verteilungen["titel_woerter"], k=max(1, rnd.choice(verteilungen["titel_laengen"])))
+        titel = f"{' '.join(woerter)} {i}"
+        preis = round(rnd.choice(verteilungen["preise"]) * rnd.uniform(0.8, 1.2), 2)
+        eintrag = {
+            "titel": titel,
+            "autor": rnd.choice(autoren),
+            "kategorie": kategorie,
+            "preis": preis,
+            "verboten": rnd.random() < verteilungen["verboten_quote"][kategorie],
+            "indiziert": rnd.random() < verteilungen["indiziert_quote"][kategorie],
+        }
+        if rnd.random() < verteilungen["bild_quote"]:
+            eintrag["image_path"] = f"assets/buch-{i}.jpg"
+        katalog.append(eintrag)
+    return katalog
+
+
+def messe(funktion, wiederholungen: int, speicher: bool, vorbereiten=None) -> dict:
+    """Misst funktion() mehrmals; mit speicher zusätzlich ein Lauf unter tracemalloc für den Spitzenwert.
+
+    Wie bei timeit ist die Garbage Collection während der Messung aus, sonst schwanken
+    die Zeiten je nachdem, ob gerade ein voller GC-Lauf über große Inventare fällt.
+    """
+    zeiten = []
+    for _ in range(wiederholungen):
+        if vorbereiten is not None:
+            vorbereiten()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            funktion()
+            zeiten.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    ergebnis = {"sekunden_min": min(zeiten), "sekunden_median": statistics.median(zeiten)}
+    if speicher:
+        if vorbereiten is not None:
+            vorbereiten()
+        gc.collect()
+        tracemalloc.start()
+        funktion()
+        _aktuell, spitze = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        ergebnis["peak_bytes"] = spitze
+    return ergebnis
+
+
+def _leiser_aufruf(funktion, *args):
+    """Unterdrückt die Erfolgsmeldungen (print) der Logik, damit stdout reines JSON bleibt."""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    try:
+        return funktion(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def benchmark_groesse(anzahl: int, verteilungen: dict, wiederholungen: int, speicher: bool, seed: int,
+                      backend: str) -> dict:
+    ergebnisse = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        json_pfad = os.path.join(tmp, 'buecher.json')
+        with open(json_pfad, 'w', encoding='utf-8') as f:
+            json.dump(erzeuge_katalog(anzahl, verteilungen, seed), f, indent=2, ensure_ascii=False)
+
+        def neuer_laden() -> Buchladen:
+            if backend == "sqlite":
+                from buchladen_sqlite import SQLiteBuchladen
+                db_pfad = os.path.join(tmp, 'buecher.sqlite3')
+                if os.path.exists(db_pfad):
+                    os.remove(db_pfad)
+                return SQLiteBuchladen("Benchmark", db_pfad)
+            return Buchladen("Benchmark")
+
+        geladen = {} # Nur der jeweils letzte Laden bleibt am Leben (1M Bücher brauchen viel Speicher)
+
+        def freigeben(art: str):
+            alt = geladen.pop(art, None)
+            if alt is not None and hasattr(alt, "schliessen"):
+                alt.schliessen()
+
+        def ohne_snapshot():
+            freigeben("json")
+            if os.path.exists(snapshot_pfad(json_pfad)):
+                os.remove(snapshot_pfad(json_pfad))
+
+        def lade(art: str):
+            geladen[art] = _leiser_aufruf(_lade, neuer_laden(), json_pfad)
+
+        ergebnisse["lade_buecher_aus_json"] = messe(lambda: lade("json"), wiederholungen, speicher,
+                                                    vorbereiten=ohne_snapshot)
+        if backend == "json": # Der letzte JSON-Lauf hat den Snapshot geschrieben
+            ergebnisse["lade_buecher_aus_snapshot"] = messe(lambda: lade("snapshot"), wiederholungen, speicher,
+                                                            vorbereiten=lambda: freigeben("snapshot"))
+            freigeben("snapshot")
+        laden = geladen["json"] # Filter usw. auf einem vollständig geladenen Inventar messen
+
+        kategorien = laden.get_alle_kategorien()
+        haeufigste = Counter(b.kategorie for b in laden.inventar).most_common(1)[0][0]
+        filter_arten = {
+            "alle_anzeigen": "Alle Anzeigen",
+            "nur_fsk18": "Nur FSK18",
+            "nur_verbotene": "Nur Verbotene",
+            "kategorie_haeufigste": haeufigste,
+            "kategorie_casefold": haeufigste.swapcase(),
+            "kategorie_seltenste": min(kategorien, key=lambda k: len(laden.suche_nach_kategorie(k))),
+        }
+        for name, kriterium in filter_arten.items():
+            # Ohne neue Generation käme ab der zweiten Wiederholung alles aus dem Abfrage-Cache
+            ergebnisse[f"get_gefilterte_buecher.{name}"] = messe(
+                lambda k=kriterium: laden.get_gefilterte_buecher(k), wiederholungen, speicher,
+                vorbereiten=laden.inventar_geaendert)
+            ergebnisse[f"get_gefilterte_buecher.{name}_cache"] = messe(
+                lambda k=kriterium: laden.get_gefilterte_buecher(k), wiederholungen, speicher,
+                vorbereiten=lambda k=kriterium: laden.get_gefilterte_buecher(k))
+        ergebnisse["get_alle_kategorien"] = messe(laden.get_alle_kategorien, wiederholungen, speicher)
+        alle = list(laden.inventar)
+        ergebnisse["berechne_gesamtpreis"] = messe(lambda: laden.berechne_gesamtpreis(alle), wiederholungen, speicher)
+        ergebnisse["speichere_inventar_in_json"] = messe(
+            lambda: _leiser_aufruf(laden.speichere_inventar_in_json, json_pfad), wiederholungen, speicher)
+        if hasattr(laden, "schliessen"):
+            laden.schliessen()
+    return ergebnisse
+
+
+def _lade(laden: Buchladen, json_pfad: str) -> Buchladen:
+    laden.lade_buecher_aus_json(json_pfad)
+    return laden
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_PROJECT_ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def vergleiche(alt: dict, neu: dict, toleranz: float) -> list:
+    """Operationen, die gegenüber alt um mehr als toleranz (relativ) langsamer geworden sind."""
+    regressionen = []
+    for groesse, operationen in neu["ergebnisse"].items():
+        for name, werte in operationen.items():
+            vorher = alt.get("ergebnisse", {}).get(groesse, {}).get(name)
+            if not vorher or vorher["sekunden_min"] <= 0:
+                continue
+            faktor = werte["sekunden_min"] / vorher["sekunden_min"]
+            if faktor > 1 + toleranz:
+                regressionen.append({"groesse": groesse, "operation": name, "faktor": round(faktor, 2),
+                                     "vorher_s": vorher["sekunden_min"], "nachher_s": werte["sekunden_min"]})
+    return regressionen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Buchladen-Logik (ohne GUI).")
+    parser.add_argument("--groessen", type=int, nargs="+", default=list(STANDARD_GROESSEN))
+    parser.add_argument("--wiederholungen", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=STANDARD_SEED)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--ohne-speicher", action="store_true", help="Kein tracemalloc-Lauf (deutlich schneller)")
+    parser.add_argument("--ausgabe", help="JSON in diese Datei statt auf stdout schreiben")
+    parser.add_argument("--vergleiche", help="Früheres Ergebnis; meldet Regressionen und endet dann mit Code 1")
+    parser.add_argument("--toleranz", type=float, default=0.25, help="Erlaubte Verlangsamung beim Vergleich (0.25 = 25 %%)")
+    args = parser.parse_args()
+
+    verteilungen = lade_verteilungen()
+    ergebnis = {
+        "format_version": FORMAT_VERSION,
+        "zeitpunkt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "plattform": platform.platform(),
+        "backend": args.backend,
+        "seed": args.seed,
+        "wiederholungen": args.wiederholungen,
+        "ergebnisse": {},
+    }
+    for anzahl in args.groessen:
+        print(f"[*] {anzahl} Bücher...", file=sys.stderr)
+        ergebnis["ergebnisse"][str(anzahl)] = benchmark_groesse(
+            anzahl, verteilungen, args.wiederholungen, not args.ohne_speicher, args.seed, args.backend)
+
+    text = json.dumps(ergebnis, indent=2, ensure_ascii=False)
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.vergleiche:
+        with open(args.vergleiche, 'r', encoding='utf-8') as f:
+            regressionen = vergleiche(json.load(f), ergebnis, args.toleranz)
+        for r in regressionen:
+            print(f"[!] Regression bei {r['groesse']} Büchern: {r['operation']} {r['faktor']}x langsamer "
+                  f"({r['vorher_s']:.4f}s -> {r['nachher_s']:.4f}s)", file=sys.stderr)
+        if regressionen:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
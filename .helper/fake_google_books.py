@@ -0,0 +1,98 @@
+"""Local stand-in for the Google Books volumes endpoint, for testing scrape_pics.py offline.
+
+Usage:
+    python .helper/fake_google_books.py --port 8765 --fail-rate 0.2
+    python .helper/scrape_pics.py --api-url http://127.0.0.1:8765/books/v1/volumes --json copy.json --cover-dir /tmp/assets
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Smallest useful stand-in for a JPEG: SOI marker, a comment, EOI marker
+FAKE_JPEG = b"\xff\xd8\xff\xfe\x00\x0cfake cover\xff\xd9"
+
+
+class FakeGoogleBooksHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass # Keep the scraper output readable
+
+    def _send(self, status: int, body: bytes, content_type: str, extra_headers: dict | None = None):
+        if status == 200:
+            # ETag revalidation like the real API: unchanged bodies are answered with 304
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            extra_headers = dict(extra_headers or {}, ETag=etag)
+            if self.headers.get("If-None-Match") == etag:
+                status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        parsed = urllib.parse.urlparse(self.path)
+        if parsed.path == "/stats":
+            self._send(200, json.dumps({"requests": server.request_count}).encode(), "application/json")
+            return
+
+        time.sleep(server.latency)
+        if random.random() < server.fail_rate:
+            self._send(503, b"temporarily unavailable", "text/plain", {"Retry-After": "0"})
+            return
+
+        if parsed.path == "/books/v1/volumes":
+            query = urllib.parse.parse_qs(parsed.query).get("q", [""])[0]
+            if random.random() < server.no_cover_rate:
+                body = {"kind": "books#volumes", "totalItems": 0}
+            else:
+                cover_id = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+                host = f"http://{self.headers.get('Host', '127.0.0.1')}"
+                body = {"kind": "books#volumes", "totalItems": 1, "items": [{
+                    "volumeInfo": {"title": query, "imageLinks": {
+                        "smallThumbnail": f"{host}/covers/{cover_id}.jpg?zoom=5",
+                        "thumbnail": f"{host}/covers/{cover_id}.jpg?zoom=1"}}}]}
+            self._send(200, json.dumps(body).encode("utf-8"), "application/json; charset=UTF-8")
+        elif parsed.path.startswith("/covers/"):
+            self._send(200, FAKE_JPEG, "image/jpeg")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+
+def make_server(port: int = 0, fail_rate: float = 0.0, no_cover_rate: float = 0.0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Creates (but does not start) a stand-in server; port 0 picks a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeGoogleBooksHandler)
+    server.fail_rate = fail_rate
+    server.no_cover_rate = no_cover_rate
+    server.latency = latency
+    server.request_count = 0
+    server.lock = threading.Lock()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503")
+    parser.add_argument("--no-cover-rate", type=float, default=0.0, help="Share of searches without results")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds of delay per request")
+    args = parser.parse_args()
+    server = make_server(args.port, args.fail_rate, args.no_cover_rate, args.latency)
+    print(f"[*] Fake Google Books API on http://127.0.0.1:{server.server_port}/books/v1/volumes")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,194 +1,329 @@
 import os
+import sys
 import json
+import random
+import argparse
+import threading
 import requests
 import urllib.parse
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 # Determine paths relative to this script's location
 _SCRIPT_LOCATION_DIR = os.path.dirname(os.path.abspath(__file__))
 _PROJECT_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPT_LOCATION_DIR, os.pardir)) # os.pardir is '..'
 
+sys.path.insert(0, _PROJECT_ROOT_DIR)
+from buchladen_http_cache import HttpCache, suchschluessel  # noqa: E402 (shared with the app's cover downloads)
+
 BOOKS_JSON_PATH = os.path.join(_PROJECT_ROOT_DIR, 'buecher.json')
 COVER_SAVE_DIR = os.path.join(_PROJECT_ROOT_DIR, 'assets')
+HTTP_CACHE_DIR = os.path.join(_SCRIPT_LOCATION_DIR, 'http_cache')
+GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0"
 }
 
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+CHECKPOINT_EVERY = 25 # Persist progress after this many finished API lookups
+
+
+class LookupFailed(Exception):
+    """A lookup or download failed for a possibly transient reason; unlike "no cover found" it is retried on resume."""
+
+
 def sanitize_filename(name: str) -> str:
     return "".join(c for c in name if c.isalnum() or c in "._- ").rstrip()
 
-def search_and_download_cover(title: str, author: str) -> str | None:
-    query = urllib.parse.quote_plus(f"{title} {author}")
-    # Google Books API endpoint
-    api_url = f"https://www.googleapis.com/books/v1/volumes?q={query}"
 
-    print(f"[*] Searching Google Books for: {title} by {author}")
-    # print(f"    API URL: {api_url}") # Uncomment for debugging URL
+class TokenBucket:
+    """Thread-safe token bucket: allows `rate` requests per second with bursts up to `capacity`."""
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
 
-    try:
-        response = requests.get(api_url, headers=HEADERS, timeout=10) # Added timeout
-        response.raise_for_status()  # Raises HTTPError for bad responses (4XX or 5XX)
-    except requests.exceptions.RequestException as e:
-        print(f"[!] Failed to fetch search results for {title}: {e}")
-        return None
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
 
-    try:
-        data = response.json()
-    except json.JSONDecodeError:
-        print(f"[!] Failed to parse JSON response for {title}")
-        print(f"    Response text (first 500 chars): {response.text[:500]}")
-        return None
 
-    # print(json.dumps(data, indent=2, ensure_ascii=False)[:1000]) # Uncomment for debugging JSON response
+class CoverScraper:
+    """Looks up and downloads covers concurrently with a shared session, rate limit and retries."""
+    def __init__(self, api_url: str = GOOGLE_BOOKS_API_URL, cover_dir: str = COVER_SAVE_DIR,
+                 workers: int = 8, rate: float = 5.0, max_attempts: int = 5, backoff_base: float = 1.0,
+                 cache_dir: str | None = HTTP_CACHE_DIR):
+        self.api_url = api_url
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+        self.cover_dir = cover_dir
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.limiter = TokenBucket(rate)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _get(self, url: str, headers: dict | None = None, timeout: float = 10) -> requests.Response:
+        """GET with rate limiting and exponential backoff (with jitter) on transient errors."""
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                error: Exception = requests.exceptions.HTTPError(f"HTTP {response.status_code}", response=response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                retry_after = None
+                error = e
+            if attempt == self.max_attempts:
+                raise error
+            delay = self.backoff_base * (2 ** (attempt - 1)) * (0.5 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            print(f"[~] {error} for {url}, retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+            time.sleep(delay)
+        raise AssertionError("unreachable")
 
-    if "items" in data and len(data["items"]) > 0:
-        first_book = data["items"][0]
-        volume_info = first_book.get("volumeInfo", {})
-        image_links = volume_info.get("imageLinks", {})
+    def _fetch(self, url: str, cache_key: str | None = None) -> bytes:
+        """Response body via the persistent HTTP cache (no request at all while the entry is fresh)."""
+        if self.cache is None:
+            return self._get(url).content
+        return self.cache.hole(url, lambda u, headers: self._get(u, headers=headers), cache_key)
 
+    def search_and_download_cover(self, title: str, author: str) -> str | None:
+        """Relative image path, or None if Google Books has no cover; raises LookupFailed on network/IO errors."""
+        query = urllib.parse.quote_plus(f"{title} {author}")
+        api_url = f"{self.api_url}?q={query}"
+
+        print(f"[*] Searching Google Books for: {title} by {author}")
+        try:
+            body = self._fetch(api_url, suchschluessel(self.api_url, title, author))
+        except requests.exceptions.RequestException as e:
+            raise LookupFailed(f"Failed to fetch search results for {title}: {e}") from e
+
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            # Often an error page from a proxy or an overloaded server, so worth another try
+            raise LookupFailed(f"Failed to parse JSON response for {title} "
+                               f"(first 500 chars: {body[:500]!r})") from None
+
+        if not data.get("items"):
+            print(f"[-] No items found in Google Books API response for {title}")
+            return None
+
+        image_links = data["items"][0].get("volumeInfo", {}).get("imageLinks", {})
         # Try to get various image sizes, preferring larger ones
         img_url = (image_links.get("large") or
                    image_links.get("medium") or
                    image_links.get("thumbnail") or
                    image_links.get("smallThumbnail"))
-
         if not img_url or not isinstance(img_url, str):
             print(f"[-] No suitable image link found in API response for {title}")
-            # print(f"    Available imageLinks: {image_links}") # For debugging
             return None
-
-        # Google Books API URLs are usually http or https.
-        # This check might be redundant but harmless.
         if img_url.startswith("//"):
             img_url = "https:" + img_url
 
         filename = sanitize_filename(f"{title}.jpg")
-        filepath = os.path.join(COVER_SAVE_DIR, filename)
+        filepath = os.path.join(self.cover_dir, filename)
 
         print(f"[*] Downloading cover for {title} from {img_url}")
         try:
-            img_response = requests.get(img_url, headers=HEADERS, timeout=10) # Added timeout
-            img_response.raise_for_status() # Check for download errors
-
-            with open(filepath, 'wb') as f:
-                f.write(img_response.content)
+            image_bytes = self._fetch(img_url)
+            tmp_path = filepath + ".part"
+            with open(tmp_path, 'wb') as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, filepath) # Never leave half-written covers behind
             print(f"[+] Saved cover: {filepath}")
-            # Return the relative path for the JSON file
-            relative_image_path = f"assets/{filename}" # Uses forward slash as in example
-            return relative_image_path
-
+            return f"assets/{filename}" # Relative path for the JSON file, forward slash as in example
         except requests.exceptions.RequestException as e:
-            print(f"[!] Failed to download image for {title} from {img_url}: {e}")
+            raise LookupFailed(f"Failed to download image for {title} from {img_url}: {e}") from e
         except IOError as e:
-            print(f"[!] Failed to save image for {title} to {filepath}: {e}")
-        return None # Return None if download or save fails
-    else:
-        print(f"[-] No items found in Google Books API response for {title}")
-        return None
+            raise LookupFailed(f"Failed to save image for {title} to {filepath}: {e}") from e
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.schliessen()
+
+
+def book_key(book_entry: dict) -> str:
+    return f"{book_entry.get('titel')}|{book_entry.get('autor')}"
+
+
+def load_checkpoint(path: str) -> dict:
+    """Returns {book_key: image_path or None} for lookups finished by an earlier (interrupted) run."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("done", {})
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, AttributeError):
+        print(f"[!] Checkpoint {path} is unreadable, starting from scratch.")
+        return {}
+
+
+def save_checkpoint(path: str, done: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"done": done}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def find_local_image(book_entry: dict, project_root: str, cover_dir: str) -> str | None:
+    """Returns the relative image path if a cover already exists locally (via JSON path or naming convention)."""
+    title = book_entry["titel"]
+    current_json_image_path = book_entry.get("image_path")
+
+    # 1. Check if JSON already has a valid image_path and the file exists
+    if current_json_image_path:
+        if os.path.exists(os.path.join(project_root, current_json_image_path)):
+            print(f"[*] Image for '{title}' found via existing JSON path: {current_json_image_path}. File exists.")
+            return current_json_image_path
+        print(f"[*] Image path '{current_json_image_path}' in JSON for '{title}', but file missing. Will check conventional path or download.")
+
+    # 2. Check conventional local paths: original spacing, hyphens, underscores
+    base_sanitized_title = sanitize_filename(title)
+    potential_filenames_in_order = [
+        f"{base_sanitized_title}.jpg",
+        f"{base_sanitized_title.replace(' ', '-')}.jpg",
+        f"{base_sanitized_title.replace(' ', '_')}.jpg"
+    ]
+    for possible_filename in dict.fromkeys(potential_filenames_in_order): # Deduplicate, keep order
+        expected_local_filepath = os.path.join(cover_dir, possible_filename)
+        if os.path.exists(expected_local_filepath):
+            print(f"[*] Local image for '{title}' found by convention: {expected_local_filepath}")
+            return f"assets/{possible_filename}" # Uses forward slash
+    return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Find or download cover images for all books in buecher.json.")
+    parser.add_argument("--json", default=BOOKS_JSON_PATH, help="Books JSON file to update")
+    parser.add_argument("--cover-dir", default=COVER_SAVE_DIR, help="Directory for cover images")
+    parser.add_argument("--api-url", default=GOOGLE_BOOKS_API_URL, help="Volumes endpoint (e.g. a local stand-in server)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent lookups")
+    parser.add_argument("--rate", type=float, default=5.0, help="Max HTTP requests per second")
+    parser.add_argument("--cache-dir", default=HTTP_CACHE_DIR,
+                        help="Persistent HTTP cache (point it at <app data>/http_cache to share it with the app)")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the API, bypassing the HTTP cache")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <json>.scrape-checkpoint)")
+    return parser.parse_args()
+
 
 def main():
-    os.makedirs(COVER_SAVE_DIR, exist_ok=True)
+    args = parse_args()
+    books_json_path = args.json
+    cover_dir = args.cover_dir
+    project_root = os.path.dirname(os.path.abspath(cover_dir))
+    checkpoint_path = args.checkpoint or books_json_path + ".scrape-checkpoint"
+    os.makedirs(cover_dir, exist_ok=True)
 
     try:
-        with open(BOOKS_JSON_PATH, 'r', encoding='utf-8') as f:
+        with open(books_json_path, 'r', encoding='utf-8') as f:
             books_data = json.load(f)
     except FileNotFoundError:
-        print(f"[!] Error: {BOOKS_JSON_PATH} not found.")
+        print(f"[!] Error: {books_json_path} not found.")
         return
     except json.JSONDecodeError:
-        print(f"[!] Error: Could not decode JSON from {BOOKS_JSON_PATH}.")
+        print(f"[!] Error: Could not decode JSON from {books_json_path}.")
         return
 
     books_updated_count = 0
-    books_processed_count = 0
+    done = load_checkpoint(checkpoint_path)
+    if done:
+        print(f"[*] Resuming: {len(done)} lookups already finished according to {checkpoint_path}")
 
-    for book_entry in books_data:
-        books_processed_count += 1
-        title = book_entry.get("titel")
-        author = book_entry.get("autor")
+    def apply_result(book_entry: dict, image_path: str | None) -> int:
+        if image_path and book_entry.get('image_path') != image_path:
+            book_entry['image_path'] = image_path
+            return 1
+        return 0
 
-        if not title or not author:
+    # Phase 1: local files and checkpointed results, no network
+    pending = []
+    for book_entry in books_data:
+        if not book_entry.get("titel") or not book_entry.get("autor"):
             print(f"[*] Skipping entry due to missing title or author: {book_entry}")
             continue
+        key = book_key(book_entry)
+        if key in done:
+            books_updated_count += apply_result(book_entry, done[key])
+            continue
+        local_image_path = find_local_image(book_entry, project_root, cover_dir)
+        if local_image_path:
+            books_updated_count += apply_result(book_entry, local_image_path)
+        else:
+            pending.append(book_entry)
 
-        current_json_image_path = book_entry.get("image_path")
-        local_image_found_and_json_updated = False
-        needs_api_call = True
-
-        # 1. Check if JSON already has a valid image_path and the file exists
-        if current_json_image_path:
-            absolute_path_from_json = os.path.join(_PROJECT_ROOT_DIR, current_json_image_path)
-            if os.path.exists(absolute_path_from_json):
-                print(f"[*] Image for '{title}' found via existing JSON path: {current_json_image_path}. File exists.")
-                local_image_found_and_json_updated = True
-                needs_api_call = False
-            else:
-                print(f"[*] Image path '{current_json_image_path}' in JSON for '{title}', but file missing. Will check conventional path or download.")
-
-        # 2. If not found via JSON path, or JSON path was invalid, check conventional local path
-        if not local_image_found_and_json_updated:
-            # Sanitize the base title once. This removes invalid characters but keeps spaces, hyphens, etc.
-            base_sanitized_title = sanitize_filename(title)
-            
-            # Create a list of possible filenames to check, in order of preference
-            # 1. Sanitized title with original spacing + .jpg
-            # 2. Sanitized title with spaces replaced by hyphens + .jpg
-            # 3. Sanitized title with spaces replaced by underscores + .jpg
-            potential_filenames_in_order = [
-                f"{base_sanitized_title}.jpg",
-                f"{base_sanitized_title.replace(' ', '-')}.jpg",
-                f"{base_sanitized_title.replace(' ', '_')}.jpg"
-            ]
-            
-            # Deduplicate the list while preserving order
-            unique_check_filenames = []
-            for fn in potential_filenames_in_order:
-                if fn not in unique_check_filenames:
-                    unique_check_filenames.append(fn)
-
-            found_conventional_file_details = None # To store (filepath, relative_json_path)
-
-            for possible_filename in unique_check_filenames:
-                expected_local_filepath = os.path.join(COVER_SAVE_DIR, possible_filename)
-                if os.path.exists(expected_local_filepath):
-                    relative_path_for_json = f"assets/{possible_filename}" # Uses forward slash
-                    found_conventional_file_details = (expected_local_filepath, relative_path_for_json)
-                    print(f"[*] Local image for '{title}' found by convention: {expected_local_filepath}")
-                    break # Found a match, use this one
-            
-            if found_conventional_file_details:
-                _local_filepath, rel_json_path = found_conventional_file_details
-                if book_entry.get('image_path') != rel_json_path:
-                    book_entry['image_path'] = rel_json_path
-                    print(f"    Updated 'image_path' in JSON to: {rel_json_path}")
-                    books_updated_count +=1
-                else:
-                    print(f"    'image_path' in JSON is already correct ({rel_json_path}).")
-                local_image_found_and_json_updated = True
-                needs_api_call = False
-
-        # 3. If no local image found by either method, attempt download via API
-        if needs_api_call:
-            print(f"[*] No valid local image found for '{title}'. Attempting download via API...")
-            downloaded_api_image_path = search_and_download_cover(title, author) # Returns "assets/filename.jpg" or None
-            if downloaded_api_image_path:
-                book_entry['image_path'] = downloaded_api_image_path
-                print(f"[*] Successfully downloaded and updated 'image_path' for '{title}' to {downloaded_api_image_path}")
-                books_updated_count +=1
+    # Phase 2: concurrent API lookups, checkpointed so an interrupted run can resume
+    print(f"[*] {len(pending)} books need an API lookup ({args.workers} workers, {args.rate} req/s)")
+    scraper = CoverScraper(api_url=args.api_url, cover_dir=cover_dir, workers=args.workers, rate=args.rate,
+                           cache_dir=None if args.no_cache else args.cache_dir)
+    finished_since_checkpoint = 0
+    failed_count = 0
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        futures = {executor.submit(scraper.search_and_download_cover, b["titel"], b["autor"]): b for b in pending}
+        for future in as_completed(futures):
+            book_entry = futures[future]
+            try:
+                image_path = future.result()
+            except LookupFailed as e:
+                print(f"[!] {e} (will be retried on the next run)")
+                failed_count += 1 # Not checkpointed: only definitive results count as done
+                continue
+            done[book_key(book_entry)] = image_path
+            if image_path:
+                books_updated_count += apply_result(book_entry, image_path)
             else:
-                print(f"[-] Could not download image for '{title}'. 'image_path' in JSON will not be updated/added for this entry.")
-            time.sleep(2)  # Rate limiting for API calls
-        elif local_image_found_and_json_updated and not needs_api_call: # Only if local image was used
-            time.sleep(0.1) # Shorter delay if local image was found and used
+                print(f"[-] Could not download image for '{book_entry['titel']}'. 'image_path' in JSON will not be updated/added for this entry.")
+            finished_since_checkpoint += 1
+            if finished_since_checkpoint >= CHECKPOINT_EVERY:
+                save_checkpoint(checkpoint_path, done)
+                finished_since_checkpoint = 0
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        save_checkpoint(checkpoint_path, done)
+        print(f"\n[!] Interrupted. Progress saved to {checkpoint_path}; run again to resume.")
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        scraper.close()
+    save_checkpoint(checkpoint_path, done)
 
     # Write the updated books data back to the JSON file
     try:
-        with open(BOOKS_JSON_PATH, 'w', encoding='utf-8') as f:
+        tmp_path = books_json_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(books_data, f, ensure_ascii=False, indent=2)
-        print(f"\n[+] Processed {books_processed_count} books. Updated {BOOKS_JSON_PATH} with {books_updated_count} changes to image paths.")
+        os.replace(tmp_path, books_json_path)
+        print(f"\n[+] Processed {len(books_data)} books. Updated {books_json_path} with {books_updated_count} changes to image paths.")
+        if failed_count:
+            print(f"[!] {failed_count} lookups failed; run again to retry only those (progress kept in {checkpoint_path}).")
+        else:
+            os.remove(checkpoint_path) # Run completed, nothing to resume
     except IOError as e:
-        print(f"[!] Error writing updated data to {BOOKS_JSON_PATH}: {e}")
+        print(f"[!] Error writing updated data to {books_json_path}: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
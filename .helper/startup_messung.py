@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Misst die Startzeit der GUI: Import-Zeiten, Zeit bis zum ersten Frame und bis zum vollständigen Inventar.
+
+Startet main.py mehrmals mit BUCHLADEN_STARTUP_MESSUNG=1 in einem temporären Benutzerverzeichnis
+(die echten Daten bleiben unberührt) und gibt die Mediane aus. Braucht ein Display (unter Linux z.B. xvfb-run).
+
+Aufruf: python .helper/startup_messung.py [--buecher N] [--laeufe 5] [--backend json|sqlite]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_SCRIPT_LOCATION_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT_DIR = os.path.abspath(os.path.join(_SCRIPT_LOCATION_DIR, os.pardir))
+sys.path.insert(0, _SCRIPT_LOCATION_DIR)
+
+from bench_buch_speicher import erzeuge_katalog  # noqa: E402
+
+APP_NAME = "DasLeseparadies" # Wie in main.py
+MESSWERTE = ("import_gui_s", "erster_frame_s", "inventar_geladen_s")
+
+
+def messe_import_zeiten(modul: str, top: int = 10) -> list:
+    """Führt 'import modul' mit -X importtime aus; liefert die teuersten Module (kumuliert, Mikrosekunden)."""
+    ergebnis = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modul}"],
+                              cwd=_PROJECT_ROOT_DIR, capture_output=True, text=True, check=True)
+    zeiten = []
+    for zeile in ergebnis.stderr.splitlines():
+        if not zeile.startswith("import time:") or "cumulative" in zeile:
+            continue
+        _selbst, kumuliert, name = zeile.split("|")
+        zeiten.append((int(kumuliert), name.rstrip()))
+    zeiten.sort(reverse=True)
+    return zeiten[:top]
+
+
+def _benutzer_umgebung(tmp: str, katalog_pfad: str | None) -> dict:
+    """Umgebung, in der main.py sein AppData-Verzeichnis unter tmp anlegt."""
+    env = dict(os.environ)
+    env["HOME"] = tmp
+    env["APPDATA"] = tmp
+    if sys.platform == "win32":
+        app_dir = os.path.join(tmp, APP_NAME)
+    else:
+        app_dir = os.path.join(tmp, "." + APP_NAME.lower())
+    os.makedirs(app_dir, exist_ok=True)
+    if katalog_pfad:
+        shutil.copy2(katalog_pfad, os.path.join(app_dir, "buecher.json"))
+    return env
+
+
+def messe_start(laeufe: int, backend: str, katalog_pfad: str | None, timeout: float) -> list:
+    messungen = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _benutzer_umgebung(tmp, katalog_pfad)
+        env["BUCHLADEN_STARTUP_MESSUNG"] = "1"
+        env["BUCHLADEN_BACKEND"] = backend
+        for lauf in range(laeufe):
+            ergebnis = subprocess.run([sys.executable, "main.py"], cwd=_PROJECT_ROOT_DIR, env=env,
+                                      capture_output=True, text=True, timeout=timeout)
+            zeilen = [z for z in ergebnis.stdout.splitlines() if z.startswith("STARTUP ")]
+            if not zeilen:
+                print(f"[!] Lauf {lauf + 1}: keine Messung (Exit-Code {ergebnis.returncode})")
+                print(ergebnis.stderr.strip()[-2000:])
+                continue
+            messungen.append(json.loads(zeilen[-1][len("STARTUP "):]))
+    return messungen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Misst Import- und Startzeiten der Buchladen-GUI.")
+    parser.add_argument("--buecher", type=int, default=0,
+                        help="Synthetischen Katalog dieser Größe verwenden (0 = mitgelieferte buecher.json)")
+    parser.add_argument("--laeufe", type=int, default=5)
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--json", action="store_true", help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args()
+
+    import_zeiten = {modul: messe_import_zeiten(modul) for modul in ("main", "buchladen_gui")}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        katalog_pfad = os.path.join(_PROJECT_ROOT_DIR, "buecher.json")
+        if args.buecher:
+            katalog_pfad = os.path.join(tmp, "katalog.json")
+            with open(katalog_pfad, "w", encoding="utf-8") as f:
+                json.dump(erzeuge_katalog(args.buecher), f, ensure_ascii=False)
+        messungen = messe_start(args.laeufe, args.backend, katalog_pfad, args.timeout)
+
+    mediane = {}
+    for schluessel in MESSWERTE:
+        werte = [m[schluessel] for m in messungen if schluessel in m]
+        if werte:
+            mediane[schluessel] = statistics.median(werte)
+
+    if args.json:
+        print(json.dumps({"imports_us": import_zeiten, "laeufe": messungen, "median": mediane}, indent=2))
+        return
+    for modul, zeiten in import_zeiten.items():
+        print(f"[*] Teuerste Imports für 'import {modul}' (kumuliert):")
+        for kumuliert, name in zeiten:
+            print(f"    {kumuliert / 1000:8.1f} ms  {name}")
+    if not messungen:
+        print("[!] Keine Startmessung möglich (kein Display?)")
+        return
+    print(f"[*] Start ({len(messungen)} Läufe, Backend {args.backend}, Median):")
+    for schluessel, wert in mediane.items():
+        print(f"    {schluessel:20s} {wert * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,9 @@
 
 class Buch:
     """Repräsentiert ein einzelnes Buch mit Titel, Autor, Kategorie und Preis."""
+    # __slots__ statt __dict__ pro Instanz: spart bei großen Katalogen den Großteil des Objekt-Overheads.
+    __slots__ = ("titel", "autor", "kategorie", "preis", "verboten", "indiziert", "image_path")
+
     def __init__(self, titel: str, autor: str, kategorie: str, preis: float, 
                  verboten: bool = False, indiziert: bool = False, image_path: str | None = None):
         self.titel = titel
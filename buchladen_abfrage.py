@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import bisect
+from operator import attrgetter
+
+# Abfragen über das Inventar: Kombination (UND) aus Kategorie, Autor, Preisbereich und Status.
+# Buchladen.abfragen wählt dafür den Index mit den wenigsten Kandidaten und prüft
+# die übrigen Bedingungen nur noch auf diesen (siehe Buchladen._plane_abfrage).
+
+
+_VERBOTEN = attrgetter("verboten")
+_INDIZIERT = attrgetter("indiziert")
+
+
+class Abfrage:
+    """Bedingungen an ein Buch; None bedeutet "egal".
+
+    Beispiel: Abfrage(kategorie="Roman", max_preis=20, indiziert=False)
+    Kategorie und Autor werden ohne Beachtung der Groß-/Kleinschreibung verglichen,
+    die Preisgrenzen sind inklusiv.
+    """
+    __slots__ = ("kategorie", "autor", "min_preis", "max_preis", "verboten", "indiziert")
+
+    def __init__(self, kategorie: str | None = None, autor: str | None = None,
+                 min_preis: float | None = None, max_preis: float | None = None,
+                 verboten: bool | None = None, indiziert: bool | None = None):
+        self.kategorie = kategorie
+        self.autor = autor
+        self.min_preis = min_preis
+        self.max_preis = max_preis
+        self.verboten = verboten
+        self.indiziert = indiziert
+
+    def _schluessel(self) -> tuple:
+        return (self.kategorie.casefold() if self.kategorie is not None else None,
+                self.autor.casefold() if self.autor is not None else None,
+                self.min_preis, self.max_preis, self.verboten, self.indiziert)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Abfrage) and self._schluessel() == other._schluessel()
+
+    def __hash__(self) -> int:
+        return hash(self._schluessel())
+
+    def __repr__(self) -> str:
+        bedingungen = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__
+                                if getattr(self, name) is not None)
+        return f"Abfrage({bedingungen})"
+
+    @property
+    def ohne_bedingungen(self) -> bool:
+        return all(getattr(self, name) is None for name in self.__slots__)
+
+    @property
+    def hat_preisbereich(self) -> bool:
+        return self.min_preis is not None or self.max_preis is not None
+
+    def pruefungen(self, abgedeckt: str = "") -> list:
+        """(funktion, soll) für die Bedingungen, die der Index abgedeckt nicht schon garantiert.
+
+        Ein Buch erfüllt die Bedingung, wenn bool(funktion(buch)) == soll. Status-Flags werden per
+        attrgetter geprüft, damit filter/filterfalse ohne Python-Aufruf pro Buch auskommen.
+        Leer, wenn nichts mehr zu prüfen ist (z.B. reine Kategorie-Abfrage über den Kategorie-Index).
+        """
+        pruefungen = []
+        if self.verboten is not None and not (abgedeckt == "verboten" and self.verboten):
+            pruefungen.append((_VERBOTEN, self.verboten))
+        if self.indiziert is not None and not (abgedeckt == "indiziert" and self.indiziert):
+            pruefungen.append((_INDIZIERT, self.indiziert))
+        if self.hat_preisbereich and abgedeckt != "preis":
+            min_preis = float("-inf") if self.min_preis is None else self.min_preis
+            max_preis = float("inf") if self.max_preis is None else self.max_preis
+            pruefungen.append((lambda buch: min_preis <= buch.preis <= max_preis, True))
+        if self.kategorie is not None and abgedeckt != "kategorie":
+            kategorie = self.kategorie.casefold()
+            pruefungen.append((lambda buch: buch.kategorie.casefold() == kategorie, True))
+        if self.autor is not None and abgedeckt != "autor":
+            autor = self.autor.casefold()
+            pruefungen.append((lambda buch: buch.autor.casefold() == autor, True))
+        return pruefungen
+
+    def passt(self, buch) -> bool:
+        """Prüft alle Bedingungen an einem einzelnen Buch."""
+        if self.verboten is not None and buch.verboten != self.verboten:
+            return False
+        if self.indiziert is not None and buch.indiziert != self.indiziert:
+            return False
+        if self.min_preis is not None and buch.preis < self.min_preis:
+            return False
+        if self.max_preis is not None and buch.preis > self.max_preis:
+            return False
+        if self.kategorie is not None and buch.kategorie.casefold() != self.kategorie.casefold():
+            return False
+        if self.autor is not None and buch.autor.casefold() != self.autor.casefold():
+            return False
+        return True
+
+
+def abfrage_fuer_filter(filter_kriterium: str | None) -> Abfrage:
+    """Übersetzt die Filterwerte der GUI ("Alle Anzeigen", "Nur FSK18", "Nur Verbotene", Kategorie)."""
+    kriterium = filter_kriterium.lower() if filter_kriterium else "alle anzeigen"
+    if kriterium == "alle anzeigen":
+        return Abfrage()
+    if kriterium == "nur fsk18":
+        return Abfrage(indiziert=True, verboten=False)
+    if kriterium == "nur verbotene":
+        return Abfrage(verboten=True)
+    return Abfrage(kategorie=filter_kriterium)
+
+
+class ErgebnisAnsicht:
+    """Lazy Sicht auf ein Abfrage-Ergebnis: Positionen ins Inventar statt kopierter Bücher.
+
+    Unterstützt len(), Index-Zugriff, Iteration und Slices (Schrittweite 1 liefert wieder eine
+    Sicht, ohne zu kopieren). positionen ist aufsteigend (Inventar-Reihenfolge), z.B. ein range
+    für "alle Bücher" oder direkt eine Positionsliste eines Index; nur [start, stop) gehört dazu,
+    später an den Index angehängte Positionen also nicht. Die Bücher werden beim Zugriff über
+    buchladen.inventar gelesen, damit die Sicht einen Wechsel des Inventar-Objekts übersteht
+    (z.B. SnapshotInventar -> Liste beim Speichern).
+    """
+    __slots__ = ("_buchladen", "_positionen", "_start", "_stop")
+
+    def __init__(self, buchladen, positionen, start: int = 0, stop: int | None = None):
+        self._buchladen = buchladen
+        self._positionen = positionen
+        self._start = start
+        self._stop = len(positionen) if stop is None else stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __bool__(self) -> bool:
+        return self._stop > self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, schritt = index.indices(len(self))
+            if schritt == 1:
+                return ErgebnisAnsicht(self._buchladen, self._positionen,
+                                       self._start + start, self._start + max(start, stop))
+            return [self[i] for i in range(start, stop, schritt)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Ergebnis-Index außerhalb des gültigen Bereichs")
+        return self._buchladen.inventar[self._positionen[self._start + index]]
+
+    def __iter__(self):
+        inventar = self._buchladen.inventar
+        for i in range(self._start, self._stop):
+            yield inventar[self._positionen[i]]
+
+    def __repr__(self) -> str:
+        return f"ErgebnisAnsicht({len(self)} Bücher)"
+
+    def position(self, index: int) -> int:
+        """Inventar-Position des Eintrags index."""
+        return self._positionen[self._start + index]
+
+    def seite(self, cursor: int = 0, anzahl: int = 50) -> tuple:
+        """Bis zu anzahl Bücher ab Inventar-Position cursor; liefert (buecher, naechster_cursor).
+
+        naechster_cursor ist None auf der letzten Seite. Weil der Cursor eine Inventar-Position
+        ist, bleibt die Blätterfolge stabil, auch wenn zwischendurch Bücher angehängt werden.
+        """
+        von = bisect.bisect_left(self._positionen, cursor, self._start, self._stop)
+        bis = min(von + anzahl, self._stop)
+        inventar = self._buchladen.inventar
+        buecher = [inventar[self._positionen[i]] for i in range(von, bis)]
+        naechster_cursor = self._positionen[bis - 1] + 1 if bis < self._stop else None
+        return buecher, naechster_cursor
+
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+PRUEF_INTERVALL_S = 2.0 # Frühestens so oft wird die mtime der bekannten Ordner verglichen
+
+
+class AssetPfade:
+    """Löst relative Asset-Pfade (z.B. "assets/1984.jpg") gegen mehrere Wurzeln auf, ohne pro Zugriff die Platte zu fragen.
+
+    Jeder Ordner wird beim ersten Bedarf einmal gelistet (Dateinamen im Speicher, mit der mtime des
+    Ordners). Danach prüft aufloesen() höchstens alle pruef_intervall_s Sekunden die mtimes und liest
+    geänderte Ordner neu. Selbst geschriebene Dateien meldet man mit bekannt_machen(), dann sind sie
+    sofort auffindbar. Die erste Wurzel, die eine Datei enthält, gewinnt.
+
+    Zu jeder Datei merkt sich das Listing (mtime_ns, Größe) aus dem scandir-Eintrag; finde() liefert
+    diese Version mit, sodass z.B. der Cover-Cache keine eigene stat-Abfrage braucht.
+    """
+    def __init__(self, wurzeln: list, pruef_intervall_s: float = PRUEF_INTERVALL_S):
+        self.wurzeln = [os.path.abspath(wurzel) for wurzel in wurzeln]
+        self.pruef_intervall_s = pruef_intervall_s
+        self._ordner = {}  # absoluter Ordner -> (mtime_ns oder None, {normcase(name): (name, version)})
+        self._naechste_pruefung = 0.0
+
+    def aufloesen(self, relativer_pfad: str) -> str | None:
+        """Absoluter Pfad der Datei in der ersten Wurzel, die sie enthält; sonst None."""
+        gefunden = self.finde(relativer_pfad)
+        return gefunden[0] if gefunden is not None else None
+
+    def finde(self, relativer_pfad: str, wurzeln: list | None = None) -> tuple | None:
+        """(absoluter Pfad, (mtime_ns, Größe)) wie bei aufloesen(); die Version stammt aus dem Listing.
+
+        Mit wurzeln wird nur in diesen (einer Teilmenge von self.wurzeln, in deren Reihenfolge) gesucht.
+        """
+        self._pruefe_aenderungen()
+        ordner, name = os.path.split(os.path.normpath(relativer_pfad.replace("\\", "/"))) # Auch unter Windows gespeicherte Pfade
+        schluessel = os.path.normcase(name)
+        for wurzel in (self.wurzeln if wurzeln is None else wurzeln):
+            absoluter_ordner = os.path.join(wurzel, ordner)
+            eintrag = self._ordner.get(absoluter_ordner)
+            if eintrag is None:
+                eintrag = self._liste(absoluter_ordner)
+            gefunden = eintrag[1].get(schluessel)
+            if gefunden is not None:
+                return os.path.join(absoluter_ordner, gefunden[0]), gefunden[1]
+        return None
+
+    def bekannt_machen(self, dateipfad: str):
+        """Trägt eine gerade geschriebene Datei ein (z.B. ein heruntergeladenes Cover)."""
+        ordner, name = os.path.split(os.path.abspath(dateipfad))
+        eintrag = self._ordner.get(ordner)
+        if eintrag is None:
+            return # Unbekannte Ordner werden ohnehin beim ersten Bedarf gelistet
+        try:
+            stat = os.stat(dateipfad)
+        except OSError:
+            return
+        eintrag[1][os.path.normcase(name)] = (name, (stat.st_mtime_ns, stat.st_size))
+
+    def vergessen(self):
+        """Verwirft alle Listings; der nächste Zugriff liest die Ordner neu."""
+        self._ordner.clear()
+
+    def _liste(self, ordner: str) -> tuple:
+        try:
+            mtime_ns = os.stat(ordner).st_mtime_ns
+            namen = {}
+            with os.scandir(ordner) as eintraege:
+                for e in eintraege:
+                    if e.is_file():
+                        stat = e.stat() # Unter Windows ohne weiteren Systemaufruf
+                        namen[os.path.normcase(e.name)] = (e.name, (stat.st_mtime_ns, stat.st_size))
+        except OSError: # Ordner fehlt (noch): merken, damit nicht jeder Zugriff erneut fragt
+            mtime_ns, namen = None, {}
+        eintrag = self._ordner[ordner] = (mtime_ns, namen)
+        return eintrag
+
+    def _pruefe_aenderungen(self):
+        jetzt = time.monotonic()
+        if jetzt < self._naechste_pruefung:
+            return
+        self._naechste_pruefung = jetzt + self.pruef_intervall_s
+        for ordner, (mtime_ns, _namen) in list(self._ordner.items()):
+            try:
+                aktuell = os.stat(ordner).st_mtime_ns
+            except OSError:
+                aktuell = None
+            if aktuell != mtime_ns:
+                self._liste(ordner)
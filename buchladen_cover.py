@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import buchladen_metriken as metriken
+# PIL wird erst beim ersten Cover importiert, damit das Hauptfenster schneller erscheint
+
+THUMBNAIL_GROESSE = (180, 260)
+THUMBNAIL_CACHE_ORDNER = "thumbnails"
+
+
+def verkleinere(bild, groesse: tuple = THUMBNAIL_GROESSE):
+    """Bringt ein PIL-Bild auf Thumbnail-Größe (auch für die vorgerenderten Thumbnails im Cover-Archiv)."""
+    from PIL import Image
+    return bild.convert("RGB").resize(groesse, Image.Resampling.LANCZOS)
+
+
+class CoverCache:
+    """Zweistufiger Cache für Cover-Thumbnails.
+
+    Stufe 1: LRU fertiger PhotoImage-Objekte im Speicher, begrenzt durch ein Byte-Budget.
+    Stufe 2: verkleinerte Thumbnails auf der Platte, Schlüssel aus Quellpfad, Version (mtime und Größe) und Zielgröße.
+    Quellen im Cover-Archiv (archiv, siehe buchladen_cover_archiv) brauchen Stufe 2 nicht: ihre
+    Thumbnails liegen dort schon in Zielgröße vor. Als Quelle dient dann der Name im Archiv.
+    """
+    def __init__(self, cache_dir: str, speicher_budget_bytes: int = 32 * 1024 * 1024,
+                 groesse: tuple = THUMBNAIL_GROESSE, archiv=None):
+        self.cache_dir = cache_dir
+        self.speicher_budget_bytes = speicher_budget_bytes
+        self.groesse = groesse
+        # Ein Archiv mit anderer Thumbnail-Größe wird nicht verwendet (die Dateien im Ordner schon)
+        self.archiv = archiv if archiv is not None and archiv.groesse == tuple(groesse) else None
+        self._lru = OrderedDict()  # quell_pfad -> (version, PhotoImage, bytes)
+        self._belegt_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def version(self, quell_pfad: str):
+        """(mtime_ns, Größe) der Datei bzw. Kennung des Archivs; Schlüssel neben quell_pfad.
+
+        Wirft OSError, wenn die Datei fehlt. Die GUI nimmt die Version stattdessen aus dem
+        Listing von AssetPfade.finde() und spart sich damit den stat-Aufruf.
+        """
+        if self.archiv is not None and quell_pfad in self.archiv:
+            return self.archiv.kennung
+        stat = os.stat(quell_pfad)
+        return stat.st_mtime_ns, stat.st_size
+
+    def aus_speicher(self, quell_pfad: str, version):
+        """PhotoImage aus dem Speicher-LRU oder None."""
+        eintrag = self._lru.get(quell_pfad)
+        if eintrag is None or eintrag[0] != version:
+            return None
+        self._lru.move_to_end(quell_pfad)
+        return eintrag[1]
+
+    def lade(self, quell_pfad: str, version=None):
+        """Liefert ein PhotoImage für quell_pfad in Zielgröße (wirft OSError, wenn die Datei fehlt)."""
+        if version is None:
+            version = self.version(quell_pfad)
+        photo = self.aus_speicher(quell_pfad, version)
+        if photo is not None:
+            return photo
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(self.lade_thumbnail(quell_pfad, version))
+        self.merke(quell_pfad, version, photo)
+        return photo
+
+    def merke(self, quell_pfad: str, version, photo):
+        """Legt ein PhotoImage im Speicher-LRU ab und verdrängt die ältesten Einträge über dem Budget."""
+        alt = self._lru.pop(quell_pfad, None)
+        if alt is not None:
+            self._belegt_bytes -= alt[2]
+        groesse_bytes = photo.width() * photo.height() * 4 # RGBA im Tk-Speicher
+        self._lru[quell_pfad] = (version, photo, groesse_bytes)
+        self._belegt_bytes += groesse_bytes
+        while self._belegt_bytes > self.speicher_budget_bytes and len(self._lru) > 1:
+            _pfad, (_version, _photo, freigegeben) = self._lru.popitem(last=False)
+            self._belegt_bytes -= freigegeben
+
+    def _thumbnail_pfad(self, quell_pfad: str, version) -> str:
+        schluessel = f"{os.path.abspath(quell_pfad)}|{version}|{self.groesse[0]}x{self.groesse[1]}"
+        return os.path.join(self.cache_dir, hashlib.sha1(schluessel.encode("utf-8")).hexdigest() + ".jpg")
+
+    def lade_thumbnail(self, quell_pfad: str, version):
+        """Liest das Thumbnail aus dem Archiv, vom Platten-Cache oder erzeugt es (ohne Tk, daher auch in Threads nutzbar)."""
+        if self.archiv is not None and quell_pfad in self.archiv:
+            with metriken.messe("cover.archiv_lesen"):
+                thumbnail = self.archiv.thumbnail(quell_pfad)
+            metriken.zaehle("cover.archiv_treffer")
+            return thumbnail
+        from PIL import Image
+        thumb_pfad = self._thumbnail_pfad(quell_pfad, version)
+        try:
+            with metriken.messe("cover.thumbnail_lesen"), Image.open(thumb_pfad) as img:
+                img.load()
+            metriken.zaehle("cover.thumbnail_treffer")
+            return img
+        except (OSError, ValueError):
+            pass # Noch nicht im Cache oder beschädigt: neu erzeugen
+
+        metriken.zaehle("cover.thumbnail_erzeugt")
+        with metriken.messe("cover.dekodieren"), Image.open(quell_pfad) as img:
+            thumbnail = verkleinere(img, self.groesse)
+        try:
+            tmp_pfad = f"{thumb_pfad}.{os.getpid()}.tmp"
+            thumbnail.save(tmp_pfad, "JPEG", quality=90)
+            os.replace(tmp_pfad, thumb_pfad)
+        except OSError as e:
+            print(f"Warnung: Thumbnail konnte nicht gecacht werden: {e}")
+        return thumbnail
+
+
+class CoverLader:
+    """Dekodiert Cover in einem Thread-Pool und übergibt sie per after() an den Tk-Thread.
+
+    PhotoImage-Objekte entstehen nur im Tk-Thread. Ergebnisse veralteter Anfragen werden
+    nicht mehr angezeigt, landen aber im Cache (genau wie vorgeladene Nachbar-Cover).
+    """
+    def __init__(self, tk_root, cache: CoverCache, max_workers: int = 2, poll_ms: int = 15):
+        self.tk_root = tk_root
+        self.cache = cache
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cover")
+        self._ergebnisse = queue.Queue()
+        self._in_arbeit = set()      # Quellpfade, die gerade dekodiert werden
+        self._wartend = None         # (quell_pfad, callback, bei_fehler) der aktuellen Anzeige
+        self._poll_geplant = False
+
+    def anfordern(self, quell_pfad: str, version, callback, bei_fehler=None) -> bool:
+        """Fordert ein Cover zur Anzeige an; callback(photo) läuft im Tk-Thread.
+
+        version ist die des Aufrufers (siehe CoverCache.version), damit pro Klick kein stat nötig ist.
+        Gibt True zurück, wenn das Bild sofort aus dem Speicher kam (callback wurde schon aufgerufen).
+        Eine neue Anfrage macht alle vorherigen veraltet.
+        """
+        self._wartend = None # Ältere Anfrage ist damit veraltet
+        photo = self.cache.aus_speicher(quell_pfad, version)
+        if photo is not None:
+            metriken.zaehle("cover.speicher_treffer")
+            callback(photo)
+            return True
+        self._wartend = (quell_pfad, callback, bei_fehler)
+        self._starte(quell_pfad, version)
+        return False
+
+    def verwerfen(self):
+        """Die aktuelle Anzeige-Anfrage wird nicht mehr gebraucht (z.B. weil die Auswahl aufgehoben wurde)."""
+        self._wartend = None
+
+    def vorladen(self, quellen):
+        """Dekodiert Cover im Hintergrund in den Cache, ohne sie anzuzeigen; quellen: [(quell_pfad, version), ...]."""
+        for quell_pfad, version in quellen:
+            if quell_pfad not in self._in_arbeit and self.cache.aus_speicher(quell_pfad, version) is None:
+                self._starte(quell_pfad, version)
+
+    def _starte(self, quell_pfad: str, version):
+        if quell_pfad in self._in_arbeit:
+            return # Läuft schon (z.B. als Prefetch); das Ergebnis bedient auch die Anzeige
+        self._in_arbeit.add(quell_pfad)
+        self._executor.submit(self._dekodiere, quell_pfad, version)
+        if not self._poll_geplant:
+            self._poll_geplant = True
+            self.tk_root.after(self.poll_ms, self._poll)
+
+    def _dekodiere(self, quell_pfad: str, version):
+        """Läuft im Worker-Thread: nur Dateizugriff und PIL, kein Tk."""
+        try:
+            self._ergebnisse.put((quell_pfad, version, self.cache.lade_thumbnail(quell_pfad, version), None))
+        except Exception as e:
+            self._ergebnisse.put((quell_pfad, None, None, e))
+
+    def _poll(self):
+        """Läuft im Tk-Thread (per after): übernimmt fertige Bilder."""
+        while True:
+            try:
+                quell_pfad, version, bild, fehler = self._ergebnisse.get_nowait()
+            except queue.Empty:
+                break
+            self._in_arbeit.discard(quell_pfad)
+            wartend = None
+            if self._wartend is not None and self._wartend[0] == quell_pfad:
+                wartend, self._wartend = self._wartend, None
+            if fehler is not None:
+                if wartend is not None and wartend[2] is not None:
+                    wartend[2](fehler)
+                continue
+            from PIL import ImageTk
+            photo = ImageTk.PhotoImage(bild)
+            self.cache.merke(quell_pfad, version, photo)
+            if wartend is not None:
+                wartend[1](photo)
+        if self._in_arbeit:
+            self.tk_root.after(self.poll_ms, self._poll)
+        else:
+            self._poll_geplant = False
+
+    def schliessen(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
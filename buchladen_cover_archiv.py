@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import io
+import mmap
+import os
+import struct
+from buchladen_cover import THUMBNAIL_GROESSE, verkleinere
+from buchladen_journal import schreibe_datei_atomar
+# PIL wird nur zum Bauen und beim Lesen eines Thumbnails importiert
+
+# Alle mitgelieferten Cover in einer Datei, die zur Laufzeit per mmap eingeblendet wird.
+# Gebaut mit .helper/baue_cover_archiv.py; PyInstaller muss dann nur noch diese eine Datei
+# entpacken statt des assets-Ordners, und die Thumbnails liegen schon in Anzeigegröße vor.
+#
+# Aufbau (little-endian):
+#   Header       _HEADER, u.a. Thumbnail-Größe und Lage des Verzeichnisses
+#   Daten        je Cover das Thumbnail (JPEG) und optional das Original
+#   Verzeichnis  anzahl x _EINTRAG: Name (offset, länge), Thumbnail und Original (offset, länge)
+#   Namen        UTF-8-Blob der Namen, z.B. "assets/1984.jpg" (wie image_path in der buecher.json)
+
+COVER_ARCHIV_DATEINAME = "cover_archiv.bin"
+ARCHIV_MAGIC = b"BUCHCOVR"
+ARCHIV_VERSION = 1
+
+_HEADER = struct.Struct("<8sIHHIQQ")  # magic, version, breite, höhe, anzahl, verzeichnis_offset, namen_offset
+_EINTRAG = struct.Struct("<QIQIQI")   # name, thumbnail, original (je offset, länge); länge 0 = nicht enthalten
+
+
+def archiv_name(image_path: str) -> str:
+    """Schlüssel im Archiv für einen image_path (Schrägstriche, ohne führendes "./")."""
+    name = image_path.replace("\\", "/")
+    while name.startswith("./"):
+        name = name[2:]
+    return name
+
+
+def schreibe_cover_archiv(archiv_dateipfad: str, wurzel: str, relative_pfade: list,
+                          groesse: tuple = THUMBNAIL_GROESSE, mit_originalen: bool = False) -> int:
+    """Packt die Bilder wurzel/relative_pfade mit vorgerenderten Thumbnails; liefert die Anzahl gepackter Cover.
+
+    Nicht lesbare Bilder werden mit einer Warnung übersprungen.
+    """
+    from PIL import Image
+    daten = bytearray()
+    eintraege = []  # (name_bytes, thumb_offset, thumb_laenge, orig_offset, orig_laenge), Offsets relativ zu daten
+    for relativer_pfad in relative_pfade:
+        pfad = os.path.join(wurzel, relativer_pfad)
+        try:
+            with open(pfad, 'rb') as f:
+                original = f.read()
+            with Image.open(io.BytesIO(original)) as img:
+                puffer = io.BytesIO()
+                verkleinere(img, groesse).save(puffer, "JPEG", quality=90)
+        except (OSError, ValueError) as e:
+            print(f"Warnung: '{pfad}' wird nicht ins Cover-Archiv übernommen: {e}")
+            continue
+        thumbnail = puffer.getvalue()
+        thumb_offset = len(daten)
+        daten += thumbnail
+        orig_offset, orig_laenge = 0, 0
+        if mit_originalen:
+            orig_offset, orig_laenge = len(daten), len(original)
+            daten += original
+        eintraege.append((archiv_name(relativer_pfad).encode("utf-8"), thumb_offset, len(thumbnail),
+                          orig_offset, orig_laenge))
+
+    daten_offset = _HEADER.size
+    verzeichnis_offset = daten_offset + len(daten)
+    namen_offset = verzeichnis_offset + _EINTRAG.size * len(eintraege)
+    verzeichnis = bytearray()
+    namen = bytearray()
+    for name, thumb_offset, thumb_laenge, orig_offset, orig_laenge in eintraege:
+        verzeichnis += _EINTRAG.pack(len(namen), len(name), daten_offset + thumb_offset, thumb_laenge,
+                                     daten_offset + orig_offset if orig_laenge else 0, orig_laenge)
+        namen += name
+    header = _HEADER.pack(ARCHIV_MAGIC, ARCHIV_VERSION, groesse[0], groesse[1], len(eintraege),
+                          verzeichnis_offset, namen_offset)
+
+    def schreiben(f):
+        f.write(header)
+        f.write(daten)
+        f.write(verzeichnis)
+        f.write(namen)
+
+    schreibe_datei_atomar(archiv_dateipfad, schreiben, binaer=True)
+    return len(eintraege)
+
+
+class CoverArchiv:
+    """Per mmap eingeblendetes Cover-Archiv; Öffnen liest nur Header und Verzeichnis.
+
+    Lesen ist aus mehreren Threads möglich (die Cover werden im Thread-Pool des CoverLader dekodiert).
+    """
+    def __init__(self, archiv_dateipfad: str):
+        self.dateipfad = archiv_dateipfad
+        with open(archiv_dateipfad, 'rb') as f:
+            self.kennung = os.fstat(f.fileno()).st_mtime_ns # Versionsstempel für den Speicher-Cache
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._lies_verzeichnis()
+        except (ValueError, struct.error, UnicodeDecodeError):
+            self._mm.close()
+            raise
+
+    def _lies_verzeichnis(self):
+        if len(self._mm) < _HEADER.size:
+            raise ValueError("Cover-Archiv ist zu kurz")
+        magic, version, breite, hoehe, anzahl, verzeichnis_offset, namen_offset = _HEADER.unpack_from(self._mm, 0)
+        if magic != ARCHIV_MAGIC or version != ARCHIV_VERSION:
+            raise ValueError("Unbekanntes Cover-Archiv-Format")
+        if namen_offset != verzeichnis_offset + _EINTRAG.size * anzahl or namen_offset > len(self._mm):
+            raise ValueError("Cover-Archiv ist unvollständig oder beschädigt")
+        self.groesse = (breite, hoehe)
+        self._eintraege = {}  # name -> (thumb_offset, thumb_laenge, orig_offset, orig_laenge)
+        for i in range(anzahl):
+            name_offset, name_laenge, *lage = _EINTRAG.unpack_from(self._mm, verzeichnis_offset + i * _EINTRAG.size)
+            start = namen_offset + name_offset
+            if start + name_laenge > len(self._mm) or max(lage[0] + lage[1], lage[2] + lage[3]) > verzeichnis_offset:
+                raise ValueError("Cover-Archiv ist unvollständig oder beschädigt")
+            self._eintraege[str(self._mm[start:start + name_laenge], "utf-8")] = tuple(lage)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._eintraege
+
+    def __len__(self) -> int:
+        return len(self._eintraege)
+
+    def namen(self) -> list:
+        return list(self._eintraege)
+
+    def thumbnail(self, name: str):
+        """Das vorgerenderte Thumbnail als PIL-Bild (KeyError, wenn name fehlt)."""
+        from PIL import Image
+        offset, laenge, _orig_offset, _orig_laenge = self._eintraege[name]
+        with Image.open(io.BytesIO(self._mm[offset:offset + laenge])) as img:
+            img.load()
+        return img
+
+    def original(self, name: str) -> bytes | None:
+        """Die Originaldatei, falls sie mit gepackt wurde."""
+        _offset, _laenge, orig_offset, orig_laenge = self._eintraege[name]
+        return self._mm[orig_offset:orig_offset + orig_laenge] if orig_laenge else None
+
+    def schliessen(self):
+        self._mm.close()
+
+
+def oeffne_cover_archiv(archiv_dateipfad: str) -> CoverArchiv | None:
+    """Öffnet das Archiv; None, wenn es fehlt (z.B. im Quellcode ohne Build-Schritt) oder unbrauchbar ist."""
+    if not os.path.exists(archiv_dateipfad):
+        return None
+    try:
+        return CoverArchiv(archiv_dateipfad)
+    except (OSError, ValueError) as e:
+        print(f"Cover-Archiv '{archiv_dateipfad}' unbrauchbar, verwende einzelne Dateien: {e}")
+        return None
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import itertools
+import json
+import os
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import buchladen_metriken as metriken
+from buchladen_http_cache import HttpCache, suchschluessel
+
+GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+HEADERS = {"User-Agent": "Mozilla/5.0 (BuchladenApp/1.0)"}
+
+# Job-Status
+WARTEND = "wartend"
+LAEUFT = "läuft"
+FERTIG = "fertig"
+KEIN_TREFFER = "kein Treffer"
+FEHLGESCHLAGEN = "fehlgeschlagen"
+ABGEBROCHEN = "abgebrochen"
+ENDZUSTAENDE = (FERTIG, KEIN_TREFFER, FEHLGESCHLAGEN, ABGEBROCHEN)
+
+
+class _Abgebrochen(Exception):
+    pass
+
+
+class DownloadJob:
+    """Ein Cover-Download; status und fehler können jederzeit (z.B. von der GUI) abgefragt werden."""
+    def __init__(self, job_id: int, titel: str, autor: str, ziel_pfad: str):
+        self.job_id = job_id
+        self.titel = titel
+        self.autor = autor
+        self.ziel_pfad = ziel_pfad
+        self.status = WARTEND
+        self.fehler = None
+        self._abbruch = threading.Event()
+        self._abgeholt = False # Endzustand wurde schon einmal abgefragt
+
+    @property
+    def beendet(self) -> bool:
+        return self.status in ENDZUSTAENDE
+
+
+class CoverDownloadManager:
+    """Lädt Buchcover über die Google Books API im Hintergrund.
+
+    Ein begrenzter Worker-Pool teilt sich eine requests.Session (Verbindungen werden
+    wiederverwendet). Die GUI fragt den Status per job_id ab, statt zu blockieren.
+    requests wird erst beim ersten Download importiert, damit der Programmstart schnell bleibt.
+    Mit http_cache werden Suchantworten und Bilder nur einmal aus dem Netz geladen.
+    Beendete Jobs, deren Endzustand schon abgefragt wurde, werden beim nächsten starte() vergessen.
+    """
+    def __init__(self, max_workers: int = 3, api_url: str = GOOGLE_BOOKS_API_URL, http_cache: HttpCache | None = None):
+        self.api_url = api_url
+        self.http_cache = http_cache
+        self.max_workers = max_workers
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cover-download")
+        self._jobs = {}
+        self._naechste_id = itertools.count(1)
+
+    def starte(self, titel: str, autor: str, ziel_pfad: str) -> int:
+        """Reiht einen Download ein und gibt sofort die job_id zurück."""
+        for job_id in [job_id for job_id, job in self._jobs.items() if job._abgeholt]:
+            del self._jobs[job_id] # Sonst wächst _jobs mit jedem Download
+        job = DownloadJob(next(self._naechste_id), titel, autor, ziel_pfad)
+        self._jobs[job.job_id] = job
+        self._executor.submit(self._ausfuehren, job)
+        return job.job_id
+
+    def job(self, job_id: int) -> DownloadJob | None:
+        """Der Job zu job_id; None, wenn er unbekannt ist oder nach seinem Ende schon vergessen wurde."""
+        job = self._jobs.get(job_id)
+        if job is not None and job.beendet:
+            job._abgeholt = True
+        return job
+
+    def status(self, job_id: int) -> str | None:
+        job = self.job(job_id)
+        return job.status if job is not None else None
+
+    def abbrechen(self, job_id: int) -> bool:
+        """Bricht einen wartenden oder laufenden Download ab; False, wenn er schon beendet ist."""
+        job = self._jobs.get(job_id)
+        if job is None or job.beendet:
+            return False
+        job._abbruch.set()
+        return True
+
+    @property
+    def session(self):
+        """Die gemeinsame requests.Session; wird beim ersten Zugriff angelegt."""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def schliessen(self):
+        for job in self._jobs.values():
+            job._abbruch.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._session is not None:
+            self._session.close()
+
+    def _ausfuehren(self, job: DownloadJob):
+        from requests.exceptions import RequestException
+        if job._abbruch.is_set():
+            job.status = ABGEBROCHEN
+            return
+        job.status = LAEUFT
+        start_ns = metriken.jetzt_ns()
+        try:
+            job.status = FERTIG if self._lade_cover(job) else KEIN_TREFFER
+        except _Abgebrochen:
+            job.status = ABGEBROCHEN
+        except (RequestException, ValueError, OSError) as e:
+            print(f"[!] Fehler bei der Cover-Suche/Download für '{job.titel}': {e}")
+            job.fehler = e
+            job.status = FEHLGESCHLAGEN
+        metriken.erfasse_seit("download.job", start_ns)
+        metriken.zaehle(f"download.{job.status}")
+
+    def _abrufen(self, url: str, headers: dict, timeout: float):
+        return self.session.get(url, headers=headers, timeout=timeout)
+
+    def _hole(self, url: str, timeout: float, schluessel: str | None = None) -> bytes:
+        if self.http_cache is None:
+            response = self._abrufen(url, {}, timeout)
+            response.raise_for_status()
+            return response.content
+        return self.http_cache.hole(url, lambda u, h: self._abrufen(u, h, timeout), schluessel)
+
+    def _lade_cover(self, job: DownloadJob) -> bool:
+        if os.path.exists(job.ziel_pfad):
+            print(f"[*] Bild existiert bereits unter {job.ziel_pfad}. Überspringe Download.")
+            return True
+
+        query = urllib.parse.quote_plus(f"{job.titel} {job.autor}")
+        print(f"[*] Suche Cover für '{job.titel}' via Google Books API...")
+        data = json.loads(self._hole(f"{self.api_url}?q={query}", 10, suchschluessel(self.api_url, job.titel, job.autor)))
+        if job._abbruch.is_set():
+            raise _Abgebrochen()
+
+        if not data.get("items"):
+            print(f"[-] Keine Treffer für '{job.titel}' in Google Books API gefunden.")
+            return False
+        image_links = data["items"][0].get("volumeInfo", {}).get("imageLinks", {})
+        img_url = (image_links.get("large") or
+                   image_links.get("medium") or
+                   image_links.get("thumbnail") or
+                   image_links.get("smallThumbnail"))
+        if not img_url or not isinstance(img_url, str):
+            print(f"[-] Kein passender Bildlink für '{job.titel}' in API-Antwort gefunden.")
+            return False
+        if img_url.startswith("//"): # Handle protocol-relative URLs
+            img_url = "https:" + img_url
+
+        print(f"[*] Lade Cover für '{job.titel}' von {img_url}...")
+        bild = self._hole(img_url, 15)
+        if job._abbruch.is_set():
+            raise _Abgebrochen()
+        os.makedirs(os.path.dirname(job.ziel_pfad), exist_ok=True)
+        tmp_pfad = job.ziel_pfad + ".part"
+        with open(tmp_pfad, 'wb') as f:
+            f.write(bild)
+        os.replace(tmp_pfad, job.ziel_pfad) # Erst vollständig, dann sichtbar
+        print(f"[+] Cover gespeichert: {job.ziel_pfad}")
+        return True
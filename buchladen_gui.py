@@ -2,14 +2,19 @@
 import customtkinter as ctk
 import tkinter as tk  # Only for messagebox/simpledialog
 import os
+import queue
+import threading
 from tkinter import messagebox, simpledialog
+import buchladen_metriken as metriken
 from buch_model import Buch
-from PIL import Image, ImageTk
-from buchladen_logik import Buchladen
-import requests # For image downloading
-import json # For handling JSONDecodeError
-import urllib.parse # For URL encoding image search query
-import time # For potential rate limiting (though less critical for single downloads)
+from buchladen_asset_pfade import AssetPfade
+from buchladen_cover import CoverCache, CoverLader, THUMBNAIL_CACHE_ORDNER
+from buchladen_cover_archiv import COVER_ARCHIV_DATEINAME, archiv_name, oeffne_cover_archiv
+from buchladen_download import CoverDownloadManager, FERTIG, KEIN_TREFFER, ABGEBROCHEN
+from buchladen_http_cache import HttpCache
+from buchladen_logik import Buchladen, lese_buecher_aus_json
+from buchladen_warenkorb import Warenkorb, GEAENDERT, HINZUGEFUEGT
+from buchladen_widgets import RenderPlaner, VirtuelleListe
 
 
 # Globale Design-Konstanten (könnten auch in eine config.py)
@@ -30,16 +35,43 @@ COLOR_BUTTON_PRIMARY_FG = "#FFFFFF"
 COLOR_BUTTON_PRIMARY_HOVER_BG = "#1976D2"
 COLOR_BUTTON_PRIMARY_PRESSED_BG = "#0D47A1"
 
+COVER_CACHE_BUDGET_BYTES = 32 * 1024 * 1024 # Speicherbudget für fertige Cover-Bilder (~180 Cover)
+COVER_PREFETCH_NACHBARN = 2 # So viele Bücher ober- und unterhalb der Auswahl werden vorgeladen
+DOWNLOAD_POLL_MS = 250 # Wie oft die GUI den Status laufender Cover-Downloads abfragt
+HTTP_CACHE_ORDNER = "http_cache" # Google-Books-Antworten und Bilder, geteilt mit .helper/scrape_pics.py
+INVENTAR_LADE_POLL_MS = 100 # Wie oft der Tk-Thread fertig gelesene Bücher übernimmt
+INVENTAR_LADE_BATCHES_PRO_TICK = 10 # Höchstens so viele Batches pro Tick, damit die GUI bedienbar bleibt
+SUCHINDEX_POLL_MS = 200 # Wie oft eine Suche nachsieht, ob der Suchindex im Hintergrund fertig ist
+
 
 class BuchladenApp:
     def __init__(self, root_window, buchladen_instanz: Buchladen, json_dateipfad: str, get_resource_path_func, user_app_data_dir: str):
         self.root = root_window
         self.buchladen = buchladen_instanz
         self.json_dateipfad = json_dateipfad # JSON-Pfad speichern
-        self.einkaufswagen = []
+        self.einkaufswagen = Warenkorb()
+        self.einkaufswagen.abonnieren(self._on_warenkorb_geaendert)
         self.aktuell_angezeigte_buecher = [] # Wichtig für korrekte Auswahl
         self.user_app_data_dir = user_app_data_dir # Store user's app data directory path
         self.get_resource_path = get_resource_path_func # Store the path resolving function
+        # Cover-Dateien: erst Benutzer-AppData, dann mitgelieferte Assets (Ordner werden nur einmal gelistet)
+        self._asset_pfade = AssetPfade([user_app_data_dir, self.get_resource_path("")])
+        # Mitgelieferte Cover mit fertigen Thumbnails (falls der Build-Schritt gelaufen ist)
+        self._cover_archiv = oeffne_cover_archiv(self.get_resource_path(COVER_ARCHIV_DATEINAME))
+        self._cover_cache = CoverCache(os.path.join(user_app_data_dir, THUMBNAIL_CACHE_ORDNER),
+                                       speicher_budget_bytes=COVER_CACHE_BUDGET_BYTES, archiv=self._cover_archiv)
+        self._cover_lader = CoverLader(self.root, self._cover_cache)
+        self._http_cache = HttpCache(os.path.join(user_app_data_dir, HTTP_CACHE_ORDNER))
+        self.download_manager = CoverDownloadManager(http_cache=self._http_cache)
+        self._beobachtete_downloads = set()
+        self.inventar_vollstaendig = True # False, solange lade_inventar_im_hintergrund läuft
+        self._lade_warteschlange = None
+        self._lade_fortschritt = (0, 0) # (gelesene_bytes, gesamt_bytes), vom Lade-Thread gesetzt
+        self._zeigt_suchergebnis = False
+        self._suche_job = None # after-ID einer Suche, die auf den Suchindex wartet
+        self._lade_start_ns = None
+        self._cover_anfrage_ns = None # Für die Metrik "cover.anzeige" (Auswahl bis Bild sichtbar)
+        self._render_planer = RenderPlaner(self.root) # Fasst Neuaufbauten der Inventarliste zusammen
 
         self.buch_bild_label = None # Initialisiere das Bild-Label Attribut
         self.root.title("Das Leseparadies - GUI")
@@ -52,7 +84,20 @@ class BuchladenApp:
 
         self._erstelle_widgets()
         self._update_inventar_anzeige() # Initiales Füllen mit allen Büchern
+        self._aktualisiere_wagen_anzeige() # Leerer Wagen; danach nur noch zeilenweise Updates
         self._erstelle_menuleiste() # Menüleiste erstellen
+        # Pfeiltasten blättern durch das Inventar
+        self.root.bind("<Up>", lambda event: self._bewege_inventar_auswahl(-1))
+        self.root.bind("<Down>", lambda event: self._bewege_inventar_auswahl(1))
+
+    def schliessen(self):
+        """Gibt Hintergrund-Ressourcen frei (nach dem Ende der mainloop aufrufen)."""
+        self.buchladen.warte_auf_snapshot()
+        self._cover_lader.schliessen()
+        if self._cover_archiv is not None:
+            self._cover_archiv.schliessen()
+        self.download_manager.schliessen()
+        self._http_cache.schliessen()
 
     def _erstelle_widgets(self):
         main_frame = ctk.CTkFrame(self.root)
@@ -75,14 +120,22 @@ class BuchladenApp:
         self.kategorie_dropdown.pack(side="left", padx=5)
         self.kategorie_dropdown.set("Alle Anzeigen")
 
+        # Volltextsuche über Titel und Autor (Enter startet die Suche, leeres Feld zeigt wieder den Filter)
+        self.suche_var = tk.StringVar()
+        suche_entry = ctk.CTkEntry(filter_frame, textvariable=self.suche_var, width=250,
+                                   placeholder_text="Titel oder Autor suchen...")
+        suche_entry.pack(side="right", padx=5)
+        suche_entry.bind("<Return>", self._on_suche)
+        ctk.CTkLabel(filter_frame, text="Suche:", font=(FONT_FAMILY, FONT_SIZE_DEFAULT, "bold")).pack(side="right", padx=(10,5))
+
         # --- Linke Spalte: Inventar ---
         inventar_frame = ctk.CTkFrame(main_frame)
         inventar_frame.grid(row=1, column=0, padx=5, pady=5, sticky="nswe")
         inventar_frame.rowconfigure(0, weight=1)
         inventar_frame.columnconfigure(0, weight=1)
 
-        # Stelle sicher, dass CTkScrollableFrame verwendet wird!
-        self.inventar_scroll = ctk.CTkScrollableFrame(inventar_frame, width=400, height=400)
+        # Virtualisierte Liste: nur sichtbare Zeilen bekommen Widgets
+        self.inventar_scroll = VirtuelleListe(inventar_frame, on_select=self._on_inventar_auswahl, width=400, height=400)
         self.inventar_scroll.grid(row=0, column=0, sticky="nswe", padx=(5,0), pady=(5,0))
 
         # --- Mittlere Spalte: Buttons ---
@@ -100,7 +153,7 @@ class BuchladenApp:
         wagen_frame.rowconfigure(0, weight=1)
         wagen_frame.columnconfigure(0, weight=1)
 
-        self.wagen_scroll = ctk.CTkScrollableFrame(wagen_frame, width=400, height=400)
+        self.wagen_scroll = VirtuelleListe(wagen_frame, on_select=self._on_wagen_auswahl, width=400, height=400)
         self.wagen_scroll.grid(row=0, column=0, sticky="nswe", padx=(5,0), pady=(5,0))
 
         # --- Bildanzeige (Neue Spalte 3) ---
@@ -115,6 +168,8 @@ class BuchladenApp:
         self.total_label_var = tk.StringVar(value="Gesamtpreis: 0,00 €")
         total_label = ctk.CTkLabel(kasse_frame, textvariable=self.total_label_var, font=(FONT_FAMILY, FONT_SIZE_TOTAL_LABEL, "bold"))
         total_label.pack(side="left", padx=10)
+        self.lade_status_var = tk.StringVar(value="")
+        ctk.CTkLabel(kasse_frame, textvariable=self.lade_status_var).pack(side="left", padx=10)
         self.kasse_button = ctk.CTkButton(kasse_frame, text="Zur Kasse", command=self._zur_kasse)
         self.kasse_button.pack(side="right", padx=10)
 
@@ -127,34 +182,152 @@ class BuchladenApp:
     def _erstelle_menuleiste(self):
         menubar = tk.Menu(self.root)
         datei_menu = tk.Menu(menubar, tearoff=0)
-        datei_menu.add_command(label="Buch hinzufügen", command=self._buch_hinzufuegen_dialog)
+        datei_menu.add_command(label="Buch hinzufügen", command=self._buch_hinzufuegen_dialog,
+                               state="normal" if self.inventar_vollstaendig else "disabled")
+        self.datei_menu = datei_menu
         datei_menu.add_separator()
         datei_menu.add_command(label="Beenden", command=self.root.quit)
         menubar.add_cascade(label="Datei", menu=datei_menu)
         self.root.config(menu=menubar)
 
+    def lade_inventar_im_hintergrund(self, dateipfad: str):
+        """Liest die JSON-Datei in einem Thread; der Tk-Thread übernimmt die Bücher batchweise.
+
+        Das Fenster ist sofort bedienbar. Bis das Laden abgeschlossen ist, bleibt
+        "Buch hinzufügen" gesperrt, weil Journal-Positionen das vollständige Inventar voraussetzen.
+        Ein aktueller Snapshot wird dagegen direkt eingeblendet.
+        """
+        if self.buchladen.lade_snapshot(dateipfad):
+            self.buchladen.spiele_journal_ab(dateipfad)
+            self.inventar_bereit()
+            return
+        self.inventar_vollstaendig = False
+        self._lade_start_ns = metriken.jetzt_ns()
+        self.datei_menu.entryconfigure("Buch hinzufügen", state="disabled")
+        self.lade_status_var.set("Inventar wird geladen...")
+        self._lade_warteschlange = queue.Queue()
+        self._lade_fortschritt = (0, 0)
+
+        def lesen():
+            try:
+                for batch in lese_buecher_aus_json(dateipfad, fortschritt=self._merke_lade_fortschritt):
+                    self._lade_warteschlange.put(batch)
+                self._lade_warteschlange.put(None)
+            except Exception as e:
+                self._lade_warteschlange.put(e)
+
+        threading.Thread(target=lesen, name="inventar-laden", daemon=True).start()
+        self.root.after(INVENTAR_LADE_POLL_MS, self._uebernehme_geladene_buecher, dateipfad)
+
+    def _merke_lade_fortschritt(self, gelesen: int, gesamt: int):
+        self._lade_fortschritt = (gelesen, gesamt) # Läuft im Lade-Thread; nur eine Zuweisung
+
+    def _uebernehme_geladene_buecher(self, dateipfad: str):
+        """Läuft im Tk-Thread (per after): fügt fertig gelesene Batches dem Inventar hinzu."""
+        neu = False
+        for _ in range(INVENTAR_LADE_BATCHES_PRO_TICK):
+            try:
+                eintrag = self._lade_warteschlange.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(eintrag, list):
+                with metriken.messe("laden.batch_uebernehmen"):
+                    for buch in eintrag:
+                        self.buchladen.buch_hinzufuegen(buch)
+                neu = True
+                continue
+            if isinstance(eintrag, FileNotFoundError):
+                print(f"Fehler: JSON-Datei '{dateipfad}' nicht gefunden.")
+            elif isinstance(eintrag, ValueError): # json.JSONDecodeError
+                print(f"Fehler: JSON-Datei '{dateipfad}' konnte nicht dekodiert werden ({eintrag}); "
+                      f"nur die ersten {len(self.buchladen.inventar)} Bücher wurden geladen. "
+                      "Hinzufügen bleibt gesperrt, beim Beenden wird nichts gespeichert.")
+            elif eintrag is not None:
+                print(f"Ein unerwarteter Fehler ist beim Laden der Bücher aufgetreten: {eintrag}")
+            self._lade_warteschlange = None
+            if eintrag is None:
+                # Snapshot für den nächsten Start; Stand vor dem Journal = Inhalt der Datei
+                self.buchladen.schreibe_snapshot_im_hintergrund(dateipfad)
+                self.buchladen.spiele_journal_ab(dateipfad)
+                metriken.erfasse_seit("laden.hintergrund", self._lade_start_ns)
+                print(f"{len(self.buchladen.inventar)} Bücher erfolgreich aus '{dateipfad}' geladen.")
+                self.inventar_vollstaendig = True
+                self.datei_menu.entryconfigure("Buch hinzufügen", state="normal")
+            else:
+                self.lade_status_var.set(f"Inventar unvollständig geladen: nur {len(self.buchladen.inventar)} Bücher "
+                                         "(siehe Konsole).")
+                return # Unvollständiges Inventar: Hinzufügen bleibt gesperrt, sonst würde es überschrieben
+            self.inventar_bereit()
+            return
+
+        if neu and not self._zeigt_suchergebnis:
+            self._erweitere_inventar_anzeige()
+        gelesen, gesamt = self._lade_fortschritt
+        if gesamt:
+            self.lade_status_var.set(f"Inventar wird geladen... {100 * gelesen // gesamt} % "
+                                     f"({len(self.buchladen.inventar)} Bücher)")
+        self.root.after(INVENTAR_LADE_POLL_MS if not neu else 1, self._uebernehme_geladene_buecher, dateipfad)
+
+    def _erweitere_inventar_anzeige(self):
+        """Nach dem Anhängen von Büchern: Filter neu auswerten, Scrollposition und Auswahl behalten.
+
+        Alle Filter liefern Bücher in Inventar-Reihenfolge, angehängte Bücher landen also hinten.
+        """
+        if self._render_planer.beschaeftigt:
+            return # Der geplante Aufbau sieht die neuen Bücher ohnehin
+        self._render_planer.anfordern(lambda: self._baue_inventar_anzeige(self.kategorie_filter_var.get(), erweitern=True))
+
+    def inventar_bereit(self):
+        """Nach dem vollständigen Laden: Filteroptionen und Anzeige aktualisieren, ggf. auf leeres Inventar hinweisen."""
+        self.lade_status_var.set("")
+        self.buchladen.starte_suchindex_aufbau() # Die erste Suche soll nicht auf ihn warten
+        self._aktualisiere_gui_nach_buch_hinzugefuegt()
+        if not self.buchladen.inventar and os.path.exists(self.json_dateipfad):
+            messagebox.showwarning("Inventar Leer",
+                                   f"Das Inventar ist leer. Sie können Bücher über 'Datei -> Buch hinzufügen' hinzufügen.\nDatendatei: {self.json_dateipfad}",
+                                   parent=self.root)
+
     def _buch_hinzufuegen_dialog(self):
         # AddBookWindow als modalen Dialog starten und auf sein Schließen warten
-        add_window = AddBookWindow(self.root, self.buchladen, self.json_dateipfad, self.user_app_data_dir)
+        add_window = AddBookWindow(self.root, self.buchladen, self.json_dateipfad, self.user_app_data_dir,
+                                   self.download_manager, on_download_gestartet=self._beobachte_download)
         self.root.wait_window(add_window) # Warten, bis das AddBookWindow geschlossen wird
 
         # Inventarliste und Filter-Dropdown in BuchladenApp aktualisieren
         self._aktualisiere_gui_nach_buch_hinzugefuegt()
 
-    def _aktualisiere_gui_nach_buch_hinzugefuegt(self):
-        """Aktualisiert die Inventaranzeige und die Filteroptionen."""
-        self._update_inventar_anzeige(self.kategorie_filter_var.get()) # Aktuellen Filter beibehalten
+    def _beobachte_download(self, job_id: int):
+        """Merkt sich einen Cover-Download, um das Cover nach Abschluss neu anzuzeigen."""
+        self._beobachtete_downloads.add(job_id)
+        if len(self._beobachtete_downloads) == 1:
+            self.root.after(DOWNLOAD_POLL_MS, self._pruefe_downloads)
+
+    def _pruefe_downloads(self):
+        for job_id in list(self._beobachtete_downloads):
+            job = self.download_manager.job(job_id)
+            if job is not None and not job.beendet:
+                continue
+            self._beobachtete_downloads.discard(job_id)
+            if job is None:
+                continue # Schon vergessen (beendet und abgefragt, danach ein neuer Download)
+            if job.status == FERTIG:
+                self._asset_pfade.bekannt_machen(job.ziel_pfad) # Sofort auffindbar, ohne auf die mtime-Prüfung zu warten
+            if job.status == FERTIG and self.selected_inventar_index is not None:
+                buch = self.aktuell_angezeigte_buecher[self.selected_inventar_index]
+                pfad = self._finde_cover_pfad(buch)
+                if pfad and os.path.normcase(os.path.abspath(pfad)) == os.path.normcase(os.path.abspath(job.ziel_pfad)):
+                    self._zeige_buch_bild(buch) # Das ausgewählte Buch hat jetzt ein Cover
+        if self._beobachtete_downloads:
+            self.root.after(DOWNLOAD_POLL_MS, self._pruefe_downloads)
 
+    def _aktualisiere_gui_nach_buch_hinzugefuegt(self):
+        """Aktualisiert die Filteroptionen und danach einmal die Inventaranzeige."""
         neue_filter_optionen = ["Alle Anzeigen"] + self.buchladen.get_alle_kategorien() + ["Nur FSK18", "Nur Verbotene"]
-        self.kategorie_dropdown['values'] = neue_filter_optionen
-        
-        current_filter_value = self.kategorie_filter_var.get()
-        if current_filter_value not in neue_filter_optionen: # Falls der alte Filter (eine gelöschte Kat.?) nicht mehr existiert
+        self.kategorie_dropdown.configure(values=neue_filter_optionen) # ['values'] = ... kommt bei CTk nicht an
+
+        if self.kategorie_filter_var.get() not in neue_filter_optionen: # Falls der alte Filter (eine gelöschte Kat.?) nicht mehr existiert
             self.kategorie_dropdown.set("Alle Anzeigen") # Auf "Alle Anzeigen" zurücksetzen
-            self._on_filter_change() # Und die Anzeige entsprechend aktualisieren
-            # Note: If _on_filter_change is called without args here, it needs to handle that.
-            # The command callback provides an arg, but direct calls might not.
-            # For simplicity, assuming this programmatic call will use the new value from .set()
+        self._on_filter_change() # Aktuellen (ggf. zurückgesetzten) Filter anzeigen
 
     def _on_filter_change(self, filter_wert: str | None = None): # Modified signature
         """Wird aufgerufen, wenn eine Auswahl im Dropdown getroffen oder der Filter programmatisch geändert wird."""
@@ -162,83 +335,132 @@ class BuchladenApp:
             filter_wert = self.kategorie_filter_var.get()
         self._update_inventar_anzeige(filter_wert)
 
+    def _on_suche(self, event=None):
+        """Zeigt die besten Suchtreffer für den eingegebenen Text an."""
+        if self._suche_job is not None:
+            self.root.after_cancel(self._suche_job)
+            self._suche_job = None
+        anfrage = self.suche_var.get().strip()
+        if not anfrage:
+            self._on_filter_change()
+            return
+        if not self.buchladen.suchindex_bereit():
+            self.lade_status_var.set("Suchindex wird aufgebaut...")
+            self._suche_job = self.root.after(SUCHINDEX_POLL_MS, self._wiederhole_suche)
+            return
+        self._zeigt_suchergebnis = True
+        self._render_planer.anfordern(lambda: self._baue_suchergebnis(anfrage)) # Verwirft einen laufenden Filter-Aufbau
+
+    def _wiederhole_suche(self):
+        self._suche_job = None
+        if self.inventar_vollstaendig:
+            self.lade_status_var.set("") # Während des Ladens setzt _uebernehme_geladene_buecher den Status
+        self._on_suche()
+
+    def _baue_suchergebnis(self, anfrage: str):
+        """Für den RenderPlaner: Suche und Anzeige als getrennte Stücke (die Suche selbst endet früh, siehe SuchIndex)."""
+        with metriken.messe("gui.suche"):
+            treffer = self.buchladen.suche(anfrage, limit=200)
+        yield
+        self.aktuell_angezeigte_buecher = treffer
+        self._fuelle_inventar_liste_mit_buechern(treffer)
+
     def _update_inventar_anzeige(self, filter_kriterium=None):
-        """Aktualisiert die Inventar-Listbox basierend auf dem Filter."""
+        """Plant den Neuaufbau der Inventarliste für den Filter (zusammengefasst, siehe RenderPlaner)."""
         if filter_kriterium is None:
             filter_kriterium = "Alle Anzeigen"
         
-        self.aktuell_angezeigte_buecher = self.buchladen.get_gefilterte_buecher(filter_kriterium)
-        self._fuelle_inventar_liste_mit_buechern(self.aktuell_angezeigte_buecher)
+        self._zeigt_suchergebnis = False
+        self._render_planer.anfordern(lambda: self._baue_inventar_anzeige(filter_kriterium))
+
+    def _baue_inventar_anzeige(self, filter_kriterium: str, erweitern: bool = False):
+        """Für den RenderPlaner: zeigt das Filterergebnis an; mit erweitern bleiben Scrollposition und Auswahl.
+
+        Der Filter wird schrittweise ausgewertet (je ABFRAGE_SCHRITT Positionen ein Stück, siehe
+        Buchladen.abfragen_schrittweise). Das Ergebnis ist eine lazy Sicht (ErgebnisAnsicht); die
+        Liste liest nur die sichtbaren Zeilen, auch bei "Alle Anzeigen" auf einem riesigen Katalog.
+        """
+        start_ns = metriken.jetzt_ns()
+        ergebnis = yield from self.buchladen.filtere_schrittweise(filter_kriterium)
+        self.aktuell_angezeigte_buecher = ergebnis
+        if erweitern:
+            self.inventar_scroll.setze_anzahl(len(ergebnis))
+        else:
+            self._fuelle_inventar_liste_mit_buechern(ergebnis)
+        metriken.erfasse_seit("gui.filter.erweitern" if erweitern else "gui.filter", start_ns) # Bis zur Anzeige, samt Pausen
+
+    @staticmethod
+    def _buch_zeilen_text(buch) -> str:
+        preis_str = "{:.2f} €".format(buch.preis).replace('.', ',')
+        return f"{buch.titel}\n{buch.autor}   {preis_str}"
 
     def _fuelle_inventar_liste_mit_buechern(self, buecher_liste: list):
         """Füllt die Listbox des Inventars mit den übergebenen Büchern."""
-        print(f"DEBUG: _fuelle_inventar_liste_mit_buechern erhält {len(buecher_liste)} Bücher zum Anzeigen.") # DEBUG-Ausgabe
-        # Clear previous widgets
-        for widget in self.inventar_scroll.winfo_children():
-            widget.destroy()
-        self.selected_inventar_index = None
-        self.add_button.configure(state="disabled")
-        self._clear_buch_bild()
-        self._inventar_buttons = []
-
-        def on_select(idx):
-            self.selected_inventar_index = idx
-            self._zeige_buch_bild(self.aktuell_angezeigte_buecher[idx])
-            self.add_button.configure(state="normal")
-            for i, btn in enumerate(self._inventar_buttons):
-                if i == idx:
-                    btn.configure(state="disabled")
-                else:
-                    btn.configure(state="normal")
-
-        for idx, buch in enumerate(buecher_liste):
-            preis_str = "{:.2f} €".format(buch.preis).replace('.', ',')
-            btn_text = f"{buch.titel}\n{buch.autor}   {preis_str}"
-            btn = ctk.CTkButton(
-                self.inventar_scroll,
-                text=btn_text,
-                anchor="w",
-                width=380,
-                height=48,
-                command=lambda i=idx: on_select(i)
-            )
-            btn.pack(fill="x", pady=3, padx=5)  # Einheitliche Abstände
-            self._inventar_buttons.append(btn)
-        self.root.update()
+        metriken.zaehle("gui.render.buecher", len(buecher_liste))
+        with metriken.messe("gui.render"):
+            self.selected_inventar_index = None
+            self.add_button.configure(state="disabled")
+            self._clear_buch_bild()
+            # Liest die aktuelle Liste, damit _erweitere_inventar_anzeige nur die Anzahl anpassen muss
+            self.inventar_scroll.setze_daten(len(buecher_liste), lambda idx: self._buch_zeilen_text(self.aktuell_angezeigte_buecher[idx]))
+
+    def _on_inventar_auswahl(self, idx):
+        self.selected_inventar_index = idx
+        self._zeige_buch_bild(self.aktuell_angezeigte_buecher[idx])
+        self.add_button.configure(state="normal")
+        self._lade_nachbar_cover_vor(idx)
+
+    def _bewege_inventar_auswahl(self, schritt: int):
+        if not self.aktuell_angezeigte_buecher:
+            return
+        if self.selected_inventar_index is None:
+            neu = 0
+        else:
+            neu = max(0, min(len(self.aktuell_angezeigte_buecher) - 1, self.selected_inventar_index + schritt))
+        if neu != self.selected_inventar_index:
+            self.inventar_scroll.waehle(neu)
+
+    def _lade_nachbar_cover_vor(self, idx: int):
+        """Dekodiert die Cover der Nachbarn im Hintergrund, damit das Blättern nicht auf die Platte wartet."""
+        quellen = []
+        for abstand in range(1, COVER_PREFETCH_NACHBARN + 1):
+            for nachbar in (idx + abstand, idx - abstand):
+                if 0 <= nachbar < len(self.aktuell_angezeigte_buecher):
+                    quelle = self._finde_cover(self.aktuell_angezeigte_buecher[nachbar])
+                    if quelle is not None:
+                        quellen.append(quelle)
+        self._cover_lader.vorladen(quellen)
 
     def _aktualisiere_wagen_anzeige(self):
-        for widget in self.wagen_scroll.winfo_children():
-            widget.destroy()
+        """Zeichnet den Einkaufswagen komplett neu (nur nötig, wenn sich alles geändert hat)."""
         self.selected_wagen_index = None
-        self._wagen_buttons = []
-
-        def on_select(idx):
-            self.selected_wagen_index = idx
-            # Visuelles Feedback für Auswahl (Button-Relief ändern, keine Farbe)
-            for i, btn in enumerate(self._wagen_buttons):
-                if i == idx:
-                    btn.configure(state="disabled")
-                else:
-                    btn.configure(state="normal")
-
-        for idx, buch in enumerate(self.einkaufswagen):
-            preis_str = "{:.2f} €".format(buch.preis).replace('.', ',')
-            btn_text = f"{buch.titel}\n{buch.autor}   {preis_str}"
-            btn = ctk.CTkButton(
-                self.wagen_scroll,
-                text=btn_text,
-                anchor="w",
-                width=380,
-                height=48,
-                command=lambda i=idx: on_select(i)
-            )
-            btn.pack(fill="x", pady=3, padx=5)  # Einheitliche Abstände
-            self._wagen_buttons.append(btn)
-
-        gesamtpreis = self.buchladen.berechne_gesamtpreis(self.einkaufswagen)
-        gesamtpreis_str = "{:.2f}".format(gesamtpreis).replace('.', ',')
+        self.wagen_scroll.setze_daten(len(self.einkaufswagen), self._wagen_zeilen_text)
+        self._aktualisiere_gesamtpreis()
+
+    def _wagen_zeilen_text(self, idx: int) -> str:
+        buch, menge = self.einkaufswagen[idx]
+        text = self._buch_zeilen_text(buch)
+        return f"{menge} × {text}" if menge > 1 else text
+
+    def _on_warenkorb_geaendert(self, ereignis: str, zeile: int | None):
+        """Patcht nur die betroffene Zeile, statt den ganzen Wagen neu aufzubauen."""
+        if ereignis == GEAENDERT:
+            self.wagen_scroll.zeile_geaendert(zeile)
+        elif ereignis == HINZUGEFUEGT:
+            self.wagen_scroll.setze_anzahl(len(self.einkaufswagen))
+        else: # Entfernt oder geleert: nachfolgende Zeilen rücken auf
+            self.selected_wagen_index = None
+            self.wagen_scroll.waehle(None, benachrichtigen=False)
+            self.wagen_scroll.setze_anzahl(len(self.einkaufswagen))
+        self._aktualisiere_gesamtpreis()
+
+    def _aktualisiere_gesamtpreis(self):
+        gesamtpreis_str = "{:.2f}".format(self.einkaufswagen.gesamtpreis).replace('.', ',')
         self.total_label_var.set(f"Gesamtpreis: {gesamtpreis_str} €")
 
+    def _on_wagen_auswahl(self, idx):
+        self.selected_wagen_index = idx
+
     def _zum_wagen_hinzufuegen(self):
         try:
             idx = self.selected_inventar_index
@@ -261,8 +483,7 @@ class BuchladenApp:
             
             # Wenn wir hier ankommen, ist das Buch nicht verboten, 
             # und falls es indiziert war, wurde das Alter bestätigt.
-            self.einkaufswagen.append(buch_objekt)
-            self._aktualisiere_wagen_anzeige()
+            self.einkaufswagen.hinzufuegen(buch_objekt)
         except IndexError:
             # Dieser Fehler sollte seltener auftreten, wenn aktuell_angezeigte_buecher korrekt ist
             messagebox.showerror("Fehler", "Auswahl konnte nicht verarbeitet werden. Bitte versuchen Sie es erneut.", parent=self.root)
@@ -277,8 +498,7 @@ class BuchladenApp:
             idx = self.selected_wagen_index
             if idx is None:
                 return
-            del self.einkaufswagen[idx]
-            self._aktualisiere_wagen_anzeige()
+            self.einkaufswagen.entfernen(idx) # Ein Exemplar; die Zeile verschwindet bei Menge 0
         except IndexError:
             messagebox.showerror("Fehler", "Auswahl konnte nicht verarbeitet werden.", parent=self.root)
 
@@ -286,77 +506,91 @@ class BuchladenApp:
         if not self.einkaufswagen:
             messagebox.showinfo("Information", "Ihr Einkaufswagen ist leer.", parent=self.root)
             return
-        gesamtpreis = self.buchladen.berechne_gesamtpreis(self.einkaufswagen)
-        gesamtpreis_str = "{:.2f}".format(gesamtpreis).replace('.', ',')
+        gesamtpreis_str = "{:.2f}".format(self.einkaufswagen.gesamtpreis).replace('.', ',')
         message = f"Vielen Dank für Ihren Einkauf!\n\nGesamtsumme: {gesamtpreis_str} €"
         messagebox.showinfo("Kasse", message, parent=self.root)
-        self.einkaufswagen.clear()
-        self._aktualisiere_wagen_anzeige()
+        self.einkaufswagen.leeren()
 
     def _zeige_buch_bild(self, buch_objekt):
         """Zeigt das Bild zum Buch an, falls vorhanden."""
         if not hasattr(self, "buch_bild_label") or self.buch_bild_label is None:
-            print("[DEBUG] Kein Bild-Label vorhanden.")
             return  # Bild-Label existiert nicht
 
         image_path_from_json = getattr(buch_objekt, "image_path", None)
-        print(f"[DEBUG] Buchbild-Pfad aus JSON: {image_path_from_json}")
         if not image_path_from_json:
-            print("[DEBUG] Kein Bildpfad gesetzt.")
+            metriken.zaehle("cover.ohne_bildpfad")
             self._clear_buch_bild()
             return
 
-        # Prioritized image loading:
-        # 1. Check user-specific assets folder (in AppData)
-        # image_path_from_json is like "assets/image.jpg"
-        user_specific_image_path = os.path.join(self.user_app_data_dir, image_path_from_json)
-        
-        path_to_load = None
-        if os.path.exists(user_specific_image_path):
-            path_to_load = user_specific_image_path
-            print(f"[DEBUG] Bild gefunden in User AppData: {path_to_load}")
-        else:
-            # 2. Fallback to bundled/project assets
-            bundled_image_path = self.get_resource_path(image_path_from_json)
-            if os.path.exists(bundled_image_path):
-                path_to_load = bundled_image_path
-                print(f"[DEBUG] Bild gefunden in Bundled/Project Assets: {path_to_load}")
-
-        if not path_to_load:
-            print(f"[DEBUG] Bilddatei nicht gefunden. Geprüft: {user_specific_image_path} und (falls anders) {self.get_resource_path(image_path_from_json)}")
+        quelle = self._finde_cover(buch_objekt)
+        if quelle is None:
+            metriken.zaehle("cover.datei_fehlt")
             self._clear_buch_bild()
             return
 
-        try:
-            # Pillow >=9.1.0: Image.Resampling.LANCZOS
-            try:
-                resample = Image.Resampling.LANCZOS
-            except AttributeError:
-                resample = Image.Resampling.LANCZOS
-            img = Image.open(path_to_load)
-            img = img.resize((180, 260), resample)
-            photo = ImageTk.PhotoImage(img)
-            self.buch_bild_label.configure(image=photo)
-            self.buch_bild_label.image = photo  # type: ignore[attr-defined]
-            print("[DEBUG] Bild erfolgreich geladen und angezeigt.")
-        except Exception as e:
-            print(f"Fehler beim Laden des Bildes: {e}")
-            self._clear_buch_bild()
+        # Dekodieren im Thread-Pool; bis das Bild da ist, bleibt die Anzeige leer
+        self._clear_buch_bild()
+        self._cover_anfrage_ns = metriken.jetzt_ns()
+        path_to_load, version = quelle
+        self._cover_lader.anfordern(path_to_load, version, self._setze_buch_bild, self._on_buch_bild_fehler)
+
+    def _finde_cover(self, buch_objekt) -> tuple | None:
+        """Sucht das Cover zuerst im Benutzer-AppData, dann im Cover-Archiv, dann in den mitgelieferten Assets.
+
+        Das Archiv ersetzt nur den mitgelieferten assets/-Ordner; selbst heruntergeladene oder
+        ausgewählte Cover im AppData haben Vorrang. Liefert (Quelle, Version) für den CoverLader:
+        für Cover aus dem Archiv den Namen im Archiv (siehe CoverCache) und dessen Kennung, sonst
+        Dateipfad und (mtime_ns, Größe) aus dem Listing. Im Normalfall ohne Dateisystem-Zugriff
+        (siehe AssetPfade).
+        """
+        image_path_from_json = getattr(buch_objekt, "image_path", None)
+        if not image_path_from_json:
+            return None
+        # image_path_from_json is like "assets/image.jpg"
+        benutzer_wurzel, *mitgeliefert = self._asset_pfade.wurzeln
+        gefunden = self._asset_pfade.finde(image_path_from_json, [benutzer_wurzel])
+        if gefunden is not None:
+            return gefunden
+        if self._cover_cache.archiv is not None:
+            name = archiv_name(image_path_from_json)
+            if name in self._cover_cache.archiv:
+                return name, self._cover_cache.archiv.kennung
+        return self._asset_pfade.finde(image_path_from_json, mitgeliefert)
+
+    def _finde_cover_pfad(self, buch_objekt) -> str | None:
+        quelle = self._finde_cover(buch_objekt)
+        return quelle[0] if quelle is not None else None
+
+    def _setze_buch_bild(self, photo):
+        self.buch_bild_label.configure(image=photo)
+        self.buch_bild_label.image = photo  # type: ignore[attr-defined]
+        if self._cover_anfrage_ns is not None:
+            metriken.erfasse_seit("cover.anzeige", self._cover_anfrage_ns)
+            self._cover_anfrage_ns = None
+
+    def _on_buch_bild_fehler(self, fehler):
+        print(f"Fehler beim Laden des Bildes: {fehler}")
+        self._clear_buch_bild()
 
     def _clear_buch_bild(self):
+        self._cover_lader.verwerfen() # Ein noch ladendes Cover gehört nicht mehr zur Auswahl
         if hasattr(self, "buch_bild_label") and self.buch_bild_label is not None:
             self.buch_bild_label.configure(image="")
             self.buch_bild_label.image = None  # type: ignore[attr-defined]
 
 class AddBookWindow(ctk.CTkToplevel):
-    def __init__(self, parent, buchladen_instanz: Buchladen, json_dateipfad: str, user_app_data_dir: str):
+    def __init__(self, parent, buchladen_instanz: Buchladen, json_dateipfad: str, user_app_data_dir: str,
+                 download_manager: CoverDownloadManager, on_download_gestartet=None):
         super().__init__(parent)
         self.buchladen = buchladen_instanz
         self.json_dateipfad = json_dateipfad
         self.user_app_data_dir = user_app_data_dir # Store for saving downloaded images
+        self.download_manager = download_manager
+        self.on_download_gestartet = on_download_gestartet
+        self._letzter_download = None # job_id des zuletzt gestarteten Cover-Downloads
 
         self.title("Neues Buch hinzufügen")
-        self.geometry("450x350") # Angepasste Größe
+        self.geometry("450x400") # Angepasste Größe (inkl. Download-Status)
         self.transient(parent) # Bleibt über dem Hauptfenster
         self.grab_set() # Modal machen (blockiert Interaktion mit Parent)
 
@@ -375,56 +609,6 @@ class AddBookWindow(ctk.CTkToplevel):
         """Sanitizes a string to be a valid filename."""
         return "".join(c for c in name if c.isalnum() or c in "._- ").rstrip()
 
-    def _download_cover_image(self, title: str, author: str, target_save_path: str):
-        """Attempts to download a cover image and save it to target_save_path."""
-        if os.path.exists(target_save_path):
-            print(f"[*] Bild existiert bereits unter {target_save_path}. Überspringe Download.")
-            return True # Indicate success as file exists
-
-        query = urllib.parse.quote_plus(f"{title} {author}")
-        api_url = f"https://www.googleapis.com/books/v1/volumes?q={query}"
-        headers = {"User-Agent": "Mozilla/5.0 (BuchladenApp/1.0)"}
-
-        print(f"[*] Suche Cover für '{title}' via Google Books API...")
-        try:
-            response = requests.get(api_url, headers=headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if "items" in data and len(data["items"]) > 0:
-                volume_info = data["items"][0].get("volumeInfo", {})
-                image_links = volume_info.get("imageLinks", {})
-                img_url = (image_links.get("large") or
-                           image_links.get("medium") or
-                           image_links.get("thumbnail") or
-                           image_links.get("smallThumbnail"))
-
-                if not img_url or not isinstance(img_url, str):
-                    print(f"[-] Kein passender Bildlink für '{title}' in API-Antwort gefunden.")
-                    return False
-                
-                if img_url.startswith("//"): # Handle protocol-relative URLs
-                    img_url = "https:" + img_url
-
-                print(f"[*] Lade Cover für '{title}' von {img_url}...")
-                img_response = requests.get(img_url, headers=headers, timeout=15)
-                img_response.raise_for_status()
-
-                os.makedirs(os.path.dirname(target_save_path), exist_ok=True)
-                with open(target_save_path, 'wb') as f:
-                    f.write(img_response.content)
-                print(f"[+] Cover gespeichert: {target_save_path}")
-                time.sleep(0.5) # Small delay
-                return True
-            else:
-                print(f"[-] Keine Treffer für '{title}' in Google Books API gefunden.")
-                return False
-        except requests.exceptions.RequestException as e:
-            print(f"[!] Fehler bei der Cover-Suche/Download für '{title}': {e}")
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"[!] Fehler bei der Verarbeitung der API-Antwort oder beim Speichern für '{title}': {e}")
-        return False
-
     def _erstelle_widgets(self):
         main_frame = ctk.CTkFrame(self)
         main_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -458,6 +642,15 @@ class AddBookWindow(ctk.CTkToplevel):
         ctk.CTkButton(button_frame, text="Speichern", command=self._speichern).pack(side="left", padx=10)
         ctk.CTkButton(button_frame, text="Abbrechen", command=self.destroy).pack(side="left", padx=10)
 
+        # Status des Cover-Downloads (läuft im Hintergrund weiter, auch wenn das Fenster geschlossen wird)
+        download_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        download_frame.grid(row=7, column=0, columnspan=2, sticky="ew")
+        self.download_status_var = tk.StringVar()
+        ctk.CTkLabel(download_frame, textvariable=self.download_status_var, wraplength=300, justify="left").pack(side="left", padx=5)
+        self.download_abbrechen_button = ctk.CTkButton(download_frame, text="Download abbrechen", width=130,
+                                                       command=self._download_abbrechen, state="disabled")
+        self.download_abbrechen_button.pack(side="right", padx=5)
+
         main_frame.columnconfigure(1, weight=1) # Damit Eingabefelder skalieren
 
     def _speichern(self):
@@ -520,21 +713,20 @@ class AddBookWindow(ctk.CTkToplevel):
         neues_buch = Buch(titel, autor, kategorie, preis, verboten, indiziert, final_image_path)
 
         # Zum Inventar hinzufügen und speichern
-        self.buchladen.buch_hinzufuegen(neues_buch)
-        self.buchladen.speichere_inventar_in_json(self.json_dateipfad)
-        messagebox.showinfo("Erfolg", f"Buch '{titel}' erfolgreich hinzugefügt und gespeichert.", parent=self)
+        with metriken.messe("gui.buch_speichern"):
+            self.buchladen.buch_hinzufuegen_und_speichern(neues_buch, self.json_dateipfad)
 
-        # Versuche, das Cover herunterzuladen, wenn ein Bildpfad generiert wurde
+        # Cover im Hintergrund herunterladen, wenn ein Bildpfad generiert wurde
         if final_image_path:
             # final_image_path ist z.B. "assets/My Book.jpg"
             # Wir wollen es in self.user_app_data_dir/assets/My Book.jpg speichern
             target_image_save_path = os.path.join(self.user_app_data_dir, final_image_path)
-            
-            download_success = self._download_cover_image(titel, autor, target_image_save_path)
-            if download_success:
-                messagebox.showinfo("Bild-Download", f"Cover für '{titel}' erfolgreich heruntergeladen.", parent=self)
-            else:
-                messagebox.showwarning("Bild-Download", f"Cover für '{titel}' konnte nicht automatisch heruntergeladen werden. Bitte manuell im Ordner '{os.path.dirname(target_image_save_path)}' als '{os.path.basename(target_image_save_path)}' ablegen.", parent=self)
+            self._letzter_download = self.download_manager.starte(titel, autor, target_image_save_path)
+            if self.on_download_gestartet is not None:
+                self.on_download_gestartet(self._letzter_download)
+            self._zeige_download_status(self._letzter_download)
+
+        messagebox.showinfo("Erfolg", f"Buch '{titel}' erfolgreich hinzugefügt und gespeichert.", parent=self)
 
         # Optional: Eingabefelder leeren für nächste Eingabe
         self.titel_var.set("")
@@ -553,6 +745,33 @@ class AddBookWindow(ctk.CTkToplevel):
         # Wenn das Fenster nach dem Speichern geschlossen werden soll:
         # self.destroy()
 
+    def _zeige_download_status(self, job_id: int):
+        """Zeigt den Status eines Cover-Downloads an, bis er beendet ist (Polling per after)."""
+        if not self.winfo_exists() or job_id != self._letzter_download:
+            return # Fenster geschlossen oder inzwischen ein neuerer Download
+        job = self.download_manager.job(job_id)
+        if job is None:
+            return # Schon vergessen; die letzte Meldung bleibt stehen
+        if job.status == FERTIG:
+            self.download_status_var.set(f"Cover für '{job.titel}' erfolgreich heruntergeladen.")
+        elif job.status == ABGEBROCHEN:
+            self.download_status_var.set(f"Download für '{job.titel}' abgebrochen.")
+        elif job.beendet:
+            grund = "nicht gefunden" if job.status == KEIN_TREFFER else "fehlgeschlagen"
+            self.download_status_var.set(
+                f"Cover für '{job.titel}' {grund}. Bitte manuell im Ordner "
+                f"'{os.path.dirname(job.ziel_pfad)}' als '{os.path.basename(job.ziel_pfad)}' ablegen.")
+        else:
+            self.download_status_var.set(f"Cover für '{job.titel}' wird geladen ({job.status})...")
+            self.download_abbrechen_button.configure(state="normal")
+            self.after(DOWNLOAD_POLL_MS, lambda: self._zeige_download_status(job_id))
+            return
+        self.download_abbrechen_button.configure(state="disabled")
+
+    def _download_abbrechen(self):
+        if self._letzter_download is not None:
+            self.download_manager.abbrechen(self._letzter_download)
+
     def _on_kategorie_selected(self, event=None):
         if self.kategorie_var.get() == "Neue Kategorie...":
             neue_kategorie = simpledialog.askstring("Neue Kategorie", "Bitte geben Sie die neue Kategorie ein:", parent=self)
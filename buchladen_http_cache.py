@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+import buchladen_metriken as metriken
+from buchladen_suche import normalisiere
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS eintraege (
+    schluessel TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    gespeichert REAL NOT NULL,   -- Zeitpunkt des letzten Abrufs/der letzten Revalidierung
+    zugriff REAL NOT NULL,       -- für LRU-Verdrängung
+    groesse INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_eintraege_zugriff ON eintraege(zugriff);
+"""
+
+
+def suchschluessel(api_url: str, titel: str, autor: str) -> str:
+    """Normalisierter Cache-Schlüssel einer Volume-Suche ('Der  Tägliche Stoiker' == 'der taegliche stoiker').
+
+    Enthält den Endpunkt samt eigener Query-Parameter, damit z.B. Antworten eines lokalen
+    Test-Servers (--api-url) nicht als Antworten der echten API aus dem Cache kommen.
+    """
+    teile = urllib.parse.urlsplit(api_url)
+    endpunkt = urllib.parse.urlunsplit((teile.scheme.lower(), teile.netloc.lower(), teile.path.rstrip("/"), teile.query, ""))
+    return f"volumes:{endpunkt}:" + re.sub(r"\s+", " ", normalisiere(f"{titel} {autor}")).strip()
+
+
+class HttpCache:
+    """Persistenter Cache für HTTP-Antworten (Google-Books-Suchen und Coverbilder).
+
+    Innerhalb der TTL wird ohne Netzwerk geantwortet; danach wird per ETag/Last-Modified
+    revalidiert. Die Gesamtgröße ist begrenzt, verdrängt wird der am längsten unbenutzte Eintrag.
+    Thread-sicher, damit Download-Worker ihn gemeinsam nutzen können.
+    """
+    def __init__(self, cache_dir: str, ttl_sekunden: float = 7 * 24 * 3600, max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl_sekunden = ttl_sekunden
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def _body_pfad(self, schluessel: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(schluessel.encode("utf-8")).hexdigest() + ".bin")
+
+    def _lies_body(self, schluessel: str) -> bytes | None:
+        try:
+            with open(self._body_pfad(schluessel), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def hole(self, url: str, abrufen, schluessel: str | None = None) -> bytes:
+        """Liefert den Body von url, aus dem Cache oder über abrufen(url, headers) -> requests.Response.
+
+        abrufen kapselt Session, Timeout und ggf. Retries des Aufrufers. HTTP-Fehler werden
+        als requests.HTTPError weitergereicht und nicht gecacht.
+        """
+        schluessel = schluessel or url
+        jetzt = time.time()
+        with self._lock:
+            eintrag = self._conn.execute(
+                "SELECT etag, last_modified, gespeichert FROM eintraege WHERE schluessel = ?",
+                (schluessel,)).fetchone()
+        body = self._lies_body(schluessel) if eintrag is not None else None
+        if eintrag is not None and body is None:
+            self._vergiss(schluessel) # Index-Eintrag ohne Datei: nicht mehr per ETag revalidieren
+        if body is not None and jetzt - eintrag[2] < self.ttl_sekunden:
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE eintraege SET zugriff = ? WHERE schluessel = ?", (jetzt, schluessel))
+            metriken.zaehle("http_cache.treffer")
+            return body
+
+        headers = {}
+        if body is not None:
+            if eintrag[0]:
+                headers["If-None-Match"] = eintrag[0]
+            if eintrag[1]:
+                headers["If-Modified-Since"] = eintrag[1]
+        try:
+            with metriken.messe("http_cache.abrufen"):
+                response = abrufen(url, headers)
+        except Exception:
+            if body is not None:
+                metriken.zaehle("http_cache.veraltet_genutzt")
+                return body # Netzwerkfehler: veraltete Kopie ist besser als nichts
+            raise
+        if body is not None and response.status_code >= 500:
+            metriken.zaehle("http_cache.veraltet_genutzt")
+            return body
+        if response.status_code == 304 and body is not None:
+            with self._lock, self._conn:
+                self._conn.execute("UPDATE eintraege SET gespeichert = ?, zugriff = ? WHERE schluessel = ?",
+                                   (jetzt, jetzt, schluessel))
+            metriken.zaehle("http_cache.nicht_geaendert")
+            return body
+        if response.status_code == 304:
+            # 304 ohne eigene Kopie (z.B. von einem Proxy): unbedingt neu laden statt einen leeren Body zu speichern
+            metriken.zaehle("http_cache.304_ohne_kopie")
+            with metriken.messe("http_cache.abrufen"):
+                response = abrufen(url, {"Cache-Control": "no-cache"})
+            if response.status_code == 304:
+                import requests
+                raise requests.HTTPError(f"304 Not Modified ohne gecachten Inhalt für {url}", response=response)
+        response.raise_for_status()
+        metriken.zaehle("http_cache.geladen")
+        body = response.content
+        self._speichere(schluessel, url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return body
+
+    def _vergiss(self, schluessel: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM eintraege WHERE schluessel = ?", (schluessel,))
+
+    def _speichere(self, schluessel: str, url: str, body: bytes, etag: str | None, last_modified: str | None):
+        pfad = self._body_pfad(schluessel)
+        tmp_pfad = f"{pfad}.{threading.get_ident()}.tmp"
+        with open(tmp_pfad, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_pfad, pfad)
+        jetzt = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO eintraege (schluessel, url, etag, last_modified, gespeichert, zugriff, groesse) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (schluessel, url, etag, last_modified, jetzt, jetzt, len(body)))
+            self._verdraenge()
+
+    def _verdraenge(self):
+        """Löscht die am längsten unbenutzten Einträge, bis max_bytes eingehalten ist (Lock wird gehalten)."""
+        belegt = self._conn.execute("SELECT COALESCE(SUM(groesse), 0) FROM eintraege").fetchone()[0]
+        if belegt <= self.max_bytes:
+            return
+        for schluessel, groesse in self._conn.execute(
+                "SELECT schluessel, groesse FROM eintraege ORDER BY zugriff").fetchall():
+            if belegt <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM eintraege WHERE schluessel = ?", (schluessel,))
+            try:
+                os.remove(self._body_pfad(schluessel))
+            except OSError:
+                pass
+            belegt -= groesse
+
+    def schliessen(self):
+        with self._lock:
+            self._conn.close()
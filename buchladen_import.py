@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+import buchladen_metriken as metriken
+from buch_model import Buch
+from buchladen_logik import _buch_aus_dict
+
+# Import vieler Lieferanten-Kataloge (JSON-Arrays im Format der buecher.json) in ein Inventar.
+# Die Dateien werden parallel in Worker-Prozessen gelesen und geparst (inkl. Schlüssel für die
+# Duplikaterkennung); das Zusammenführen ist ein Durchlauf über ein dict im aufrufenden Prozess.
+
+# Konfliktstrategien, wenn ein (titel, autor) mehrfach vorkommt
+NEUESTER = "neuester"         # Eintrag aus der zuletzt geänderten Datei gewinnt; das Inventar gilt als älter
+ERSTER = "erster"             # Vorhandenes bzw. zuerst gelesenes Buch bleibt
+LETZTER = "letzter"           # Späterer Eintrag (Dateireihenfolge, dann Reihenfolge in der Datei) gewinnt
+GUENSTIGSTER = "guenstigster" # Niedrigster Preis gewinnt
+KONFLIKT_STRATEGIEN = (NEUESTER, ERSTER, LETZTER, GUENSTIGSTER)
+
+
+def _normalisiere(text: str) -> str:
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.casefold().split())
+
+
+def normalisiere_schluessel(titel: str, autor: str) -> tuple:
+    """Schlüssel für die Duplikaterkennung: Groß-/Kleinschreibung, Unicode-Form und Leerraum egal."""
+    return _normalisiere(titel), _normalisiere(autor)
+
+
+class KatalogStatistik:
+    """Ergebnis des Imports einer Katalogdatei."""
+    def __init__(self, dateipfad: str):
+        self.dateipfad = dateipfad
+        self.gelesen = 0       # Einträge in der Datei
+        self.neu = 0           # Als neue Bücher ins Inventar übernommen
+        self.aktualisiert = 0  # Vorhandene Bücher, deren Preis/Bild dieser Katalog ersetzt hat
+        self.duplikate = 0     # Einträge, die einem anderen Eintrag unterlegen sind oder nichts ändern
+        self.fehler = None     # Fehlermeldung, falls die Datei nicht gelesen werden konnte
+        self.dauer_s = 0.0     # Lesen und Parsen im Worker
+
+    def __repr__(self) -> str:
+        if self.fehler:
+            return f"KatalogStatistik('{self.dateipfad}', fehler={self.fehler!r})"
+        return (f"KatalogStatistik('{self.dateipfad}', gelesen={self.gelesen}, neu={self.neu}, "
+                f"aktualisiert={self.aktualisiert}, duplikate={self.duplikate}, dauer_s={self.dauer_s:.3f})")
+
+
+def _zeile(buch: Buch) -> tuple:
+    return buch.titel, buch.autor, buch.kategorie, buch.preis, buch.verboten, buch.indiziert, buch.image_path
+
+
+def _buch_aus_zeile(zeile: tuple) -> Buch:
+    titel, autor, kategorie, preis, verboten, indiziert, image_path = zeile
+    return Buch(titel, autor, sys.intern(kategorie), preis, verboten, indiziert, image_path)
+
+
+def _lies_katalog(dateipfad: str) -> tuple:
+    """Läuft im Worker-Prozess: liefert (mtime_ns, [(schluessel, zeile), ...], dauer_s, fehler).
+
+    Zeilen sind Tupel statt Buch-Objekte, weil sie sich um ein Vielfaches schneller picklen lassen.
+    """
+    start = time.perf_counter()
+    try:
+        mtime_ns = os.stat(dateipfad).st_mtime_ns
+        with open(dateipfad, 'r', encoding='utf-8') as f:
+            daten = json.load(f)
+        if not isinstance(daten, list):
+            raise ValueError("Katalog ist kein JSON-Array")
+        eintraege = []
+        for item in daten:
+            buch = _buch_aus_dict(item)
+            eintraege.append((normalisiere_schluessel(buch.titel, buch.autor), _zeile(buch)))
+    except Exception as e: # Eine kaputte Datei soll den Import der übrigen nicht verhindern
+        return 0, [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+    return mtime_ns, eintraege, time.perf_counter() - start, None
+
+
+def _neu_gewinnt(konflikt, alt: tuple, neu: tuple) -> bool:
+    """alt/neu: (mtime_ns, zeile, datei_nr); datei_nr -1 steht für das vorhandene Inventar."""
+    if konflikt == NEUESTER:
+        return neu[0] >= alt[0]
+    if konflikt == ERSTER:
+        return False
+    if konflikt == LETZTER:
+        return True
+    if konflikt == GUENSTIGSTER:
+        return neu[1][3] < alt[1][3]
+    return bool(konflikt(_buch_aus_zeile(alt[1]), _buch_aus_zeile(neu[1])))
+
+
+def _lies_alle(dateipfade: list, prozesse: int | None):
+    """Liefert die Ergebnisse von _lies_katalog in der Reihenfolge von dateipfade."""
+    prozesse = min(prozesse or os.cpu_count() or 1, len(dateipfade))
+    if prozesse <= 1:
+        for dateipfad in dateipfade:
+            yield _lies_katalog(dateipfad)
+        return
+    with ProcessPoolExecutor(max_workers=prozesse) as executor:
+        yield from executor.map(_lies_katalog, dateipfade)
+
+
+def importiere_kataloge(buchladen, dateipfade: list, konflikt=NEUESTER, prozesse: int | None = None) -> list:
+    """Liest alle Kataloge parallel und übernimmt sie ohne Duplikate in buchladen; liefert je Datei eine KatalogStatistik.
+
+    Duplikate werden über normalisiere_schluessel(titel, autor) erkannt, innerhalb der Kataloge
+    und gegenüber dem Inventar. konflikt ist eine der KONFLIKT_STRATEGIEN oder eine Funktion
+    (altes_buch, neues_buch) -> bool, die True liefert, wenn das neue gewinnt.
+    Gewinnt ein Katalogeintrag gegen ein vorhandenes Buch, werden nur Preis und Bildpfad übernommen;
+    Kategorie und Status bleiben, da sie die Filter-Indizes bestimmen.
+    """
+    if konflikt not in KONFLIKT_STRATEGIEN and not callable(konflikt):
+        raise ValueError(f"Unbekannte Konfliktstrategie: {konflikt!r}")
+    statistiken = [KatalogStatistik(dateipfad) for dateipfad in dateipfade]
+    with metriken.messe("import.kataloge"):
+        vorhanden = {} # schluessel -> Position im Inventar
+        for pos, buch in enumerate(buchladen.inventar):
+            vorhanden.setdefault(normalisiere_schluessel(buch.titel, buch.autor), pos)
+        gewinner = {}  # schluessel -> (mtime_ns, zeile, datei_nr)
+
+        for datei_nr, (mtime_ns, eintraege, dauer_s, fehler) in enumerate(_lies_alle(dateipfade, prozesse)):
+            statistik = statistiken[datei_nr]
+            statistik.gelesen, statistik.dauer_s, statistik.fehler = len(eintraege), dauer_s, fehler
+            if fehler:
+                print(f"Fehler beim Import von '{dateipfade[datei_nr]}': {fehler}")
+                continue
+            for schluessel, zeile in eintraege:
+                kandidat = (mtime_ns, zeile, datei_nr)
+                alt = gewinner.get(schluessel)
+                if alt is None:
+                    pos = vorhanden.get(schluessel)
+                    if pos is None:
+                        gewinner[schluessel] = kandidat
+                        continue
+                    alt = (-1, _zeile(buchladen.inventar[pos]), -1)
+                if _neu_gewinnt(konflikt, alt, kandidat):
+                    gewinner[schluessel] = kandidat
+
+        neue_buecher = []
+        for schluessel, (_mtime_ns, zeile, datei_nr) in gewinner.items():
+            if datei_nr < 0:
+                continue # Vorhandenes Buch hat sich behauptet
+            buch = _buch_aus_zeile(zeile)
+            pos = vorhanden.get(schluessel)
+            if pos is None:
+                neue_buecher.append(buch)
+                statistiken[datei_nr].neu += 1
+            elif buchladen._uebernimm_angebot(pos, buch):
+                statistiken[datei_nr].aktualisiert += 1
+        buchladen.buecher_hinzufuegen(neue_buecher)
+
+    for statistik in statistiken:
+        statistik.duplikate = statistik.gelesen - statistik.neu - statistik.aktualisiert
+        metriken.zaehle("import.neu", statistik.neu)
+        metriken.zaehle("import.aktualisiert", statistik.aktualisiert)
+        metriken.zaehle("import.duplikate", statistik.duplikate)
+    print(f"{len(dateipfade)} Kataloge importiert: {sum(s.neu for s in statistiken)} neue Bücher, "
+          f"{sum(s.aktualisiert for s in statistiken)} aktualisiert, {sum(s.duplikate for s in statistiken)} Duplikate.")
+    return statistiken
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import tempfile
+import time
+
+
+class InventarJournal:
+    """Append-only Journal (JSON Lines) für Inventaränderungen neben der buecher.json.
+
+    Jede Zeile beschreibt ein hinzugefügtes Buch samt seiner Position im Inventar.
+    Über die Position erkennt das Abspielen Einträge, die bereits in der Hauptdatei stehen
+    (z.B. wenn ein Absturz zwischen Kompaktierung und Leeren des Journals lag).
+    """
+    def __init__(self, json_dateipfad: str, max_bytes: int = 1024 * 1024, max_alter_sekunden: float = 300.0):
+        self.pfad = json_dateipfad + ".journal"
+        self.max_bytes = max_bytes
+        self.max_alter_sekunden = max_alter_sekunden
+        self._erster_eintrag_zeit = None
+        self._ende_geprueft = False
+
+    def _braucht_zeilenumbruch(self) -> bool:
+        """True, wenn die letzte Zeile (z.B. nach einem Absturz) nicht abgeschlossen ist."""
+        try:
+            with open(self.pfad, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except FileNotFoundError:
+            return False
+
+    def anhaengen(self, pos: int, buch_dict: dict):
+        """Schreibt einen Eintrag und wartet per fsync, bis er auf dem Datenträger liegt."""
+        zeile = json.dumps({"op": "add", "pos": pos, "buch": buch_dict}, ensure_ascii=False)
+        if not self._ende_geprueft:
+            if self._braucht_zeilenumbruch():
+                zeile = "\n" + zeile # Halbe Zeile abschließen, damit der neue Eintrag lesbar bleibt
+            self._ende_geprueft = True
+        with open(self.pfad, 'a', encoding='utf-8') as f:
+            f.write(zeile + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if self._erster_eintrag_zeit is None:
+            self._erster_eintrag_zeit = time.monotonic()
+
+    def eintraege(self):
+        """Liefert alle gültigen Einträge. Eine halb geschriebene letzte Zeile wird ignoriert."""
+        try:
+            with open(self.pfad, 'r', encoding='utf-8') as f:
+                for zeilen_nr, zeile in enumerate(f, start=1):
+                    if not zeile.strip():
+                        continue
+                    try:
+                        yield json.loads(zeile)
+                    except json.JSONDecodeError:
+                        print(f"Warnung: Unvollständiger Journal-Eintrag in Zeile {zeilen_nr} von '{self.pfad}' übersprungen.")
+        except FileNotFoundError:
+            return
+
+    def ist_leer(self) -> bool:
+        try:
+            return os.path.getsize(self.pfad) == 0
+        except OSError:
+            return True
+
+    def kompaktierung_faellig(self) -> bool:
+        """True, wenn das Journal die Größen- oder Altersschwelle überschritten hat."""
+        if self.ist_leer():
+            return False
+        if os.path.getsize(self.pfad) >= self.max_bytes:
+            return True
+        return (self._erster_eintrag_zeit is not None
+                and time.monotonic() - self._erster_eintrag_zeit >= self.max_alter_sekunden)
+
+    def leeren(self):
+        """Entfernt das Journal, nachdem sein Inhalt in die Hauptdatei übernommen wurde."""
+        try:
+            os.remove(self.pfad)
+        except FileNotFoundError:
+            pass
+        self._erster_eintrag_zeit = None
+
+
+def schreibe_datei_atomar(dateipfad: str, schreiber, binaer: bool = False):
+    """Ruft schreiber(f) für eine temporäre Datei auf und ersetzt das Ziel erst danach.
+
+    Das Ziel ist dadurch nie halb geschrieben, auch nicht bei einem Absturz. Die temporäre Datei
+    hat einen eindeutigen Namen im Zielordner, gleichzeitige Schreiber kommen sich also nicht in die Quere.
+    """
+    ordner, name = os.path.split(os.path.abspath(dateipfad))
+    fd, tmp_pfad = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=ordner)
+    try:
+        with (os.fdopen(fd, 'wb') if binaer else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            schreiber(f)
+            f.flush()
+            os.fsync(f.fileno())
+        try: # mkstemp legt die Datei nur für den Besitzer lesbar an; Rechte des alten Ziels übernehmen
+            os.chmod(tmp_pfad, os.stat(dateipfad).st_mode & 0o777)
+        except OSError:
+            pass
+        os.replace(tmp_pfad, dateipfad)
+    except BaseException:
+        try:
+            os.remove(tmp_pfad)
+        except OSError:
+            pass
+        raise
+    try: # Verzeichniseintrag sichern (nicht auf allen Plattformen möglich, z.B. Windows)
+        dir_fd = os.open(os.path.dirname(os.path.abspath(dateipfad)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import codecs
+import json
+import re
+
+_WHITESPACE = " \t\n\r"
+_TRENNZEICHEN = _WHITESPACE + ",]"
+_DECODER = json.JSONDecoder()
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+MAX_ELEMENT_GROESSE = 1024 * 1024 # Zeichen; ein Buch hat ein paar hundert
+
+
+def iter_json_array(datei, chunk_groesse: int = 64 * 1024, fortschritt=None,
+                    max_element_groesse: int = MAX_ELEMENT_GROESSE):
+    """Liest ein JSON-Top-Level-Array Element für Element aus einer binär geöffneten Datei.
+
+    Es wird nie mehr als ein Chunk plus das aktuelle Element im Speicher gehalten.
+    fortschritt(gelesene_bytes) wird nach jedem gelesenen Chunk aufgerufen.
+    Wirft json.JSONDecodeError bei ungültigem oder abgeschnittenem Inhalt, auch bei Daten nach dem Array
+    (wie json.load; die Elemente davor sind dann schon geliefert). Ein Element, das sich nach
+    max_element_groesse Zeichen noch nicht dekodieren lässt, gilt als ungültig; so wird bei einem
+    kaputten Element nicht der Rest der Datei gepuffert.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    puffer = ""
+    pos = 0
+    gelesen = 0
+    eof = False
+
+    def nachladen():
+        nonlocal puffer, pos, gelesen, eof
+        daten = datei.read(chunk_groesse)
+        gelesen += len(daten)
+        eof = not daten
+        puffer = puffer[pos:] + utf8.decode(daten, final=eof)
+        pos = 0
+        if fortschritt is not None:
+            fortschritt(gelesen)
+
+    def naechstes_zeichen() -> str:
+        """Überspringt Whitespace und gibt das nächste Zeichen zurück ('' am Dateiende)."""
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE_RE.match(puffer, pos).end()
+            if pos < len(puffer) or eof:
+                return puffer[pos] if pos < len(puffer) else ""
+            nachladen()
+
+    def pruefe_dateiende():
+        nonlocal pos
+        pos += 1 # Schließende Klammer
+        if naechstes_zeichen():
+            raise json.JSONDecodeError("Zusätzliche Daten nach dem Array", puffer, pos)
+
+    if naechstes_zeichen() != "[":
+        raise json.JSONDecodeError("Top-Level-Array erwartet", puffer, pos)
+    pos += 1
+    if naechstes_zeichen() == "]":
+        pruefe_dateiende()
+        return
+
+    while True:
+        naechstes_zeichen()
+        while True:
+            try:
+                element, ende = _DECODER.raw_decode(puffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise
+                if len(puffer) - pos > max_element_groesse:
+                    raise json.JSONDecodeError(f"{e.msg} (Element länger als {max_element_groesse} Zeichen)",
+                                               puffer, e.pos) from None
+                nachladen()
+                continue
+            # Ohne folgendes Trennzeichen könnte der Wert abgeschnitten sein (z.B. "2." von "2.5").
+            if not eof and (ende == len(puffer) or puffer[ende] not in _TRENNZEICHEN):
+                nachladen()
+                continue
+            break
+        pos = ende
+        yield element
+
+        zeichen = naechstes_zeichen()
+        if zeichen == "]":
+            pruefe_dateiende()
+            return
+        if zeichen != ",":
+            raise json.JSONDecodeError("',' oder ']' erwartet", puffer, pos)
+        pos += 1
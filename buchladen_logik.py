@@ -1,93 +1,614 @@
 # -*- coding: utf-8 -*-
 import json
+from collections import Counter, OrderedDict
+from itertools import compress
+from operator import not_
+import os
+import sys
+import threading
+import buchladen_metriken as metriken
 from buch_model import Buch # Importiere die Buch-Klasse
+from buchladen_abfrage import Abfrage, ErgebnisAnsicht, abfrage_fuer_filter
+from buchladen_journal import InventarJournal, schreibe_datei_atomar
+from buchladen_json_stream import iter_json_array
+from buchladen_snapshot import SnapshotInventar, schreibe_snapshot, snapshot_pfad
+from buchladen_suche import SuchIndex
+
+ABFRAGE_CACHE_GROESSE = 32 # Ergebnisse, die Buchladen.abfragen für den aktuellen Inventarstand vorhält
+ABFRAGE_SCHRITT = 10000 # Positionen je Teilstück in abfragen_schrittweise (ein Stück passt ins Budget des RenderPlaners)
+SUCHINDEX_NACHZUG_MAX = 2000 # Fehlen dem fertigen Suchindex mehr Bücher, baut ihn ein neuer Hintergrund-Lauf
+
+
+def _zu_ende(schritte):
+    """Führt einen schrittweisen Generator ohne Unterbrechung aus und liefert seinen Rückgabewert."""
+    try:
+        while True:
+            next(schritte)
+    except StopIteration as ende:
+        return ende.value
+
+
+def _buch_aus_dict(item: dict) -> Buch:
+    """Erzeugt ein Buch aus einem Eintrag der buecher.json (fehlende Felder mit Standardwerten)."""
+    return Buch(
+        titel=item.get('titel', 'Unbekannter Titel'),
+        autor=item.get('autor', 'Unbekannter Autor'),
+        kategorie=sys.intern(item.get('kategorie', 'Unbekannte Kategorie')), # Wenige Werte, viele Bücher
+        preis=float(item.get('preis', 0.0)),
+        verboten=bool(item.get('verboten', False)),
+        indiziert=bool(item.get('indiziert', False)),
+        image_path=item.get('image_path', None) # Bildpfad optional
+    )
+
+
+def _buch_zu_dict(buch: Buch) -> dict:
+    """Gegenstück zu _buch_aus_dict: Eintrag im Format der buecher.json."""
+    buch_dict = {
+        "titel": buch.titel,
+        "autor": buch.autor,
+        "kategorie": buch.kategorie,
+        "preis": buch.preis,
+        "verboten": buch.verboten,
+        "indiziert": buch.indiziert
+    }
+    if buch.image_path:
+        buch_dict["image_path"] = buch.image_path
+    return buch_dict
+
+
+def lese_buecher_aus_json(dateipfad: str, batch_groesse: int = 1000, fortschritt=None):
+    """Liest die buecher.json inkrementell und liefert Batches neuer Buch-Objekte.
+
+    Berührt kein Inventar und kann daher in einem Hintergrund-Thread laufen.
+    fortschritt(gelesene_bytes, gesamt_bytes) wird regelmäßig aufgerufen.
+    """
+    gesamt_bytes = os.path.getsize(dateipfad)
+    melde = None
+    if fortschritt is not None:
+        melde = lambda gelesen: fortschritt(gelesen, gesamt_bytes)
+    with open(dateipfad, 'rb') as f:
+        batch = []
+        for item in iter_json_array(f, fortschritt=melde):
+            batch.append(_buch_aus_dict(item))
+            if len(batch) >= batch_groesse:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
 
 class Buchladen:
     """Repräsentiert einen Online-Buchladen mit einem Inventar an Büchern."""
     def __init__(self, name: str):
         self.name = name
         self.inventar = []
+        # Sekundärindizes: Positionen in self.inventar, in Einfügereihenfolge.
+        # Werden in buch_hinzufuegen gepflegt, damit Filter nicht mehr das ganze Inventar scannen.
+        self._kategorie_index = {}  # casefold(kategorie) -> [pos, ...]
+        self._verboten_index = []
+        self._indiziert_index = []
+        self._kategorien = Counter()  # Schreibweise -> Anzahl Bücher, für get_alle_kategorien ohne Inventar-Scan
+        self._kategorien_liste = None  # Sortierte Schreibweisen; verworfen, sobald eine neue hinzukommt
+        # Änderungszähler des Inventars; Ergebnisse im Cache gelten nur für ihre Generation
+        self._generation = 0
+        self._abfrage_cache = OrderedDict()  # (Abfrage, Generation) -> ErgebnisAnsicht, älteste zuerst
+        # Erst aufgebaut, wenn eine Abfrage sie braucht und kein anderer Index hilft (siehe _plane_abfrage)
+        self._autor_index = None  # casefold(autor) -> [pos, ...]
+        self._journale = {}  # dateipfad -> InventarJournal
+        self._ungespeichert = False  # Änderungen, die weder in der Datei noch im Journal stehen (z.B. Rabatte)
+        self._snapshot_thread = None  # Siehe schreibe_snapshot_im_hintergrund
+        self._suchindex = None  # Im Hintergrund aufgebaut (starte_suchindex_aufbau), danach inkrementell gepflegt
+        self._suchindex_aufbau = None  # (Thread, Ergebnisliste, Anzahl indizierter Bücher) während des Aufbaus
+        self._preis_engine = None  # NumPy-Preise in Cent, erst bei Bedarf (numpy wird lazy importiert); auch für Preisbereiche
 
     def buch_hinzufuegen(self, buch: Buch):
         if isinstance(buch, Buch):
+            pos = len(self.inventar)
             self.inventar.append(buch)
+            self._indiziere_buch(pos, buch)
+            if self._suchindex is not None:
+                self._suchindex.hinzufuegen(pos, buch.titel, buch.autor)
+            if self._preis_engine is not None:
+                self._preis_engine.hinzufuegen(pos, buch)
+            if self._autor_index is not None:
+                self._autor_index.setdefault(buch.autor.casefold(), []).append(pos)
+            self._generation += 1 # Wie _inventar_geaendert, aber ohne Aufruf (heißer Pfad beim Laden)
+            if self._abfrage_cache:
+                self._abfrage_cache.clear()
         else:
             print("Fehler: Es können nur Buch-Objekte hinzugefügt werden.")
 
+    def buecher_hinzufuegen(self, buecher: list):
+        """Fügt mehrere Bücher auf einmal hinzu (SQLiteBuchladen: in einer Transaktion)."""
+        for buch in buecher:
+            self.buch_hinzufuegen(buch)
+
+    def _indiziere_buch(self, pos: int, buch: Buch):
+        """Trägt ein Buch an Position pos in die Sekundärindizes ein."""
+        self._kategorie_index.setdefault(buch.kategorie.casefold(), []).append(pos)
+        self._zaehle_kategorie(buch.kategorie)
+        if buch.verboten:
+            self._verboten_index.append(pos)
+        if buch.indiziert:
+            self._indiziert_index.append(pos)
+
+    def _inventar_geaendert(self):
+        """Nach jeder Änderung an Büchern oder Preisen: neue Generation, alte Cache-Einträge verwerfen."""
+        self._generation += 1
+        if self._abfrage_cache:
+            self._abfrage_cache.clear()
+
+    def inventar_geaendert(self):
+        """Aufrufen, nachdem Preis, Titel oder Autor eines Buch-Objekts direkt geändert wurden.
+
+        Verwirft neben den Cache-Einträgen auch die davon abhängigen Indizes (Preis, Autor, Suche);
+        sie werden bei Bedarf neu aufgebaut. Kategorie und Flags lassen sich so nicht ändern.
+        """
+        self._preis_engine = None
+        self._autor_index = None
+        self._suchindex = None
+        self._suchindex_aufbau = None # Ein laufender Aufbau kennt die Änderung womöglich nicht
+        self._inventar_geaendert()
+
+    @property
+    def generation(self) -> int:
+        """Zählt die Änderungen am Inventar; gleiche Generation bedeutet unveränderte Daten."""
+        return self._generation
+
+    def _zaehle_kategorie(self, kategorie: str):
+        anzahl = self._kategorien.get(kategorie, 0)
+        if not anzahl:
+            self._kategorien_liste = None # Neue Schreibweise: sortierte Liste neu aufbauen
+        self._kategorien[kategorie] = anzahl + 1
+
     def lade_buecher_aus_json(self, dateipfad: str):
-        """Lädt Bücher aus einer JSON-Datei in das Inventar."""
+        """Lädt Bücher aus einer JSON-Datei in das Inventar (über den Snapshot, falls er aktuell ist)."""
+        with metriken.messe("laden.snapshot"):
+            snapshot_geladen = self.lade_snapshot(dateipfad)
+            if snapshot_geladen:
+                self.spiele_journal_ab(dateipfad)
+        if snapshot_geladen:
+            print(f"{len(self.inventar)} Bücher aus dem Snapshot von '{dateipfad}' geladen.")
+            return
         try:
-            with open(dateipfad, 'r', encoding='utf-8') as f:
-                buecher_daten = json.load(f)
-                for item in buecher_daten:
-                    buch = Buch(
-                        titel=item.get('titel', 'Unbekannter Titel'),
-                        autor=item.get('autor', 'Unbekannter Autor'),
-                        kategorie=item.get('kategorie', 'Unbekannte Kategorie'),
-                        preis=float(item.get('preis', 0.0)),
-                        verboten=bool(item.get('verboten', False)),
-                        indiziert=bool(item.get('indiziert', False)),
-                        image_path=item.get('image_path', None) # Bildpfad optional
-                    )
-                    self.buch_hinzufuegen(buch)
+            with metriken.messe("laden.json"):
+                for _batch in self.lade_buecher_aus_json_stream(dateipfad):
+                    pass
             print(f"{len(self.inventar)} Bücher erfolgreich aus '{dateipfad}' geladen.")
         except FileNotFoundError:
             print(f"Fehler: JSON-Datei '{dateipfad}' nicht gefunden.")
-        except json.JSONDecodeError:
-            print(f"Fehler: JSON-Datei '{dateipfad}' konnte nicht dekodiert werden.")
+        except json.JSONDecodeError as e:
+            print(f"Fehler: JSON-Datei '{dateipfad}' konnte nicht dekodiert werden ({e}); "
+                  f"Inventar unverändert ({len(self.inventar)} Bücher).")
         except Exception as e:
             print(f"Ein unerwarteter Fehler ist beim Laden der Bücher aufgetreten: {e}")
 
+    def lade_buecher_aus_json_stream(self, dateipfad: str, batch_groesse: int = 1000, fortschritt=None):
+        """Lädt Bücher inkrementell und liefert sie als Batches (Listen), sobald sie im Inventar sind.
+
+        fortschritt(gelesene_bytes, gesamt_bytes) wird regelmäßig aufgerufen.
+        Fehler (FileNotFoundError, json.JSONDecodeError) werden an den Aufrufer weitergereicht;
+        das Inventar wird vorher auf den Stand vor dem Laden zurückgesetzt, gelieferte Batches
+        sind dann also nicht mehr darin.
+        """
+        vorher = len(self.inventar)
+        vollstaendig = not vorher
+        try:
+            for batch in lese_buecher_aus_json(dateipfad, batch_groesse, fortschritt):
+                for buch in batch:
+                    self.buch_hinzufuegen(buch)
+                yield batch
+        except Exception:
+            self._kuerze_inventar(vorher) # Kein halb geladenes Inventar, das später gespeichert werden könnte
+            raise
+        if vollstaendig: # Inventar entspricht genau der Datei: nächster Start kann den Snapshot nutzen
+            self.schreibe_snapshot(dateipfad)
+        # Änderungen, die seit der letzten Kompaktierung nur im Journal stehen
+        nachgetragen = self.spiele_journal_ab(dateipfad)
+        if nachgetragen:
+            yield nachgetragen
+
+    def _kuerze_inventar(self, anzahl: int):
+        """Setzt das Inventar auf seine ersten anzahl Bücher zurück und baut die Indizes dafür neu auf."""
+        behalten = self.inventar[:anzahl] if anzahl else []
+        if isinstance(self.inventar, SnapshotInventar):
+            self.inventar.schliessen()
+        self.inventar = []
+        self._kategorie_index = {}
+        self._verboten_index = []
+        self._indiziert_index = []
+        self._kategorien = Counter()
+        self._kategorien_liste = None
+        self.inventar_geaendert()
+        for buch in behalten:
+            self.buch_hinzufuegen(buch)
+
+    def _journal_fuer(self, dateipfad: str) -> InventarJournal:
+        journal = self._journale.get(dateipfad)
+        if journal is None:
+            journal = self._journale[dateipfad] = InventarJournal(dateipfad)
+        return journal
+
+    def lade_snapshot(self, dateipfad: str) -> bool:
+        """Blendet den Snapshot zu dateipfad ein, wenn er zur JSON-Datei passt; sonst False.
+
+        Nur für ein leeres Inventar. Bücher werden erst beim Zugriff aus dem Snapshot gelesen.
+        """
+        if self.inventar or not os.path.exists(snapshot_pfad(dateipfad)):
+            return False
+        try:
+            inventar = SnapshotInventar(snapshot_pfad(dateipfad))
+        except (OSError, ValueError) as e:
+            print(f"Snapshot von '{dateipfad}' unbrauchbar, lade JSON: {e}")
+            return False
+        if not inventar.ist_aktuell_fuer(dateipfad):
+            inventar.schliessen()
+            return False
+        self.inventar = inventar
+        self._kategorie_index, self._verboten_index, self._indiziert_index = inventar.lade_indizes()
+        self._kategorien = self._zaehle_kategorien(inventar.kategorien)
+        self._kategorien_liste = None
+        self._suchindex = None
+        self._suchindex_aufbau = None # Ein laufender Aufbau gehört zum alten Inventar; sein Ergebnis wird verworfen
+        self._preis_engine = None
+        self._autor_index = None
+        self._inventar_geaendert()
+        return True
+
+    def _zaehle_kategorien(self, schreibweisen: list) -> Counter:
+        """Anzahl je Schreibweise aus dem Kategorie-Index; Bücher werden nur für mehrdeutige Schlüssel gelesen."""
+        nach_schluessel = {}
+        for kategorie in schreibweisen:
+            nach_schluessel.setdefault(kategorie.casefold(), []).append(kategorie)
+        anzahl = Counter()
+        for schluessel, namen in nach_schluessel.items():
+            positionen = self._kategorie_index.get(schluessel, ())
+            if len(namen) == 1:
+                anzahl[namen[0]] = len(positionen)
+            else: # z.B. "Roman" und "roman": gemeinsamer Index, also nachzählen
+                anzahl.update(self.inventar[pos].kategorie for pos in positionen)
+        return anzahl
+
+    def schreibe_snapshot(self, dateipfad: str, buecher: list | None = None) -> bool:
+        """Schreibt das Inventar als Snapshot neben dateipfad (Inventar muss der Datei entsprechen).
+
+        buecher: fester Stand des Inventars, z.B. wenn in einem Hintergrund-Thread geschrieben wird.
+        """
+        if buecher is None and isinstance(self.inventar, SnapshotInventar):
+            # Alle Bücher übernehmen und die Datei freigeben, damit sie ersetzt werden kann (Windows)
+            alt, self.inventar = self.inventar, list(self.inventar)
+            alt.schliessen()
+        try:
+            with metriken.messe("speichern.snapshot"):
+                schreibe_snapshot(snapshot_pfad(dateipfad), self.inventar if buecher is None else buecher, dateipfad)
+            return True
+        except Exception as e:
+            print(f"Fehler beim Schreiben des Snapshots: {e}")
+            return False
+
+    def schreibe_snapshot_im_hintergrund(self, dateipfad: str):
+        """Schreibt den Snapshot des aktuellen Inventars in einem Thread (z.B. direkt nach dem Laden der JSON-Datei).
+
+        Bevor die JSON-Datei neu geschrieben wird, wartet speichere_inventar_in_json auf diesen Thread;
+        sonst könnte er den alten Stand mit Größe und mtime der neuen Datei versehen.
+        """
+        self.warte_auf_snapshot()
+        self._snapshot_thread = threading.Thread(target=self.schreibe_snapshot, args=(dateipfad, list(self.inventar)),
+                                                 name="snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def warte_auf_snapshot(self):
+        """Wartet auf einen laufenden schreibe_snapshot_im_hintergrund (z.B. vor dem Beenden)."""
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+
+    def spiele_journal_ab(self, dateipfad: str) -> list:
+        """Fügt Journal-Einträge hinzu, die noch nicht in der Hauptdatei enthalten sind.
+
+        Erst aufrufen, wenn die Hauptdatei vollständig geladen ist (Positionen werden verglichen).
+        """
+        nachgetragen = []
+        for eintrag in self._journal_fuer(dateipfad).eintraege():
+            if eintrag.get("op") != "add" or eintrag.get("pos", 0) < len(self.inventar):
+                continue # Schon in der Hauptdatei (Absturz nach Kompaktierung) oder unbekannt
+            buch = _buch_aus_dict(eintrag.get("buch", {}))
+            self.buch_hinzufuegen(buch)
+            nachgetragen.append(buch)
+        return nachgetragen
+
+    def buch_hinzufuegen_und_speichern(self, buch: Buch, dateipfad: str):
+        """Fügt ein Buch hinzu und hält es im Journal fest, statt die ganze JSON-Datei neu zu schreiben."""
+        if not isinstance(buch, Buch):
+            print("Fehler: Es können nur Buch-Objekte hinzugefügt werden.")
+            return
+        pos = len(self.inventar)
+        self.buch_hinzufuegen(buch)
+        journal = self._journal_fuer(dateipfad)
+        try:
+            with metriken.messe("speichern.journal"):
+                journal.anhaengen(pos, _buch_zu_dict(buch))
+        except Exception as e:
+            print(f"Fehler beim Schreiben des Journals, speichere vollständig: {e}")
+            self.speichere_inventar_in_json(dateipfad)
+            return
+        if journal.kompaktierung_faellig():
+            self.kompaktiere_journal(dateipfad)
+
+    def kompaktiere_journal(self, dateipfad: str):
+        """Überführt das Journal und nicht journalisierte Änderungen in die JSON-Datei (z.B. beim Beenden der Anwendung)."""
+        if self._ungespeichert or not self._journal_fuer(dateipfad).ist_leer():
+            self.speichere_inventar_in_json(dateipfad)
+
     def berechne_gesamtpreis(self, buch_auswahl: list) -> float:
         """Berechnet den Gesamtpreis für eine Auswahl an Büchern, exklusive verbotener/indizierter."""
-        return sum(buch.preis for buch in buch_auswahl if not buch.verboten)
+        # In ganzen Cent summieren, damit sich keine Float-Rundungsfehler aufaddieren
+        return sum(round(buch.preis * 100) for buch in buch_auswahl if not buch.verboten) / 100
+
+    def preis_engine(self):
+        """Vektorisierte Preis-Engine (buchladen_preise.PreisEngine), beim ersten Aufruf aufgebaut."""
+        if self._preis_engine is None:
+            from buchladen_preise import PreisEngine # numpy nur laden, wenn Preise massenhaft bearbeitet werden
+            self._preis_engine = PreisEngine.aus_inventar(self.inventar)
+        return self._preis_engine
+
+    def rabatt_auf_kategorie(self, kategorie: str, prozent: float) -> int:
+        """Senkt alle Preise einer Kategorie um prozent; gibt die Anzahl geänderter Bücher zurück.
 
-    def suche_nach_kategorie(self, kategorie_suche: str) -> list:
+        Die neuen Preise stehen nicht im Journal: sie werden mit dem nächsten speichere_inventar_in_json
+        geschrieben (spätestens durch kompaktiere_journal beim Beenden).
+        """
+        engine = self.preis_engine()
+        geaendert = engine.rabatt(engine.kategorie_maske(kategorie), prozent)
+        cent = engine.cent
+        for pos in geaendert.tolist(): # Nur geänderte Buch-Objekte anfassen
+            self.inventar[pos].preis = int(cent[pos]) / 100
+        if len(geaendert):
+            self._ungespeichert = True
+            self._inventar_geaendert()
+        return len(geaendert)
+
+    def importiere_kataloge(self, dateipfade: list, konflikt: str = "neuester", prozesse: int | None = None) -> list:
+        """Importiert viele Katalogdateien parallel und ohne Duplikate (siehe buchladen_import.importiere_kataloge).
+
+        Änderungen stehen nicht im Journal; sie werden mit dem nächsten speichere_inventar_in_json
+        geschrieben (spätestens durch kompaktiere_journal beim Beenden).
+        """
+        from buchladen_import import importiere_kataloge # Prozess-Pool nur laden, wenn importiert wird
+        generation = self._generation
+        try:
+            return importiere_kataloge(self, dateipfade, konflikt, prozesse)
+        finally:
+            if self._generation != generation: # Neue Bücher oder übernommene Angebote
+                self._ungespeichert = True
+
+    def _uebernimm_angebot(self, pos: int, neu: Buch) -> bool:
+        """Übernimmt Preis und (falls gesetzt) Bildpfad von neu in das Buch an Position pos; True bei Änderung."""
+        buch = self.inventar[pos]
+        if buch.preis == neu.preis and (not neu.image_path or neu.image_path == buch.image_path):
+            return False
+        buch.preis = neu.preis
+        if neu.image_path:
+            buch.image_path = neu.image_path
+        if self._preis_engine is not None:
+            self._preis_engine.setze_preis(pos, neu.preis)
+        self._inventar_geaendert()
+        return True
+
+    def suche_nach_kategorie(self, kategorie_suche: str) -> ErgebnisAnsicht:
         """Durchsucht das Inventar nach Büchern einer bestimmten Kategorie (case-insensitive)."""
-        # The "alle anzeigen" case and empty kategorie_suche should be handled by get_gefilterte_buecher
-        # This method now assumes kategorie_suche is a valid category string to search for.
-        gefundene_buecher = []
-        for buch in self.inventar:
-            if buch.kategorie.lower() == kategorie_suche.lower():
-                gefundene_buecher.append(buch)
-        return gefundene_buecher
-
-    def get_gefilterte_buecher(self, filter_kriterium: str) -> list:
-        """Gibt eine Liste von Büchern basierend auf dem Filterkriterium zurück."""
-        if not filter_kriterium or filter_kriterium.lower() == "alle anzeigen":
-            return list(self.inventar)
-        elif filter_kriterium.lower() == "nur fsk18":
-            return [buch for buch in self.inventar if buch.indiziert and not buch.verboten]
-        elif filter_kriterium.lower() == "nur verbotene":
-            return [buch for buch in self.inventar if buch.verboten]
-        else: # Annahme: Es ist ein Kategoriename
-            return self.suche_nach_kategorie(filter_kriterium)
+        return self.abfragen(Abfrage(kategorie=kategorie_suche))
+
+    def abfragen(self, abfrage: Abfrage) -> ErgebnisAnsicht:
+        """Alle Bücher, die abfrage erfüllen, in Inventar-Reihenfolge, als lazy Sicht ohne Kopie der Bücher.
+
+        Solange sich das Inventar nicht ändert (siehe generation), kommt das Ergebnis aus einem
+        Cache der letzten ABFRAGE_CACHE_GROESSE Abfragen.
+        """
+        schluessel = (abfrage, self._generation)
+        ergebnis = self._aus_abfrage_cache(schluessel)
+        if ergebnis is None:
+            with metriken.messe("abfrage"):
+                ergebnis = _zu_ende(self._werte_abfrage_aus(abfrage))
+            self._in_abfrage_cache(schluessel, ergebnis)
+        return ergebnis
+
+    def abfragen_schrittweise(self, abfrage: Abfrage):
+        """Wie abfragen, aber als Generator für den RenderPlaner: yield zwischen Teilstücken der Auswertung.
+
+        Das Ergebnis ist der Rückgabewert: ergebnis = yield from buchladen.abfragen_schrittweise(abfrage).
+        Es gilt für den Inventarstand beim Start (unter dem es auch im Cache landet).
+        """
+        schluessel = (abfrage, self._generation)
+        ergebnis = self._aus_abfrage_cache(schluessel)
+        if ergebnis is None:
+            ergebnis = yield from self._werte_abfrage_aus(abfrage)
+            self._in_abfrage_cache(schluessel, ergebnis)
+        return ergebnis
+
+    def _aus_abfrage_cache(self, schluessel: tuple) -> ErgebnisAnsicht | None:
+        ergebnis = self._abfrage_cache.get(schluessel)
+        if ergebnis is None:
+            metriken.zaehle("abfrage.cache.fehlschlag")
+            return None
+        metriken.zaehle("abfrage.cache.treffer")
+        self._abfrage_cache.move_to_end(schluessel)
+        return ergebnis
+
+    def _in_abfrage_cache(self, schluessel: tuple, ergebnis: ErgebnisAnsicht):
+        self._abfrage_cache[schluessel] = ergebnis
+        if len(self._abfrage_cache) > ABFRAGE_CACHE_GROESSE:
+            self._abfrage_cache.popitem(last=False)
+
+    def _werte_abfrage_aus(self, abfrage: Abfrage):
+        """Wertet abfrage ohne Cache aus; Generator, der zwischen Teilstücken von ABFRAGE_SCHRITT Positionen yieldet.
+
+        Reine Index-Treffer (z.B. eine Kategorie) verweisen direkt auf die Positionsliste des Index,
+        "alle Bücher" auf einen range; nur wenn Bedingungen geprüft werden müssen, entsteht eine
+        Liste der passenden Positionen (ein Zeiger je Treffer, die int-Objekte teilt sie mit dem Index).
+        """
+        if abfrage.ohne_bedingungen:
+            return ErgebnisAnsicht(self, range(len(self.inventar)))
+        index_name, kandidaten = self._plane_abfrage(abfrage)
+        metriken.zaehle(f"abfrage.index.{index_name}")
+        pruefungen = abfrage.pruefungen(index_name)
+        if not pruefungen:
+            return ErgebnisAnsicht(self, kandidaten)
+        ergebnis = []
+        anzahl = len(kandidaten)
+        for start in range(0, anzahl, ABFRAGE_SCHRITT):
+            positionen = kandidaten[start:start + ABFRAGE_SCHRITT]
+            buecher = list(map(self.inventar.__getitem__, positionen))
+            for i, (pruefe, soll) in enumerate(pruefungen): # Eine Bedingung nach der anderen, Kandidaten schrumpfen
+                maske = map(pruefe, buecher) if soll else map(not_, map(pruefe, buecher))
+                maske = list(maske)
+                positionen = list(compress(positionen, maske))
+                if i + 1 < len(pruefungen):
+                    buecher = list(compress(buecher, maske))
+            ergebnis.extend(positionen)
+            if start + ABFRAGE_SCHRITT < anzahl:
+                yield
+        return ErgebnisAnsicht(self, ergebnis)
+
+    def _plane_abfrage(self, abfrage: Abfrage) -> tuple:
+        """Wählt den Index mit den wenigsten Kandidaten; liefert (name, aufsteigende Positionen).
+
+        Autor-Index und Preis-Engine werden nur aufgebaut, wenn kein anderer Index hilft; einmal
+        aufgebaut, werden sie danach wie die übrigen Indizes berücksichtigt.
+        Ohne passenden Index ist das Ergebnis ("scan", alle Positionen).
+        """
+        kandidaten = []
+        if abfrage.kategorie is not None:
+            kandidaten.append(("kategorie", self._kategorie_index.get(abfrage.kategorie.casefold(), [])))
+        if abfrage.verboten:
+            kandidaten.append(("verboten", self._verboten_index))
+        if abfrage.indiziert:
+            kandidaten.append(("indiziert", self._indiziert_index))
+        if abfrage.autor is not None and (self._autor_index is not None or not kandidaten):
+            if self._autor_index is None:
+                with metriken.messe("abfrage.autor_index_aufbauen"):
+                    self._autor_index = {}
+                    for pos, buch in enumerate(self.inventar):
+                        self._autor_index.setdefault(buch.autor.casefold(), []).append(pos)
+            kandidaten.append(("autor", self._autor_index.get(abfrage.autor.casefold(), [])))
+        bester = min(kandidaten, key=lambda k: len(k[1]), default=("scan", range(len(self.inventar))))
+        if abfrage.hat_preisbereich and (self._preis_engine is not None or not kandidaten):
+            if self._preis_engine is None:
+                with metriken.messe("abfrage.preis_engine_aufbauen"):
+                    self.preis_engine()
+            positionen = self._preis_engine.positionen_im_preisbereich(abfrage.min_preis, abfrage.max_preis)
+            if len(positionen) < len(bester[1]):
+                bester = ("preis", positionen.tolist())
+        return bester
+
+    def starte_suchindex_aufbau(self):
+        """Baut den Suchindex in einem Hintergrund-Thread (z.B. direkt nach dem Laden des Inventars).
+
+        Bücher, die währenddessen hinzukommen, werden bei der Übernahme nachgetragen.
+        """
+        if self._suchindex is not None or self._suchindex_aufbau is not None:
+            return
+        anzahl = len(self.inventar)
+        quellen = self._titel_und_autoren(anzahl)
+        ergebnis = []
+        thread = threading.Thread(target=lambda: ergebnis.append(self._baue_suchindex(quellen)),
+                                  name="suchindex", daemon=True)
+        self._suchindex_aufbau = (thread, ergebnis, anzahl)
+        thread.start()
+
+    def suchindex_bereit(self) -> bool:
+        """True, wenn suche() ohne Warten antworten kann; sonst wird der Aufbau (weiter) im Hintergrund betrieben."""
+        if self._suchindex is not None:
+            return True
+        if self._suchindex_aufbau is None:
+            self.starte_suchindex_aufbau()
+            return False
+        thread, _ergebnis, anzahl = self._suchindex_aufbau
+        if thread.is_alive():
+            return False
+        if len(self.inventar) - anzahl > SUCHINDEX_NACHZUG_MAX: # Z.B. während des Ladens gestartet
+            self._suchindex_aufbau = None
+            self.starte_suchindex_aufbau()
+            return False
+        self._uebernimm_suchindex()
+        return True
+
+    def _titel_und_autoren(self, anzahl: int):
+        """(titel, autor) der ersten anzahl Bücher; wird im Suchindex-Thread durchlaufen."""
+        if isinstance(self.inventar, SnapshotInventar):
+            return self.inventar.titel_und_autoren(anzahl) # Ohne 300k Buch-Objekte zu erzeugen
+        return ((buch.titel, buch.autor) for buch in self.inventar[:anzahl])
+
+    @staticmethod
+    def _baue_suchindex(quellen) -> SuchIndex:
+        suchindex = SuchIndex()
+        for pos, (titel, autor) in enumerate(quellen):
+            suchindex.hinzufuegen(pos, titel, autor)
+        suchindex.vorbereiten()
+        return suchindex
+
+    def _uebernimm_suchindex(self):
+        """Wartet auf den Hintergrund-Aufbau und trägt seitdem hinzugekommene Bücher nach."""
+        thread, ergebnis, anzahl = self._suchindex_aufbau
+        thread.join()
+        self._suchindex_aufbau = None
+        if not ergebnis: # Thread mit Fehler beendet: hier erneut, damit der Fehler sichtbar wird
+            ergebnis.append(self._baue_suchindex(self._titel_und_autoren(anzahl)))
+        suchindex = ergebnis[0]
+        for pos in range(anzahl, len(self.inventar)):
+            buch = self.inventar[pos]
+            suchindex.hinzufuegen(pos, buch.titel, buch.autor)
+        self._suchindex = suchindex
+
+    def suche(self, anfrage: str, limit: int = 20) -> list:
+        """Volltextsuche in Titel und Autor (Präfix- und Tippfehler-tolerant), beste Treffer zuerst.
+
+        Mehrere Wörter müssen alle vorkommen. Ist der Suchindex noch nicht fertig, wird auf ihn
+        gewartet; die GUI fragt deshalb vorher suchindex_bereit().
+        """
+        if self._suchindex is None:
+            with metriken.messe("suche.index_aufbauen"):
+                self.starte_suchindex_aufbau()
+                self._uebernimm_suchindex()
+        with metriken.messe("suche"):
+            return [self.inventar[pos] for pos, _punkte in self._suchindex.suche(anfrage, limit)]
+
+    def get_gefilterte_buecher(self, filter_kriterium: str) -> ErgebnisAnsicht:
+        """Gibt die Bücher zum Filterkriterium als lazy Sicht zurück (siehe abfragen)."""
+        with metriken.messe("filter"):
+            return self._filtere(filter_kriterium)
+
+    def filtere_schrittweise(self, filter_kriterium: str):
+        """Generator-Variante von get_gefilterte_buecher für den RenderPlaner (siehe abfragen_schrittweise)."""
+        return self.abfragen_schrittweise(abfrage_fuer_filter(filter_kriterium))
+
+    def _filtere(self, filter_kriterium: str) -> ErgebnisAnsicht:
+        """Die eigentliche Filterung (ohne Messung), als Abfrage (siehe abfrage_fuer_filter)."""
+        return self.abfragen(abfrage_fuer_filter(filter_kriterium))
 
     def get_alle_kategorien(self) -> list:
         """Gibt eine Liste aller einzigartigen Kategorien im Inventar zurück."""
-        kategorien = set()
-        for buch in self.inventar:
-            kategorien.add(buch.kategorie)
-        return sorted(list(kategorien))
+        if self._kategorien_liste is None:
+            self._kategorien_liste = sorted(self._kategorien)
+        return list(self._kategorien_liste)
+
+    def get_kategorie_anzahlen(self) -> dict:
+        """Anzahl Bücher je Kategorie (Schreibweise wie im Inventar); wird beim Hinzufügen mitgezählt."""
+        return dict(self._kategorien)
 
-    def speichere_inventar_in_json(self, dateipfad: str):
+    def speichere_inventar_in_json(self, dateipfad: str) -> bool:
         """Speichert das aktuelle Inventar als JSON in die angegebene Datei."""
-        buecher_daten_liste = []
-        for buch in self.inventar:
-            buch_dict = {
-                "titel": buch.titel,
-                "autor": buch.autor,
-                "kategorie": buch.kategorie,
-                "preis": buch.preis,
-                "verboten": buch.verboten,
-                "indiziert": buch.indiziert
-            }
-            if buch.image_path:
-                buch_dict["image_path"] = buch.image_path
-            buecher_daten_liste.append(buch_dict)
+        self.warte_auf_snapshot() # Sein Snapshot gehört zum alten Stand der Datei
+        buecher_daten_liste = [_buch_zu_dict(buch) for buch in self.inventar]
         try:
-            with open(dateipfad, 'w', encoding='utf-8') as f:
-                json.dump(buecher_daten_liste, f, indent=2, ensure_ascii=False)
+            # Atomar ersetzen: ein Absturz während des Schreibens lässt die alte Datei intakt.
+            with metriken.messe("speichern.json"):
+                schreibe_datei_atomar(dateipfad, lambda f: json.dump(buecher_daten_liste, f, indent=2, ensure_ascii=False))
+            self._journal_fuer(dateipfad).leeren() # Alles steht jetzt in der Hauptdatei
+            self._ungespeichert = False
             print(f"Inventar erfolgreich in '{dateipfad}' gespeichert.")
+            self.schreibe_snapshot(dateipfad) # Alter Snapshot passt nicht mehr zur neuen Datei
+            return True
         except Exception as e:
             print(f"Fehler beim Speichern des Inventars in JSON: {e}")
+            return False
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+import bisect
+import json
+import os
+import threading
+import time
+
+# Leichtgewichtige Metriken für die heißen Pfade (Laden, Filtern, Rendern, Cover, Download, Speichern).
+#
+# Standardmäßig aus: dann kosten zaehle() und messe() nur einen Funktionsaufruf und eine Abfrage.
+# Aktiviert über aktivieren() bzw. in main.py über die Umgebungsvariablen
+#   BUCHLADEN_METRIKEN=1        Zusammenfassung beim Beenden auf stdout
+#   BUCHLADEN_TRACE=<pfad>      zusätzlich Chrome-Trace (chrome://tracing, Perfetto) nach <pfad>
+
+# Obergrenzen der Latenz-Buckets in Millisekunden (annähernd logarithmisch), darüber: Überlauf-Bucket
+BUCKET_GRENZEN_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_BUCKET_NAMEN = [f"<={g}ms" for g in BUCKET_GRENZEN_MS] + [f">{BUCKET_GRENZEN_MS[-1]}ms"]
+MAX_TRACE_EREIGNISSE = 500_000 # Danach werden keine Trace-Ereignisse mehr gesammelt (Zähler laufen weiter)
+
+_aktiv = False
+_trace_aktiv = False
+_lock = threading.Lock()
+_zaehler = {}
+_timer = {}
+_trace = []
+_start_ns = time.perf_counter_ns()
+
+
+class _Histogramm:
+    """Anzahl, Summe, Min/Max und Bucket-Zähler einer Latenz-Messreihe."""
+    __slots__ = ("anzahl", "summe_ms", "min_ms", "max_ms", "buckets")
+
+    def __init__(self):
+        self.anzahl = 0
+        self.summe_ms = 0.0
+        self.min_ms = float("inf")
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKET_GRENZEN_MS) + 1)
+
+    def erfassen(self, dauer_ms: float):
+        self.anzahl += 1
+        self.summe_ms += dauer_ms
+        self.min_ms = min(self.min_ms, dauer_ms)
+        self.max_ms = max(self.max_ms, dauer_ms)
+        self.buckets[bisect.bisect_left(BUCKET_GRENZEN_MS, dauer_ms)] += 1
+
+    def perzentil_ms(self, anteil: float) -> float:
+        """Obergrenze des Buckets, in dem das Perzentil liegt (für den Überlauf-Bucket: das Maximum)."""
+        ziel = anteil * self.anzahl
+        kumuliert = 0
+        for i, anzahl in enumerate(self.buckets):
+            kumuliert += anzahl
+            if kumuliert >= ziel and anzahl:
+                return min(BUCKET_GRENZEN_MS[i], self.max_ms) if i < len(BUCKET_GRENZEN_MS) else self.max_ms
+        return self.max_ms
+
+    def als_dict(self) -> dict:
+        return {
+            "anzahl": self.anzahl,
+            "summe_ms": round(self.summe_ms, 3),
+            "mittel_ms": round(self.summe_ms / self.anzahl, 3) if self.anzahl else 0.0,
+            "min_ms": round(self.min_ms, 3) if self.anzahl else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.perzentil_ms(0.5),
+            "p90_ms": self.perzentil_ms(0.9),
+            "p99_ms": self.perzentil_ms(0.99),
+            "buckets": {name: n for name, n in zip(_BUCKET_NAMEN, self.buckets) if n},
+        }
+
+
+class _Messung:
+    """Kontextmanager für messe(); misst die Dauer des with-Blocks."""
+    __slots__ = ("name", "start_ns")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _erfasse(self.name, self.start_ns, time.perf_counter_ns())
+        return False
+
+
+class _KeineMessung:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_KEINE_MESSUNG = _KeineMessung()
+
+
+def aktivieren(trace: bool = False):
+    """Schaltet die Erfassung ein; mit trace werden zusätzlich Einzelereignisse gesammelt."""
+    global _aktiv, _trace_aktiv
+    _aktiv = True
+    _trace_aktiv = trace
+
+
+def deaktivieren():
+    global _aktiv, _trace_aktiv
+    _aktiv = False
+    _trace_aktiv = False
+
+
+def ist_aktiv() -> bool:
+    return _aktiv
+
+
+def zuruecksetzen():
+    with _lock:
+        _zaehler.clear()
+        _timer.clear()
+        _trace.clear()
+
+
+def zaehle(name: str, anzahl: int = 1):
+    """Erhöht einen Zähler (z.B. Cache-Treffer)."""
+    if not _aktiv:
+        return
+    with _lock:
+        _zaehler[name] = _zaehler.get(name, 0) + anzahl
+
+
+def messe(name: str):
+    """with metriken.messe("filter"): ... erfasst die Dauer als Timer name."""
+    if not _aktiv:
+        return _KEINE_MESSUNG
+    return _Messung(name)
+
+
+def jetzt_ns() -> int:
+    """Startzeitpunkt für erfasse_seit(), z.B. wenn Beginn und Ende in verschiedenen Callbacks liegen."""
+    return time.perf_counter_ns()
+
+
+def erfasse_seit(name: str, start_ns: int):
+    """Erfasst die Dauer seit start_ns (aus jetzt_ns()) als Timer name."""
+    if _aktiv:
+        _erfasse(name, start_ns, time.perf_counter_ns())
+
+
+def _erfasse(name: str, start_ns: int, ende_ns: int):
+    dauer_ms = (ende_ns - start_ns) / 1e6
+    with _lock:
+        histogramm = _timer.get(name)
+        if histogramm is None:
+            histogramm = _timer[name] = _Histogramm()
+        histogramm.erfassen(dauer_ms)
+        if _trace_aktiv and len(_trace) < MAX_TRACE_EREIGNISSE:
+            _trace.append((name, start_ns, ende_ns, threading.get_ident()))
+
+
+def zusammenfassung() -> dict:
+    """Zähler und Timer (mit Perzentilen und Buckets) als dict."""
+    with _lock:
+        return {
+            "zaehler": dict(sorted(_zaehler.items())),
+            "timer": {name: h.als_dict() for name, h in sorted(_timer.items())},
+        }
+
+
+def zusammenfassung_text() -> str:
+    """Lesbare Tabelle, sortiert nach Gesamtzeit."""
+    daten = zusammenfassung()
+    zeilen = [f"{'Timer':32s} {'Anzahl':>8s} {'Summe ms':>11s} {'p50':>8s} {'p90':>8s} {'p99':>8s} {'max':>9s}"]
+    for name, t in sorted(daten["timer"].items(), key=lambda e: -e[1]["summe_ms"]):
+        zeilen.append(f"{name:32s} {t['anzahl']:8d} {t['summe_ms']:11.1f} {t['p50_ms']:8.2f} "
+                      f"{t['p90_ms']:8.2f} {t['p99_ms']:8.2f} {t['max_ms']:9.2f}")
+    if daten["zaehler"]:
+        zeilen.append("")
+        zeilen.append(f"{'Zähler':32s} {'Wert':>8s}")
+        zeilen.extend(f"{name:32s} {wert:8d}" for name, wert in daten["zaehler"].items())
+    return "\n".join(zeilen)
+
+
+def exportiere_trace(dateipfad: str):
+    """Schreibt die gesammelten Ereignisse im Chrome-Trace-Format ("traceEvents" mit "X"-Ereignissen)."""
+    pid = os.getpid()
+    with _lock:
+        ereignisse = [{"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                       "ts": (start_ns - _start_ns) / 1000, "dur": (ende_ns - start_ns) / 1000}
+                      for name, start_ns, ende_ns, tid in _trace]
+        zaehler = dict(_zaehler)
+    if zaehler: # Endstände der Zähler als Counter-Ereignis am Ende der Aufzeichnung
+        ereignisse.append({"name": "zaehler", "ph": "C", "pid": pid, "tid": 0,
+                           "ts": (time.perf_counter_ns() - _start_ns) / 1000, "args": zaehler})
+    with open(dateipfad, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": ereignisse, "displayTimeUnit": "ms"}, f)
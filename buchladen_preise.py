@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+STANDARD_MWST_PROZENT = 7 # Ermäßigter Satz für Bücher in Deutschland
+
+
+class PreisEngine:
+    """Preise des Inventars als Ganzzahl-Cent in einem NumPy-Array (Index = Position im Inventar).
+
+    Alle Operationen sind vektorisiert und rechnen exakt in Cent; gerundet wird
+    kaufmännisch (halbe Cent aufwärts) genau einmal pro Preis.
+    """
+    def __init__(self, kapazitaet: int = 1024):
+        kapazitaet = max(16, kapazitaet)
+        self.anzahl = 0
+        self._cent = np.zeros(kapazitaet, dtype=np.int64)
+        self._verboten = np.zeros(kapazitaet, dtype=bool)
+        self._indiziert = np.zeros(kapazitaet, dtype=bool)
+        self._kategorie = np.zeros(kapazitaet, dtype=np.int32)
+        self._kategorie_codes = {}  # casefold(kategorie) -> Code
+
+    @classmethod
+    def aus_inventar(cls, inventar) -> "PreisEngine":
+        engine = cls(len(inventar))
+        for pos, buch in enumerate(inventar):
+            engine.hinzufuegen(pos, buch)
+        return engine
+
+    # Sichten auf die belegten Einträge
+    @property
+    def cent(self) -> np.ndarray:
+        return self._cent[:self.anzahl]
+
+    @property
+    def verboten(self) -> np.ndarray:
+        return self._verboten[:self.anzahl]
+
+    @property
+    def indiziert(self) -> np.ndarray:
+        return self._indiziert[:self.anzahl]
+
+    def _vergroessern(self):
+        neu = len(self._cent) * 2
+        for name in ("_cent", "_verboten", "_indiziert", "_kategorie"):
+            alt = getattr(self, name)
+            array = np.zeros(neu, dtype=alt.dtype)
+            array[:len(alt)] = alt
+            setattr(self, name, array)
+
+    def hinzufuegen(self, pos: int, buch):
+        """Hängt ein Buch an; pos muss der nächsten Inventarposition entsprechen."""
+        if pos != self.anzahl:
+            raise ValueError(f"PreisEngine erwartet Position {self.anzahl}, nicht {pos}")
+        if self.anzahl == len(self._cent):
+            self._vergroessern()
+        self._cent[pos] = int(round(buch.preis * 100))
+        self._verboten[pos] = buch.verboten
+        self._indiziert[pos] = buch.indiziert
+        key = buch.kategorie.casefold()
+        self._kategorie[pos] = self._kategorie_codes.setdefault(key, len(self._kategorie_codes))
+        self.anzahl += 1
+
+    def setze_preis(self, pos: int, preis: float):
+        self._cent[pos] = int(round(preis * 100))
+
+    def kategorie_maske(self, kategorie: str) -> np.ndarray:
+        code = self._kategorie_codes.get(kategorie.casefold())
+        if code is None:
+            return np.zeros(self.anzahl, dtype=bool)
+        return self._kategorie[:self.anzahl] == code
+
+    def rabatt(self, maske: np.ndarray, prozent: float) -> np.ndarray:
+        """Senkt die Preise unter maske um prozent; liefert die Positionen mit geändertem Preis."""
+        basispunkte = int(round(prozent * 100))
+        alt = self.cent[maske]
+        neu = (alt * (10000 - basispunkte) + 5000) // 10000
+        positionen = np.flatnonzero(maske)
+        self.cent[positionen] = neu
+        return positionen[neu != alt]
+
+    def positionen_im_preisbereich(self, min_preis: float | None = None, max_preis: float | None = None) -> np.ndarray:
+        """Positionen mit min_preis <= Preis <= max_preis (Grenzen optional, in Euro), aufsteigend.
+
+        Die Grenzen werden auf ganze Cent nach innen gerundet, sodass das Ergebnis dem Vergleich
+        mit den Euro-Preisen der Bücher entspricht (z.B. min_preis=9.995 schließt 9,99 € aus).
+        """
+        maske = np.ones(self.anzahl, dtype=bool)
+        if min_preis is not None:
+            untergrenze = round(min_preis * 100)
+            if untergrenze / 100 < min_preis:
+                untergrenze += 1
+            maske &= self.cent >= untergrenze
+        if max_preis is not None:
+            obergrenze = round(max_preis * 100)
+            if obergrenze / 100 > max_preis:
+                obergrenze -= 1
+            maske &= self.cent <= obergrenze
+        return np.flatnonzero(maske)
+
+    def mwst_cent(self, positionen=None, satz_prozent: float = STANDARD_MWST_PROZENT) -> np.ndarray:
+        """Im Bruttopreis enthaltene Mehrwertsteuer je Buch in Cent."""
+        brutto = self.cent if positionen is None else self.cent[positionen]
+        satz_bp = int(round(satz_prozent * 100))
+        return (brutto * satz_bp * 2 + (10000 + satz_bp)) // (2 * (10000 + satz_bp))
+
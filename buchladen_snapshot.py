@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import mmap
+import os
+import struct
+import sys
+from array import array
+from buch_model import Buch
+from buchladen_journal import schreibe_datei_atomar
+
+# Binärer Snapshot der buecher.json, der beim Start per mmap eingeblendet wird.
+#
+# Aufbau (little-endian):
+#   Header      _HEADER, u.a. Größe und mtime der JSON-Datei, aus der der Snapshot stammt
+#   Datensätze  anzahl x _DATENSATZ (feste Breite, Zugriff per Position)
+#   Strings     UTF-8-Blob; Datensätze verweisen per (offset, länge) hinein
+#   Kategorien  kategorien_anzahl x (offset, länge) der Kategorienamen
+#   Indexe      index_anzahl x _INDEX_EINTRAG (casefold-Kategorie -> Positionsliste),
+#               danach die Positionslisten als u32, ebenso verbotene und indizierte Bücher
+
+SNAPSHOT_MAGIC = b"BUCHSNAP"
+SNAPSHOT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIQQ QQQ QI QI QI QI")
+_DATENSATZ = struct.Struct("<6IHBd")  # titel, autor, image_path (je offset, länge), kategorie_nr, flags, preis
+_STRING_REF = struct.Struct("<II")
+_INDEX_EINTRAG = struct.Struct("<IIQI")  # schlüssel (offset, länge), positionen_offset, anzahl
+
+_KEIN_STRING = 0xFFFFFFFF  # Länge für image_path = None
+_FLAG_VERBOTEN = 1
+_FLAG_INDIZIERT = 2
+
+
+def snapshot_pfad(json_dateipfad: str) -> str:
+    return json_dateipfad + ".snapshot"
+
+
+def _u32_array(daten: bytes) -> array:
+    positionen = array('I')
+    positionen.frombytes(daten)
+    if sys.byteorder != "little":
+        positionen.byteswap()
+    return positionen
+
+
+def _u32_bytes(positionen: array) -> bytes:
+    if sys.byteorder != "little":
+        positionen = array('I', positionen)
+        positionen.byteswap()
+    return positionen.tobytes()
+
+
+def schreibe_snapshot(snapshot_dateipfad: str, buecher, json_dateipfad: str):
+    """Schreibt die Bücher als Snapshot, gültig für den aktuellen Stand von json_dateipfad."""
+    stat = os.stat(json_dateipfad)
+    buecher = list(buecher)
+    strings = bytearray()
+    geteilt = {}  # Autoren, Kategorien und Bildpfade wiederholen sich oft
+
+    def string_ref(text: str | None, teilen: bool = False) -> tuple:
+        if text is None:
+            return 0, _KEIN_STRING
+        if teilen and text in geteilt:
+            return geteilt[text]
+        daten = text.encode("utf-8")
+        ref = (len(strings), len(daten))
+        strings.extend(daten)
+        if teilen:
+            geteilt[text] = ref
+        return ref
+
+    kategorie_nummern = {}
+    kategorie_refs = []
+    kategorie_index = {}
+    kategorie_positionen = []  # kategorie_nr -> Positionsliste ihres casefold-Schlüssels
+    verboten, indiziert = array('I'), array('I')
+    datensaetze = bytearray(_DATENSATZ.size * len(buecher))
+    pack_into, groesse = _DATENSATZ.pack_into, _DATENSATZ.size
+    for pos, buch in enumerate(buecher):
+        kategorie = buch.kategorie
+        nr = kategorie_nummern.get(kategorie)
+        if nr is None:
+            nr = kategorie_nummern[kategorie] = len(kategorie_refs)
+            kategorie_refs.append(string_ref(kategorie, teilen=True))
+            kategorie_positionen.append(kategorie_index.setdefault(kategorie.casefold(), array('I')))
+        kategorie_positionen[nr].append(pos)
+        flags = 0
+        if buch.verboten:
+            flags |= _FLAG_VERBOTEN
+            verboten.append(pos)
+        if buch.indiziert:
+            flags |= _FLAG_INDIZIERT
+            indiziert.append(pos)
+        titel = buch.titel.encode("utf-8") # Titel sind fast immer eindeutig: nicht teilen
+        titel_offset = len(strings)
+        strings += titel
+        autor = geteilt.get(buch.autor) or string_ref(buch.autor, teilen=True)
+        bild = (0, _KEIN_STRING) if buch.image_path is None else (
+            geteilt.get(buch.image_path) or string_ref(buch.image_path, teilen=True))
+        pack_into(datensaetze, pos * groesse, titel_offset, len(titel), *autor, *bild, nr, flags, float(buch.preis))
+    index_schluessel = [(string_ref(schluessel, teilen=True), positionen)
+                        for schluessel, positionen in kategorie_index.items()]
+
+    datensaetze_offset = _HEADER.size
+    strings_offset = datensaetze_offset + len(datensaetze)
+    kategorien_offset = strings_offset + len(strings)
+    index_offset = kategorien_offset + _STRING_REF.size * len(kategorie_refs)
+    daten_offset = index_offset + _INDEX_EINTRAG.size * len(index_schluessel)
+    verzeichnis = bytearray()
+    positionen_daten = bytearray()
+    for (schluessel_offset, schluessel_laenge), positionen in index_schluessel:
+        verzeichnis += _INDEX_EINTRAG.pack(schluessel_offset, schluessel_laenge,
+                                           daten_offset + len(positionen_daten), len(positionen))
+        positionen_daten += _u32_bytes(positionen)
+    verboten_offset = daten_offset + len(positionen_daten)
+    indiziert_offset = verboten_offset + 4 * len(verboten)
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(buecher), stat.st_size, stat.st_mtime_ns,
+                          datensaetze_offset, strings_offset, len(strings),
+                          kategorien_offset, len(kategorie_refs), index_offset, len(index_schluessel),
+                          verboten_offset, len(verboten), indiziert_offset, len(indiziert))
+
+    def schreiben(f):
+        f.write(header)
+        f.write(datensaetze)
+        f.write(strings)
+        for ref in kategorie_refs:
+            f.write(_STRING_REF.pack(*ref))
+        f.write(verzeichnis)
+        f.write(positionen_daten)
+        f.write(_u32_bytes(verboten))
+        f.write(_u32_bytes(indiziert))
+
+    schreibe_datei_atomar(snapshot_dateipfad, schreiben, binaer=True)
+
+
+class SnapshotInventar:
+    """Lazy Sequenz über einen per mmap eingeblendeten Snapshot; neue Bücher werden hinten angehängt.
+
+    Öffnen kostet unabhängig von der Katalog-Größe nur das Lesen des Headers und der Kategorien.
+    Einmal erzeugte Buch-Objekte werden wiederverwendet (wie bei _SQLiteInventar).
+    """
+    def __init__(self, snapshot_dateipfad: str):
+        with open(snapshot_dateipfad, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._lies_header()
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise
+        self._objekte = {}  # pos -> Buch
+        self._neu = []      # Nach dem Öffnen angehängte Bücher
+
+    def _lies_header(self):
+        if len(self._mm) < _HEADER.size:
+            raise ValueError("Snapshot ist zu kurz")
+        (magic, version, self._anzahl, self.json_groesse, self.json_mtime_ns,
+         self._datensaetze_offset, self._strings_offset, strings_laenge,
+         kategorien_offset, kategorien_anzahl, self._index_offset, self._index_anzahl,
+         self._verboten_offset, self._verboten_anzahl,
+         self._indiziert_offset, self._indiziert_anzahl) = _HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Unbekanntes Snapshot-Format")
+        ende = self._indiziert_offset + 4 * self._indiziert_anzahl
+        if (ende != len(self._mm) or
+                self._datensaetze_offset + _DATENSATZ.size * self._anzahl > self._strings_offset):
+            raise ValueError("Snapshot ist unvollständig oder beschädigt")
+        self.kategorien = [
+            sys.intern(self._string(*_STRING_REF.unpack_from(self._mm, kategorien_offset + i * _STRING_REF.size)))
+            for i in range(kategorien_anzahl)]
+
+    def ist_aktuell_fuer(self, json_dateipfad: str) -> bool:
+        """True, wenn die JSON-Datei seit dem Schreiben des Snapshots unverändert ist."""
+        try:
+            stat = os.stat(json_dateipfad)
+        except OSError:
+            return False
+        return stat.st_size == self.json_groesse and stat.st_mtime_ns == self.json_mtime_ns
+
+    def _string(self, offset: int, laenge: int) -> str | None:
+        if laenge == _KEIN_STRING:
+            return None
+        start = self._strings_offset + offset
+        return str(self._mm[start:start + laenge], "utf-8")
+
+    def _lies_buch(self, pos: int) -> Buch:
+        (titel_offset, titel_laenge, autor_offset, autor_laenge, bild_offset, bild_laenge,
+         kategorie_nr, flags, preis) = _DATENSATZ.unpack_from(self._mm, self._datensaetze_offset + pos * _DATENSATZ.size)
+        return Buch(self._string(titel_offset, titel_laenge), self._string(autor_offset, autor_laenge),
+                    self.kategorien[kategorie_nr], preis,
+                    bool(flags & _FLAG_VERBOTEN), bool(flags & _FLAG_INDIZIERT),
+                    self._string(bild_offset, bild_laenge))
+
+    def titel_und_autoren(self, anzahl: int):
+        """(titel, autor) der ersten anzahl Bücher, ohne Buch-Objekte zu erzeugen (für den Suchindex-Thread)."""
+        for pos in range(min(anzahl, self._anzahl)):
+            titel_offset, titel_laenge, autor_offset, autor_laenge = _DATENSATZ.unpack_from(
+                self._mm, self._datensaetze_offset + pos * _DATENSATZ.size)[:4]
+            yield self._string(titel_offset, titel_laenge), self._string(autor_offset, autor_laenge)
+        for buch in self._neu[:max(0, anzahl - self._anzahl)]:
+            yield buch.titel, buch.autor
+
+    def lade_indizes(self) -> tuple:
+        """Liefert (kategorie_index, verboten_index, indiziert_index) als array('I'), anhängbar."""
+        kategorie_index = {}
+        for i in range(self._index_anzahl):
+            schluessel_offset, schluessel_laenge, offset, anzahl = _INDEX_EINTRAG.unpack_from(
+                self._mm, self._index_offset + i * _INDEX_EINTRAG.size)
+            kategorie_index[self._string(schluessel_offset, schluessel_laenge)] = _u32_array(self._mm[offset:offset + 4 * anzahl])
+        verboten = _u32_array(self._mm[self._verboten_offset:self._verboten_offset + 4 * self._verboten_anzahl])
+        indiziert = _u32_array(self._mm[self._indiziert_offset:self._indiziert_offset + 4 * self._indiziert_anzahl])
+        return kategorie_index, verboten, indiziert
+
+    def __len__(self) -> int:
+        return self._anzahl + len(self._neu)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        buch = self._objekte.get(index) # Häufigster Fall: schon erzeugt
+        if buch is not None:
+            return buch
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Inventar-Index außerhalb des gültigen Bereichs")
+        if index >= self._anzahl:
+            return self._neu[index - self._anzahl]
+        buch = self._objekte.get(index)
+        if buch is None:
+            buch = self._objekte[index] = self._lies_buch(index)
+        return buch
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
+
+    def append(self, buch: Buch):
+        self._neu.append(buch)
+
+    def schliessen(self):
+        self._mm.close()
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+from array import array
+from collections import Counter
+from buch_model import Buch
+from buchladen_abfrage import Abfrage, ErgebnisAnsicht
+from buchladen_logik import ABFRAGE_SCHRITT, Buchladen, lese_buecher_aus_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buecher (
+    id INTEGER PRIMARY KEY,          -- = Position im Inventar + 1
+    titel TEXT NOT NULL,
+    autor TEXT NOT NULL,
+    kategorie TEXT NOT NULL,
+    kategorie_key TEXT NOT NULL,     -- casefold(kategorie), SQLite kann nicht Unicode-casefolden
+    preis REAL NOT NULL,
+    verboten INTEGER NOT NULL,
+    indiziert INTEGER NOT NULL,
+    image_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_buecher_kategorie ON buecher(kategorie_key);
+CREATE INDEX IF NOT EXISTS idx_buecher_preis ON buecher(preis);
+CREATE INDEX IF NOT EXISTS idx_buecher_status ON buecher(verboten, indiziert);
+"""
+
+_SPALTEN = "id, titel, autor, kategorie, preis, verboten, indiziert, image_path"
+_MAX_SQL_VARIABLEN = 900 # Unter dem Limit älterer SQLite-Versionen (999)
+
+
+class _SQLiteInventar:
+    """Lazy Sequenz über die Tabelle buecher; Bücher werden erst beim Zugriff erzeugt.
+
+    Einmal erzeugte Buch-Objekte werden wiederverwendet, damit dasselbe Buch
+    (z.B. im Einkaufswagen) immer dasselbe Objekt ist.
+    """
+    def __init__(self, laden: "SQLiteBuchladen"):
+        self._laden = laden
+        self._anzahl = laden._conn.execute("SELECT COUNT(*) FROM buecher").fetchone()[0]
+        self._objekte = {} # id -> Buch
+        self._ids = {}     # id(Buch) -> Zeilen-id
+
+    def __len__(self) -> int:
+        return self._anzahl
+
+    def __bool__(self) -> bool:
+        return self._anzahl > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._anzahl))]
+        if index < 0:
+            index += self._anzahl
+        if not 0 <= index < self._anzahl:
+            raise IndexError("Inventar-Index außerhalb des gültigen Bereichs")
+        buch = self._objekte.get(index + 1)
+        if buch is None:
+            row = self._laden._conn.execute(f"SELECT {_SPALTEN} FROM buecher WHERE id = ?", (index + 1,)).fetchone()
+            buch = self._buch_aus_row(row)
+        return buch
+
+    def __iter__(self):
+        cursor = self._laden._conn.execute(f"SELECT {_SPALTEN} FROM buecher ORDER BY id")
+        for row in cursor:
+            yield self._buch_aus_row(row)
+
+    def _buch_aus_row(self, row) -> Buch:
+        zeilen_id = row[0]
+        buch = self._objekte.get(zeilen_id)
+        if buch is None:
+            buch = Buch(row[1], row[2], row[3], row[4], bool(row[5]), bool(row[6]), row[7])
+            self._objekte[zeilen_id] = buch
+            self._ids[id(buch)] = zeilen_id
+        return buch
+
+    def zeilen_id(self, buch: Buch) -> int | None:
+        """Zeilen-id eines aus der Datenbank stammenden Buches, sonst None."""
+        zeilen_id = self._ids.get(id(buch))
+        if zeilen_id is not None and self._objekte.get(zeilen_id) is buch:
+            return zeilen_id
+        return None
+
+    def positionen(self, sql_bedingung: str, parameter: tuple = (), schritt: int = ABFRAGE_SCHRITT):
+        """Positionen (Zeilen-id - 1) der passenden Bücher, ohne Bücher zu erzeugen.
+
+        Generator: liest schritt Zeilen je Teilstück und yieldet dazwischen; das array ist der Rückgabewert.
+        """
+        cursor = self._laden._conn.execute(f"SELECT id - 1 FROM buecher WHERE {sql_bedingung} ORDER BY id", parameter)
+        positionen = array('I')
+        while True:
+            zeilen = cursor.fetchmany(schritt)
+            positionen.extend(row[0] for row in zeilen)
+            if len(zeilen) < schritt:
+                return positionen
+            yield
+
+
+class SQLiteBuchladen(Buchladen):
+    """Buchladen, dessen Inventar in einer lokalen SQLite-Datenbank liegt.
+
+    Filter, Kategorien und Summen werden als SQL ausgeführt; beim Start wird nur
+    gezählt, nicht geladen. Die öffentliche API entspricht der von Buchladen.
+    """
+    def __init__(self, name: str, db_pfad: str):
+        super().__init__(name)
+        self.db_pfad = db_pfad
+        self._conn = sqlite3.connect(db_pfad)
+        self._conn.create_function("casefold", 1, str.casefold, deterministic=True) # Für Autor-Abfragen
+        self._conn.executescript(_SCHEMA)
+        self.inventar = _SQLiteInventar(self)
+        self._kategorien = None # Counter aus der Datenbank, erst bei Bedarf (siehe _lade_kategorien)
+
+    def _einfuegen(self, buecher: list):
+        start_id = self.inventar._anzahl + 1
+        self._conn.executemany(
+            "INSERT INTO buecher (id, titel, autor, kategorie, kategorie_key, preis, verboten, indiziert, image_path) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(start_id + i, b.titel, b.autor, b.kategorie, b.kategorie.casefold(), b.preis,
+              int(b.verboten), int(b.indiziert), b.image_path) for i, b in enumerate(buecher)])
+        for i, buch in enumerate(buecher):
+            self.inventar._objekte[start_id + i] = buch
+            self.inventar._ids[id(buch)] = start_id + i
+            if self._suchindex is not None:
+                self._suchindex.hinzufuegen(start_id + i - 1, buch.titel, buch.autor)
+            if self._preis_engine is not None:
+                self._preis_engine.hinzufuegen(start_id + i - 1, buch)
+            if self._kategorien is not None:
+                self._zaehle_kategorie(buch.kategorie)
+        self.inventar._anzahl += len(buecher)
+        if buecher:
+            self._inventar_geaendert()
+
+    def buch_hinzufuegen(self, buch: Buch):
+        if isinstance(buch, Buch):
+            with self._conn:
+                self._einfuegen([buch])
+        else:
+            print("Fehler: Es können nur Buch-Objekte hinzugefügt werden.")
+
+    def buecher_hinzufuegen(self, buecher: list):
+        with self._conn:
+            self._einfuegen([buch for buch in buecher if isinstance(buch, Buch)])
+
+    def _uebernimm_angebot(self, pos: int, neu: Buch) -> bool:
+        if not super()._uebernimm_angebot(pos, neu):
+            return False
+        buch = self.inventar[pos]
+        with self._conn:
+            self._conn.execute("UPDATE buecher SET preis = ?, image_path = ? WHERE id = ?",
+                               (buch.preis, buch.image_path, pos + 1))
+        return True
+
+    def buch_hinzufuegen_und_speichern(self, buch: Buch, dateipfad: str):
+        """Die Datenbank ist selbst persistent; ein Journal ist nicht nötig."""
+        self.buch_hinzufuegen(buch)
+
+    def kompaktiere_journal(self, dateipfad: str):
+        pass # Kein Journal im SQLite-Backend
+
+    def lade_snapshot(self, dateipfad: str) -> bool:
+        return False # Die Datenbank wird ohnehin lazy gelesen
+
+    def _titel_und_autoren(self, anzahl: int):
+        conn = sqlite3.connect(self.db_pfad) # Eigene Verbindung: läuft im Suchindex-Thread
+        try:
+            yield from conn.execute("SELECT titel, autor FROM buecher WHERE id <= ? ORDER BY id", (anzahl,))
+        finally:
+            conn.close()
+
+    def schreibe_snapshot(self, dateipfad: str, buecher: list | None = None) -> bool:
+        return False
+
+    def lade_buecher_aus_json_stream(self, dateipfad: str, batch_groesse: int = 1000, fortschritt=None):
+        """Importiert die JSON-Datei nur, wenn die Datenbank noch leer ist (erster Start)."""
+        if self.inventar:
+            return
+        try:
+            with self._conn: # Bei einem Fehler wird der ganze Import zurückgerollt
+                for batch in lese_buecher_aus_json(dateipfad, batch_groesse, fortschritt):
+                    self._einfuegen(batch)
+                    yield batch
+        except Exception:
+            self._kuerze_inventar(0)
+            raise
+
+    def _kuerze_inventar(self, anzahl: int):
+        """Nach einem Rollback: Zähler und Objekte neu aus der Datenbank, statt Bücher zu entfernen."""
+        self.inventar = _SQLiteInventar(self)
+        self._kategorien = None
+        self._kategorien_liste = None
+        self.inventar_geaendert()
+
+    def lade_buecher_aus_json(self, dateipfad: str):
+        """Importiert die JSON-Datei beim ersten Start; danach wird die Datenbank direkt verwendet."""
+        if self.inventar:
+            print(f"{len(self.inventar)} Bücher in Datenbank '{self.db_pfad}' vorhanden.")
+            return
+        super().lade_buecher_aus_json(dateipfad)
+
+    def _werte_abfrage_aus(self, abfrage: Abfrage):
+        """Die Abfrage als SQL (den Index wählt SQLite selbst); Bücher werden erst beim Zugriff gelesen."""
+        if abfrage.ohne_bedingungen:
+            return ErgebnisAnsicht(self, range(len(self.inventar)))
+        bedingungen, parameter = [], []
+        if abfrage.kategorie is not None:
+            bedingungen.append("kategorie_key = ?")
+            parameter.append(abfrage.kategorie.casefold())
+        if abfrage.autor is not None:
+            bedingungen.append("casefold(autor) = ?")
+            parameter.append(abfrage.autor.casefold())
+        if abfrage.min_preis is not None:
+            bedingungen.append("preis >= ?")
+            parameter.append(abfrage.min_preis)
+        if abfrage.max_preis is not None:
+            bedingungen.append("preis <= ?")
+            parameter.append(abfrage.max_preis)
+        if abfrage.verboten is not None:
+            bedingungen.append("verboten = ?")
+            parameter.append(int(abfrage.verboten))
+        if abfrage.indiziert is not None:
+            bedingungen.append("indiziert = ?")
+            parameter.append(int(abfrage.indiziert))
+        positionen = yield from self.inventar.positionen(" AND ".join(bedingungen), tuple(parameter))
+        return ErgebnisAnsicht(self, positionen)
+
+    def _lade_kategorien(self):
+        """Zählt die Kategorien einmal per SQL; danach pflegt _einfuegen die Anzahlen."""
+        if self._kategorien is None:
+            self._kategorien = Counter(dict(self._conn.execute("SELECT kategorie, COUNT(*) FROM buecher GROUP BY kategorie")))
+            self._kategorien_liste = None
+
+    def get_alle_kategorien(self) -> list:
+        self._lade_kategorien()
+        return super().get_alle_kategorien()
+
+    def get_kategorie_anzahlen(self) -> dict:
+        self._lade_kategorien()
+        return super().get_kategorie_anzahlen()
+
+    def berechne_gesamtpreis(self, buch_auswahl: list) -> float:
+        """Summiert Bücher aus der Datenbank per SQL; fremde Buch-Objekte werden direkt addiert."""
+        mengen = Counter()
+        summe_cent = 0 # Exakt in Cent rechnen, wie Buchladen.berechne_gesamtpreis
+        for buch in buch_auswahl:
+            zeilen_id = self.inventar.zeilen_id(buch)
+            if zeilen_id is None:
+                if not buch.verboten:
+                    summe_cent += round(buch.preis * 100)
+            else:
+                mengen[zeilen_id] += 1
+        paare = list(mengen.items())
+        schritt = _MAX_SQL_VARIABLEN // 2
+        for start in range(0, len(paare), schritt):
+            teil = paare[start:start + schritt]
+            werte = ", ".join("(?, ?)" for _ in teil)
+            parameter = tuple(x for paar in teil for x in paar)
+            row = self._conn.execute(
+                f"WITH auswahl(id, menge) AS (VALUES {werte}) "
+                "SELECT SUM(CAST(ROUND(b.preis * 100) AS INTEGER) * a.menge) "
+                "FROM auswahl a JOIN buecher b ON b.id = a.id WHERE b.verboten = 0",
+                parameter).fetchone()
+            summe_cent += row[0] or 0
+        return summe_cent / 100
+
+    def rabatt_auf_kategorie(self, kategorie: str, prozent: float) -> int:
+        """Rabatt direkt per SQL (gleiche Cent-Rundung wie PreisEngine.rabatt), ohne alle Bücher zu laden."""
+        faktor_bp = 10000 - int(round(prozent * 100))
+        key = kategorie.casefold()
+        with self._conn:
+            # rowcount zählt getroffene Zeilen; unveränderte Cent-Beträge (z.B. 0 %) daher gar nicht erst treffen
+            cursor = self._conn.execute(
+                "UPDATE buecher SET preis = ((CAST(ROUND(preis * 100) AS INTEGER) * ? + 5000) / 10000) / 100.0 "
+                "WHERE kategorie_key = ? "
+                "AND (CAST(ROUND(preis * 100) AS INTEGER) * ? + 5000) / 10000 != CAST(ROUND(preis * 100) AS INTEGER)",
+                (faktor_bp, key, faktor_bp))
+        if not cursor.rowcount:
+            return 0
+        # Bereits erzeugte Buch-Objekte und die Preis-Engine mit den Preisen aus der Datenbank nachziehen;
+        # nachgerechnet würde Pythons round (halbe Cent zur geraden Zahl) von SQLites ROUND abweichen
+        objekte = self.inventar._objekte
+        for zeilen_id, preis in self._conn.execute("SELECT id, preis FROM buecher WHERE kategorie_key = ?", (key,)):
+            buch = objekte.get(zeilen_id)
+            if buch is not None:
+                buch.preis = preis
+            if self._preis_engine is not None:
+                self._preis_engine.setze_preis(zeilen_id - 1, preis)
+        self._inventar_geaendert()
+        return cursor.rowcount
+
+    def schliessen(self):
+        self._conn.close()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from itertools import groupby
+
+_UMLAUTE = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_TOKEN_RE = re.compile(r"\w+")
+
+# Gewichte je Trefferart und Feld für das Ranking
+GEWICHT_EXAKT = 1.0
+GEWICHT_PRAEFIX = 0.7
+GEWICHT_FUZZY = 0.5
+GEWICHT_TITEL = 1.0
+GEWICHT_AUTOR = 0.8
+MAX_PRAEFIX_ERWEITERUNGEN = 64 # Begrenzt die Arbeit bei sehr kurzen Präfixen
+
+
+def normalisiere(text: str) -> str:
+    """Case- und Umlaut-Folding: 'Größe' -> 'groesse', 'Exupéry' -> 'exupery'."""
+    text = text.casefold()
+    if text.isascii():
+        return text # Häufigster Fall; translate und NFKD sind beim Indexaufbau der größte Posten
+    text = text.translate(_UMLAUTE)
+    zerlegt = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in zerlegt if not unicodedata.combining(c))
+
+
+def tokenisiere(text: str) -> list:
+    return _TOKEN_RE.findall(normalisiere(text))
+
+
+def _loeschvarianten(wort: str, max_distanz: int) -> set:
+    """Alle Varianten von wort mit bis zu max_distanz gelöschten Zeichen (SymSpell-Verfahren)."""
+    if max_distanz == 1: # Standardfall beim Indexaufbau ohne die allgemeine Schleife
+        return {wort[:i] + wort[i + 1:] for i in range(len(wort))} | {wort}
+    varianten = {wort}
+    aktuelle = {wort}
+    for _ in range(max_distanz):
+        naechste = set()
+        for v in aktuelle:
+            for i in range(len(v)):
+                naechste.add(v[:i] + v[i + 1:])
+        varianten |= naechste
+        aktuelle = naechste
+    return varianten
+
+
+def _levenshtein_begrenzt(a: str, b: str, grenze: int) -> int:
+    """Editierdistanz von a und b; bricht ab und liefert grenze + 1, sobald sie überschritten ist."""
+    if abs(len(a) - len(b)) > grenze:
+        return grenze + 1
+    vorher = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        aktuell = [i]
+        for j, cb in enumerate(b, start=1):
+            aktuell.append(min(vorher[j] + 1, aktuell[j - 1] + 1, vorher[j - 1] + (ca != cb)))
+        if min(aktuell) > grenze:
+            return grenze + 1
+        vorher = aktuell
+    return vorher[-1]
+
+
+class SuchIndex:
+    """Invertierter Index über Titel und Autor mit Präfix- und Fuzzy-Suche.
+
+    Dokumente sind Positionen im Inventar; die Postings sind aufsteigend sortiert, solange
+    Positionen aufsteigend hinzugefügt werden. Fuzzy-Treffer werden über Löschvarianten
+    des Vokabulars gefunden, sodass keine Suche das ganze Vokabular durchläuft.
+
+    Mehrere Anfrage-Tokens müssen alle passen (UND). Gewertet wird entlang des Tokens mit den
+    wenigsten Postings, Liste für Liste absteigend nach Gewicht; sobald die Top-k feststehen und
+    keine weitere Liste sie mehr verdrängen kann, bricht die Suche ab.
+    """
+    def __init__(self, max_distanz: int = 1):
+        self.max_distanz = max_distanz
+        self.anzahl_dokumente = 0
+        self._titel_postings = {}  # token -> [pos, ...]
+        self._autor_postings = {}
+        self._vokabular = []       # sortiert, für Präfixsuche per Bisektion
+        self._neue_tokens = []     # noch nicht einsortiert; wird vor der nächsten Suche nachgezogen
+        self._loeschungen = {}     # Löschvariante -> [token, ...]
+
+    def hinzufuegen(self, pos: int, titel: str, autor: str):
+        self.anzahl_dokumente += 1
+        for postings, andere, text in ((self._titel_postings, self._autor_postings, titel),
+                                       (self._autor_postings, self._titel_postings, autor)):
+            for token in set(tokenisiere(text)):
+                liste = postings.get(token)
+                if liste is None:
+                    postings[token] = [pos]
+                    if token not in andere: # Sonst schon im anderen Feld bekannt
+                        self._neues_token(token)
+                else:
+                    liste.append(pos)
+
+    def _neues_token(self, token: str):
+        self._neue_tokens.append(token)
+        for variante in _loeschvarianten(token, self.max_distanz):
+            self._loeschungen.setdefault(variante, []).append(token)
+
+    def vorbereiten(self):
+        """Sortiert neue Tokens ins Vokabular ein (sonst bei der nächsten Suche), z.B. am Ende des Aufbaus."""
+        # Einmal sortieren statt pro Token einfügen: insort kostet bei 300k Tokens quadratisch viel
+        if self._neue_tokens:
+            self._vokabular.extend(self._neue_tokens)
+            self._vokabular.sort()
+            self._neue_tokens = []
+
+    def _dokumentfrequenz(self, token: str) -> int:
+        return len(self._titel_postings.get(token, ())) + len(self._autor_postings.get(token, ()))
+
+    def _kandidaten(self, anfrage_token: str) -> dict:
+        """token -> Gewicht für exakte, Präfix- und Fuzzy-Treffer eines Anfrage-Tokens."""
+        self.vorbereiten()
+        kandidaten = {}
+        if self._dokumentfrequenz(anfrage_token):
+            kandidaten[anfrage_token] = GEWICHT_EXAKT
+
+        i = bisect_left(self._vokabular, anfrage_token)
+        erweiterungen = 0
+        while (i < len(self._vokabular) and erweiterungen < MAX_PRAEFIX_ERWEITERUNGEN
+               and self._vokabular[i].startswith(anfrage_token)):
+            kandidaten.setdefault(self._vokabular[i], GEWICHT_PRAEFIX)
+            erweiterungen += 1
+            i += 1
+
+        # Kurze Wörter nicht fuzzy suchen, sonst passt fast alles
+        grenze = min(self.max_distanz, max(0, (len(anfrage_token) - 1) // 3))
+        if grenze:
+            gesehen = set()
+            for variante in _loeschvarianten(anfrage_token, grenze):
+                for token in self._loeschungen.get(variante, ()):
+                    if token in kandidaten or token in gesehen:
+                        continue
+                    gesehen.add(token)
+                    distanz = _levenshtein_begrenzt(anfrage_token, token, grenze)
+                    if distanz <= grenze:
+                        kandidaten[token] = GEWICHT_FUZZY / distanz
+        return kandidaten
+
+    def _listen(self, anfrage_token: str) -> list:
+        """[(wert, postings), ...] aller Kandidaten eines Anfrage-Tokens, absteigend nach wert."""
+        listen = []
+        for token, gewicht in self._kandidaten(anfrage_token).items():
+            idf = math.log(1 + self.anzahl_dokumente / self._dokumentfrequenz(token))
+            for postings, feld_gewicht in ((self._titel_postings, GEWICHT_TITEL),
+                                           (self._autor_postings, GEWICHT_AUTOR)):
+                liste = postings.get(token)
+                if liste:
+                    listen.append((gewicht * feld_gewicht * idf, liste))
+        listen.sort(key=lambda eintrag: eintrag[0], reverse=True)
+        return listen
+
+    def suche(self, anfrage: str, limit: int = 20) -> list:
+        """Liefert die besten Treffer als Liste von (pos, punkte), absteigend nach Relevanz.
+
+        Ein Buch bekommt je Anfrage-Token das Gewicht seines besten Kandidaten; Tokens ohne
+        jeden Kandidaten werden ignoriert, alle übrigen müssen passen.
+        """
+        if limit <= 0:
+            return []
+        je_token = [listen for listen in map(self._listen, set(tokenisiere(anfrage))) if listen]
+        if not je_token:
+            return []
+        je_token.sort(key=lambda listen: sum(len(liste) for _wert, liste in listen))
+        treiber, uebrige = je_token[0], je_token[1:]
+        treiber_groesse = sum(len(liste) for _wert, liste in treiber)
+        nachschlagen = [_wert_nachschlagen(listen, treiber_groesse) for listen in uebrige]
+        rest_hoechstens = sum(listen[0][0] for listen in uebrige)
+
+        treffer = [] # Min-Heap aus (punkte, -pos): an der Spitze steht der schwächste der Top-k
+        gesehen = set()
+        for wert, gruppe in groupby(treiber, key=lambda eintrag: eintrag[0]):
+            schranke = wert + rest_hoechstens # Mehr kann kein Buch aus dieser oder einer späteren Gruppe erreichen
+            if len(treffer) == limit and treffer[0][0] > schranke:
+                break
+            listen = [liste for _wert, liste in gruppe]
+            for pos in (heapq.merge(*listen) if len(listen) > 1 else listen[0]):
+                if pos in gesehen:
+                    continue # Schon über einen höher gewichteten Kandidaten erfasst
+                gesehen.add(pos)
+                if len(treffer) == limit:
+                    schwaechster, minus_pos = treffer[0]
+                    if schwaechster > schranke or (schwaechster == schranke and -minus_pos < pos):
+                        break # Rest der Gruppe hat höhere Positionen und höchstens gleich viele Punkte
+                punkte = wert
+                for nachschlag in nachschlagen:
+                    zusatz = nachschlag(pos)
+                    if zusatz is None:
+                        break
+                    punkte += zusatz
+                else:
+                    if len(treffer) < limit:
+                        heapq.heappush(treffer, (punkte, -pos))
+                    elif (punkte, -pos) > treffer[0]:
+                        heapq.heapreplace(treffer, (punkte, -pos))
+            else:
+                continue
+            break
+        # Bei gleicher Punktzahl gewinnt das früher eingefügte Buch
+        return [(-minus_pos, punkte) for punkte, minus_pos in sorted(treffer, reverse=True)]
+
+
+def _wert_nachschlagen(listen: list, treiber_groesse: int):
+    """Funktion pos -> bestes Gewicht (oder None) über die absteigend sortierten listen eines Tokens.
+
+    Solange der Treiber nicht mehr Positionen hat, als die Postings lang sind, wird per Bisektion
+    gesucht; sonst lohnt es sich, einmal ein Wörterbuch zu bauen.
+    """
+    gesamt = sum(len(liste) for _wert, liste in listen)
+    if treiber_groesse * len(listen) <= gesamt:
+        def nachschlag(pos):
+            for wert, liste in listen:
+                i = bisect_left(liste, pos)
+                if i < len(liste) and liste[i] == pos:
+                    return wert
+            return None
+        return nachschlag
+    beste = {}
+    for wert, liste in reversed(listen): # Höhere Gewichte überschreiben niedrigere
+        beste.update(dict.fromkeys(liste, wert))
+    return beste.get
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from buch_model import Buch
+
+# Ereignisse, die an Abonnenten gemeldet werden: callback(ereignis, zeile)
+HINZUGEFUEGT = "hinzugefügt"   # neue Zeile am Ende
+GEAENDERT = "geändert"         # Menge einer bestehenden Zeile
+ENTFERNT = "entfernt"          # Zeile gelöscht, folgende Zeilen rücken nach
+GELEERT = "geleert"            # alles entfernt (zeile ist None)
+
+
+def preis_in_cent(preis: float) -> int:
+    return int(round(preis * 100))
+
+
+class Warenkorb:
+    """Einkaufswagen mit Mengen je Buch und laufender Gesamtsumme.
+
+    Die Summe (in Cent, ohne verbotene Bücher wie Buchladen.berechne_gesamtpreis) wird bei
+    jeder Änderung in O(1) nachgeführt. Jede Zeile merkt sich ihren Einzelpreis in Cent vom
+    Hinzufügen; eine spätere Preisänderung am Buch verfälscht die Summe beim Entfernen also nicht
+    (erneutes Hinzufügen übernimmt den neuen Preis für die ganze Zeile). Abonnenten erfahren, welche Zeile sich geändert hat,
+    und können so gezielt nur diese neu zeichnen.
+    """
+    def __init__(self):
+        self._zeilen = []        # [Buch, ...] in Reihenfolge des ersten Hinzufügens
+        self._mengen = {}        # Buch -> Menge
+        self._einzelpreise = {}  # Buch -> Cent je Exemplar beim Hinzufügen (0 für verbotene Bücher)
+        self._zeilen_index = {}  # Buch -> Zeile
+        self._gesamt_cent = 0
+        self._anzahl_artikel = 0
+        self._abonnenten = []
+
+    def abonnieren(self, callback):
+        self._abonnenten.append(callback)
+
+    def _melde(self, ereignis: str, zeile: int | None):
+        for callback in self._abonnenten:
+            callback(ereignis, zeile)
+
+    def __len__(self) -> int:
+        """Anzahl der Zeilen (verschiedene Bücher)."""
+        return len(self._zeilen)
+
+    def __bool__(self) -> bool:
+        return bool(self._zeilen)
+
+    def __getitem__(self, zeile: int) -> tuple:
+        """(Buch, Menge) der angegebenen Zeile."""
+        buch = self._zeilen[zeile]
+        return buch, self._mengen[buch]
+
+    @property
+    def anzahl_artikel(self) -> int:
+        return self._anzahl_artikel
+
+    @property
+    def gesamt_cent(self) -> int:
+        return self._gesamt_cent
+
+    @property
+    def gesamtpreis(self) -> float:
+        return self._gesamt_cent / 100
+
+    def _aendere_summe(self, buch: Buch, menge: int):
+        self._anzahl_artikel += menge
+        self._gesamt_cent += self._einzelpreise[buch] * menge
+
+    def hinzufuegen(self, buch: Buch, menge: int = 1):
+        einzelpreis = 0 if buch.verboten else preis_in_cent(buch.preis)
+        zeile = self._zeilen_index.get(buch)
+        if zeile is None:
+            zeile = len(self._zeilen)
+            self._zeilen.append(buch)
+            self._zeilen_index[buch] = zeile
+            self._mengen[buch] = menge
+            ereignis = HINZUGEFUEGT
+        else:
+            # Inzwischen umgepreist: die vorhandenen Exemplare auf den neuen Preis umbuchen
+            self._gesamt_cent += (einzelpreis - self._einzelpreise[buch]) * self._mengen[buch]
+            self._mengen[buch] += menge
+            ereignis = GEAENDERT
+        self._einzelpreise[buch] = einzelpreis
+        self._aendere_summe(buch, menge)
+        self._melde(ereignis, zeile)
+
+    def entfernen(self, zeile: int, menge: int = 1):
+        """Verringert die Menge einer Zeile; bei 0 wird die Zeile gelöscht."""
+        buch = self._zeilen[zeile]
+        menge = min(menge, self._mengen[buch])
+        self._mengen[buch] -= menge
+        self._aendere_summe(buch, -menge)
+        if self._mengen[buch] > 0:
+            self._melde(GEAENDERT, zeile)
+            return
+        del self._zeilen[zeile]
+        del self._mengen[buch]
+        del self._einzelpreise[buch]
+        del self._zeilen_index[buch]
+        for i in range(zeile, len(self._zeilen)):
+            self._zeilen_index[self._zeilen[i]] = i
+        self._melde(ENTFERNT, zeile)
+
+    def leeren(self):
+        self._zeilen.clear()
+        self._mengen.clear()
+        self._einzelpreise.clear()
+        self._zeilen_index.clear()
+        self._gesamt_cent = 0
+        self._anzahl_artikel = 0
+        self._melde(GELEERT, None)
+
+    def als_liste(self) -> list:
+        """Alle Artikel als flache Liste (Duplikate mehrfach), z.B. für Buchladen.berechne_gesamtpreis."""
+        return [buch for buch in self._zeilen for _ in range(self._mengen[buch])]
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+import customtkinter as ctk
+import buchladen_metriken as metriken
+
+
+class VirtuelleListe(ctk.CTkFrame):
+    """Scrollbare Button-Liste, die nur Widgets für die sichtbaren Zeilen (plus Overscan) erzeugt.
+
+    Die Buttons werden beim Scrollen wiederverwendet; die Kosten einer Aktualisierung hängen
+    daher nur von der Fensterhöhe ab, nicht von der Anzahl der Einträge.
+    zeilen_text(idx) liefert den Text einer Zeile, on_select(idx) wird bei Auswahl aufgerufen.
+    """
+    def __init__(self, master, on_select=None, zeilen_hoehe: int = 54, overscan: int = 2,
+                 width: int = 400, height: int = 400, **kwargs):
+        super().__init__(master, width=width, height=height, **kwargs)
+        self.on_select = on_select
+        self.zeilen_hoehe = zeilen_hoehe
+        self.overscan = overscan
+
+        self._anzahl = 0
+        self._zeilen_text = lambda idx: ""
+        self._offset = 0.0          # Scrollposition in Pixeln
+        self._auswahl = None
+        self._pool = []             # wiederverwendete Buttons
+        self._pool_zustand = []     # (idx, text, ausgewaehlt) je Button, um unnötige configure-Aufrufe zu sparen
+        self._breite = width
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self._flaeche = ctk.CTkFrame(self, fg_color="transparent", width=width, height=height)
+        self._flaeche.grid(row=0, column=0, sticky="nswe")
+        self._scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self._scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self._flaeche.bind("<Configure>", self._on_resize)
+        self._binde_mausrad(self._flaeche)
+
+    # --- Öffentliche API ---
+
+    def setze_daten(self, anzahl: int, zeilen_text):
+        """Ersetzt den Inhalt; Scrollposition und Auswahl werden zurückgesetzt."""
+        self._anzahl = anzahl
+        self._zeilen_text = zeilen_text
+        self._offset = 0.0
+        self._auswahl = None
+        self._pool_zustand = [None] * len(self._pool)
+        self._render()
+
+    def setze_anzahl(self, anzahl: int):
+        """Ändert nur die Anzahl (z.B. nach Anhängen); Scrollposition bleibt erhalten."""
+        self._anzahl = anzahl
+        if self._auswahl is not None and self._auswahl >= anzahl:
+            self._auswahl = None
+        self._offset = min(self._offset, self._max_offset())
+        self._render()
+
+    def zeile_geaendert(self, idx: int):
+        """Zeichnet eine einzelne Zeile neu, falls sie gerade sichtbar ist."""
+        for k, zustand in enumerate(self._pool_zustand):
+            if zustand is not None and zustand[0] == idx:
+                self._pool_zustand[k] = None
+        self._render()
+
+    def aktualisieren(self):
+        """Zeichnet alle sichtbaren Zeilen neu."""
+        self._pool_zustand = [None] * len(self._pool)
+        self._render()
+
+    @property
+    def auswahl(self):
+        return self._auswahl
+
+    def waehle(self, idx: int | None, benachrichtigen: bool = True):
+        """Setzt die Auswahl (None hebt sie auf) und scrollt die Zeile bei Bedarf in den sichtbaren Bereich."""
+        self._auswahl = idx
+        if idx is not None:
+            self.zeige_index(idx)
+        self._render()
+        if idx is not None and benachrichtigen and self.on_select is not None:
+            self.on_select(idx)
+
+    def zeige_index(self, idx: int):
+        oben = idx * self.zeilen_hoehe
+        unten = oben + self.zeilen_hoehe
+        hoehe = self._sichtbare_hoehe()
+        if oben < self._offset:
+            self._offset = float(oben)
+        elif unten > self._offset + hoehe:
+            self._offset = float(unten - hoehe)
+        self._offset = max(0.0, min(self._offset, self._max_offset()))
+
+    # --- Interna ---
+
+    def _sichtbare_hoehe(self) -> int:
+        return max(1, int(self._reverse_widget_scaling(self._flaeche.winfo_height())))
+
+    def _max_offset(self) -> float:
+        return float(max(0, self._anzahl * self.zeilen_hoehe - self._sichtbare_hoehe()))
+
+    def _passe_pool_an(self):
+        benoetigt = math.ceil(self._sichtbare_hoehe() / self.zeilen_hoehe) + 1 + 2 * self.overscan
+        while len(self._pool) < benoetigt:
+            k = len(self._pool)
+            btn = ctk.CTkButton(self._flaeche, text="", anchor="w", width=max(50, self._breite - 10),
+                                height=self.zeilen_hoehe - 6, command=lambda k=k: self._on_klick(k))
+            self._binde_mausrad(btn)
+            self._pool.append(btn)
+            self._pool_zustand.append(None)
+
+    def _render(self):
+        self._passe_pool_an()
+        erster = max(0, int(self._offset // self.zeilen_hoehe) - self.overscan)
+        for k, btn in enumerate(self._pool):
+            idx = erster + k
+            if idx >= self._anzahl:
+                if self._pool_zustand[k] != "versteckt":
+                    btn.place_forget()
+                    self._pool_zustand[k] = "versteckt"
+                continue
+            ausgewaehlt = idx == self._auswahl
+            text = self._zeilen_text(idx)
+            zustand = (idx, text, ausgewaehlt)
+            if self._pool_zustand[k] != zustand:
+                btn.configure(text=text, state="disabled" if ausgewaehlt else "normal")
+                self._pool_zustand[k] = zustand
+            btn.place(x=5, y=idx * self.zeilen_hoehe - self._offset + 3)
+        self._aktualisiere_scrollbar()
+
+    def _aktualisiere_scrollbar(self):
+        gesamt = self._anzahl * self.zeilen_hoehe
+        if gesamt <= 0:
+            self._scrollbar.set(0.0, 1.0)
+            return
+        self._scrollbar.set(self._offset / gesamt, min(1.0, (self._offset + self._sichtbare_hoehe()) / gesamt))
+
+    def _scrolle_zu(self, offset: float):
+        offset = max(0.0, min(offset, self._max_offset()))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _on_scrollbar(self, aktion, wert, einheit=None):
+        if aktion == "moveto":
+            self._scrolle_zu(float(wert) * self._anzahl * self.zeilen_hoehe)
+        elif aktion == "scroll":
+            schritt = self._sichtbare_hoehe() if einheit == "pages" else self.zeilen_hoehe
+            self._scrolle_zu(self._offset + int(wert) * schritt)
+
+    def _on_mausrad(self, event):
+        if getattr(event, "num", None) == 4:
+            richtung = -1
+        elif getattr(event, "num", None) == 5:
+            richtung = 1
+        else:
+            richtung = -1 if event.delta > 0 else 1
+        self._scrolle_zu(self._offset + richtung * self.zeilen_hoehe)
+
+    def _binde_mausrad(self, widget):
+        widget.bind("<MouseWheel>", self._on_mausrad, add="+")  # Windows, macOS
+        widget.bind("<Button-4>", self._on_mausrad, add="+")    # Linux
+        widget.bind("<Button-5>", self._on_mausrad, add="+")
+
+    def _on_resize(self, event):
+        breite = int(self._reverse_widget_scaling(event.width))
+        if breite != self._breite:
+            self._breite = breite
+            for btn in self._pool:
+                btn.configure(width=max(50, self._breite - 10))
+        self._offset = min(self._offset, self._max_offset())
+        self._render()
+
+    def _on_klick(self, k: int):
+        zustand = self._pool_zustand[k]
+        if zustand is None or zustand == "versteckt":
+            return
+        self.waehle(zustand[0])
+
+
+class RenderPlaner:
+    """Führt Neuaufbauten der Anzeige im Leerlauf von Tk aus, zeitlich in Stücke geteilt.
+
+    anfordern(aufbau) erwartet eine Funktion, die einen Generator liefert; jedes yield markiert
+    eine Stelle, an der unterbrochen werden darf. Mehrere Anforderungen vor dem nächsten Leerlauf
+    ergeben nur einen Durchlauf (die letzte gewinnt), ein noch laufender Aufbau wird dabei verworfen.
+    Zwischen den Stücken verarbeitet Tk Eingaben, die GUI bleibt also bedienbar.
+    """
+    def __init__(self, widget, budget_ms: float = 8.0):
+        self._widget = widget
+        self._budget_s = budget_ms / 1000
+        self._job = None        # after_idle-ID des nächsten Stücks
+        self._ausstehend = None # Angeforderter, noch nicht begonnener Aufbau
+        self._aufbau = None     # Laufender Generator
+
+    @property
+    def beschaeftigt(self) -> bool:
+        return self._ausstehend is not None or self._aufbau is not None
+
+    def anfordern(self, aufbau):
+        if self._ausstehend is not None or self._aufbau is not None:
+            metriken.zaehle("gui.render.verworfen")
+        self._ausstehend = aufbau
+        self._aufbau = None # Veralteter Aufbau wird nicht fortgesetzt
+        if self._job is None:
+            self._job = self._widget.after_idle(self._arbeite)
+
+    def abbrechen(self):
+        if self._job is not None:
+            self._widget.after_cancel(self._job)
+            self._job = None
+        self._ausstehend = None
+        self._aufbau = None
+
+    def _arbeite(self):
+        self._job = None
+        aufbau = None
+        try:
+            if self._ausstehend is not None:
+                fabrik, self._ausstehend = self._ausstehend, None
+                self._aufbau = fabrik()
+            aufbau = self._aufbau
+            if aufbau is None:
+                return
+            ende = time.perf_counter() + self._budget_s
+            while time.perf_counter() < ende and self._aufbau is aufbau:
+                next(aufbau)
+        except StopIteration:
+            if self._aufbau is aufbau:
+                self._aufbau = None
+        except Exception as e:
+            # Der Generator ist danach tot; ohne Aufräumen bliebe beschaeftigt für immer True
+            if self._aufbau is aufbau:
+                self._aufbau = None
+            metriken.zaehle("gui.render.fehler")
+            print(f"Fehler beim Neuaufbau der Anzeige: {e}")
+            raise # Tk meldet den Traceback (report_callback_exception)
+        finally:
+            if self.beschaeftigt and self._job is None:
+                metriken.zaehle("gui.render.stuecke")
+                self._job = self._widget.after_idle(self._arbeite)
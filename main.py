@@ -18,18 +18,30 @@
 
 
 # -*- coding: utf-8 -*-
+import time
+_START_ZEIT = time.perf_counter() # Für BUCHLADEN_STARTUP_MESSUNG (vor allen weiteren Imports)
 import tkinter as tk
 import os
 import sys # To check if running as a PyInstaller bundle
 import shutil # For copying files
 from tkinter import simpledialog, messagebox
 from buchladen_logik import Buchladen
-from buchladen_gui import BuchladenApp # AddBookWindow is imported within BuchladenApp
 from buch_model import Buch
+import buchladen_metriken as metriken
+# buchladen_gui (customtkinter, PIL, ...) wird erst in main() importiert
 
 # --- Configuration ---
 APP_NAME = "DasLeseparadies" # Used for creating the AppData folder
 DEFAULT_JSON_FILENAME = "buecher.json"
+DEFAULT_SQLITE_FILENAME = "buecher.sqlite3"
+# Speicher-Backend: "json" (Standard) oder "sqlite" (Inventar in einer lokalen Datenbank)
+STORAGE_BACKEND = os.getenv("BUCHLADEN_BACKEND", "json").lower()
+# "1": Startzeiten als JSON-Zeile ausgeben und nach dem Laden beenden (siehe .helper/startup_messung.py)
+STARTUP_MESSUNG = os.getenv("BUCHLADEN_STARTUP_MESSUNG") == "1"
+# Metriken (siehe buchladen_metriken.py): "1" gibt beim Beenden eine Zusammenfassung aus,
+# BUCHLADEN_TRACE=<pfad> schreibt zusätzlich einen Chrome-Trace
+METRIKEN_AUSGEBEN = os.getenv("BUCHLADEN_METRIKEN") == "1"
+TRACE_DATEIPFAD = os.getenv("BUCHLADEN_TRACE")
 
 # --- Helper function to get the correct path ---
 def get_resource_path(relative_path: str) -> str:
@@ -108,7 +120,45 @@ def run_backend_tests():
     print("--- Backend Test Ende ---\n")
 
 
+def starte_startup_messung(root, app, import_gui_dauer: float):
+    """Meldet Zeit bis zum ersten Frame und bis zum vollständigen Inventar, dann wird beendet."""
+    import json
+    messwerte = {"import_gui_s": import_gui_dauer, "backend": STORAGE_BACKEND}
+
+    def erster_frame(event=None):
+        if "erster_frame_s" not in messwerte and event is not None and event.widget is root:
+            root.after_idle(lambda: messwerte.setdefault("erster_frame_s", time.perf_counter() - _START_ZEIT))
+
+    def warte_auf_inventar():
+        if not app.inventar_vollstaendig or "erster_frame_s" not in messwerte:
+            root.after(10, warte_auf_inventar)
+            return
+        messwerte["inventar_geladen_s"] = time.perf_counter() - _START_ZEIT
+        messwerte["buecher"] = len(app.buchladen.inventar)
+        print("STARTUP " + json.dumps(messwerte), flush=True)
+        root.quit()
+
+    root.bind("<Map>", erster_frame, add="+")
+    root.after(10, warte_auf_inventar)
+
+
+def gib_metriken_aus():
+    """Zusammenfassung und/oder Trace der Metriken ausgeben, falls per Umgebungsvariable angefordert."""
+    if METRIKEN_AUSGEBEN:
+        print("--- Metriken ---")
+        print(metriken.zusammenfassung_text())
+    if TRACE_DATEIPFAD:
+        try:
+            metriken.exportiere_trace(TRACE_DATEIPFAD)
+            print(f"Trace nach '{TRACE_DATEIPFAD}' geschrieben.")
+        except OSError as e:
+            print(f"Fehler beim Schreiben des Traces nach '{TRACE_DATEIPFAD}': {e}")
+
+
 def main():
+    if METRIKEN_AUSGEBEN or TRACE_DATEIPFAD:
+        metriken.aktivieren(trace=bool(TRACE_DATEIPFAD))
+
     # Ensure the user-specific JSON exists, copy from bundle if not
     if not os.path.exists(USER_JSON_DATEIPFAD):
         if os.path.exists(BUNDLED_DEFAULT_JSON_PATH):
@@ -134,24 +184,22 @@ def main():
 
     # Erstelle das Hauptfenster für die Buchladen-Anwendung
     root = tk.Tk()
+    import_start = time.perf_counter()
+    from buchladen_gui import BuchladenApp # AddBookWindow is imported within BuchladenApp
+    import_gui_dauer = time.perf_counter() - import_start
     # For consistency with BuchladenApp, let's use ctk.CTk() if it's the main window.
     # However, BuchladenApp takes `root_window` which can be tk.Tk or ctk.CTk.
     # If BuchladenApp internally sets appearance mode, tk.Tk() is fine here.
 
-    # Erstelle die Buchladen-Logik-Instanz und lade die Daten
+    # Erstelle die Buchladen-Logik-Instanz
     # Now always use the USER_JSON_DATEIPFAD
-    mein_buchladen = Buchladen("Das Leseparadies Online")
-    mein_buchladen.lade_buecher_aus_json(USER_JSON_DATEIPFAD)
-
-    # Prüfe, ob Bücher geladen wurden (oder ob die Datei leer ist nach Initialisierung)
-    if not mein_buchladen.inventar:
-        # Only show warning if the file existed and was empty, or failed to load for other reasons
-        # The copy mechanism above should handle the "file not found" for the first run.
-        if os.path.exists(USER_JSON_DATEIPFAD): # Check if it's not a loading error of an existing file
-             messagebox.showwarning("Inventar Leer",
-                                   f"Das Inventar ist leer. Sie können Bücher über 'Datei -> Buch hinzufügen' hinzufügen.\nDatendatei: {USER_JSON_DATEIPFAD}",
-                                   parent=root)
-        # No need to exit, user can add books.
+    if STORAGE_BACKEND == "sqlite":
+        from buchladen_sqlite import SQLiteBuchladen
+        mein_buchladen = SQLiteBuchladen("Das Leseparadies Online",
+                                         os.path.join(USER_APP_DATA_DIR, DEFAULT_SQLITE_FILENAME))
+        mein_buchladen.lade_buecher_aus_json(USER_JSON_DATEIPFAD) # Importiert nur beim ersten Start, sonst sofort fertig
+    else:
+        mein_buchladen = Buchladen("Das Leseparadies Online")
 
     # Erstelle die GUI-Anwendungs-Instanz, passing the user-specific JSON path
     app = BuchladenApp(
@@ -160,7 +208,22 @@ def main():
         json_dateipfad=USER_JSON_DATEIPFAD,
         get_resource_path_func=get_resource_path,
         user_app_data_dir=USER_APP_DATA_DIR)
+    if STORAGE_BACKEND == "sqlite":
+        app.inventar_bereit()
+    else:
+        # Fenster erscheint sofort; die Bücher kommen batchweise aus einem Lade-Thread dazu
+        app.lade_inventar_im_hintergrund(USER_JSON_DATEIPFAD)
+    if STARTUP_MESSUNG:
+        starte_startup_messung(root, app, import_gui_dauer)
     root.mainloop()
+    app.schliessen()
+
+    # Beim Beenden das Journal der neu hinzugefügten Bücher und nicht journalisierte Änderungen
+    # (Rabatte, Katalog-Importe) in die JSON-Datei übernehmen
+    # (nicht bei abgebrochenem Laden, sonst würde ein unvollständiges Inventar gespeichert)
+    if app.inventar_vollstaendig:
+        mein_buchladen.kompaktiere_journal(USER_JSON_DATEIPFAD)
+    gib_metriken_aus()
 
 if __name__ == "__main__":
     # run_backend_tests() # Führe zuerst die Backend-Tests aus